@@ -36,9 +36,15 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ========================
 MIDDLEWARE = [
+    # Sondes /healthz, /readyz, /saturation (sans auth) + mesure des requêtes
+    "core.middleware.HealthMiddleware",
+
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
 
+    # gzip/brotli selon Accept-Encoding (voir COMPRESSION_*)
+    "core.middleware.CompressionMiddleware",
+
     # ✅ OBLIGATOIRE POUR ADMIN
     "django.contrib.sessions.middleware.SessionMiddleware",
 
@@ -104,13 +110,85 @@ AUTHENTICATION_BACKENDS = [
 # ========================
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT + génération de jetons du compte (révocation, cf. core.token)
+        "core.authentication.GenerationJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson si disponible, JSON standard sinon
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "core.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "core.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Proxys de confiance devant l'application : l'IP cliente est prise à
+    # cette profondeur de X-Forwarded-For (0 = REMOTE_ADDR, en-tête ignoré).
+    # Derrière le routeur de la plateforme : NUM_PROXIES=1.
+    "NUM_PROXIES": config("NUM_PROXIES", default=0, cast=int),
+    # Débits utilisés par core/throttling.py
+    "DEFAULT_THROTTLE_RATES": {
+        "login": "300/min",         # tout le endpoint
+        "login_ip": "10/min",
+        "login_account": "5/min",
+        "register": "20/hour",
+        "messages": "60/min",
+    },
 }
 
+# ========================
+# COMPRESSION DES RÉPONSES
+# ========================
+COMPRESSION_MIN_SIZE = 512  # octets ; en dessous, l'en-tête coûte plus qu'il ne gagne
+
+# (taille max du corps, niveaux) : les gros corps passent en niveau léger
+COMPRESSION_LEVELS = (
+    (16 * 1024, {"gzip": 9, "br": 9}),
+    (256 * 1024, {"gzip": 6, "br": 5}),
+    (None, {"gzip": 3, "br": 3}),
+)
+
+# ========================
+# CACHE (compteurs partagés entre workers)
+# ========================
+# REDIS_URL (ex. redis://:motdepasse@hote:6379/0, paquet `redis` requis) :
+# obligatoire hors DEBUG, les débits, Idempotency-Key et refresh JWT y
+# vivent. Sans REDIS_URL : cache mémoire local, propre à chaque worker
+# (développement seulement ; gunicorn refuse alors de démarrer, core.E001)
+REDIS_URL = config("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cache partagé exigé hors DEBUG (contrôle core.E001, core/checks.py)
+RATE_LIMIT_STORE = "core.throttling.CacheCounterStore"
+
+# Listes en cache (modules, annuaire des experts) et protection anti-ruée
+LIST_CACHE_TTL = config("LIST_CACHE_TTL", default=60, cast=int)
+SINGLE_FLIGHT_STALE_TTL = 300       # valeur périmée encore servie pendant un recalcul
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10     # verrou inter-processus d'un recalcul
+SINGLE_FLIGHT_WAIT_TIMEOUT = 5      # attente max d'une valeur calculée ailleurs
+
+# Conservation des réponses rejouables (en-tête Idempotency-Key)
+IDEMPOTENCY_TTL = config("IDEMPOTENCY_TTL", default=24 * 3600, cast=int)
+
 # ========================
 # JWT CONFIG
 # ========================
@@ -118,8 +196,64 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Rotation à chaque refresh ; refresh consommés dans une liste de refus
+    # en cache (CACHES partagé entre workers : Redis en production)
+    "ROTATE_REFRESH_TOKENS": True,
+    "TOKEN_REFRESH_SERIALIZER": "core.token.RotatingRefreshSerializer",
 }
 
+# Nouvel essai d'un refresh qui vient d'être tourné (réponse perdue) :
+# même successeur pendant ce délai, révocation de la session au-delà
+JWT_REFRESH_REUSE_GRACE = config("JWT_REFRESH_REUSE_GRACE", default=30, cast=int)
+
+# ========================
+# RÉTENTION DES MESSAGES
+# ========================
+# Au-delà, les messages des consultations terminées sont archivés
+# (python manage.py archive_messages)
+MESSAGE_RETENTION_DAYS = config("MESSAGE_RETENTION_DAYS", default=180, cast=int)
+
+# ========================
+# NOTIFICATIONS
+# ========================
+# Canaux utilisés par `python manage.py dispatch_notifications`
+NOTIFICATION_CHANNELS = config(
+    "NOTIFICATION_CHANNELS",
+    default="core.notifications.InAppChannel",
+    cast=lambda v: [c.strip() for c in v.split(",") if c.strip()],
+)
+
+# ========================
+# ATTRIBUTION DES CONSULTATIONS (python manage.py assign_consultations)
+# ========================
+ASSIGNMENT_SLA_SECONDS = config("ASSIGNMENT_SLA_SECONDS", default=4 * 3600, cast=int)
+ASSIGNMENT_MAX_OPEN = config("ASSIGNMENT_MAX_OPEN", default=20, cast=int)  # par expert
+ASSIGNMENT_MAX_PRIORITY = 5
+ASSIGNMENT_RESPONSE_EMA_ALPHA = 0.2
+ASSIGNMENT_DEFAULT_RESPONSE_SECONDS = 3600     # expert sans historique
+
+# ========================
+# TABLEAU DE BORD (/api/dashboard/)
+# ========================
+# Sections calculées en parallèle (une connexion par section) ; False :
+# une seule connexion, sections à la suite
+DASHBOARD_CONCURRENT = config("DASHBOARD_CONCURRENT", default=True, cast=bool)
+# Cache par section en secondes (0 = pas de cache)
+DASHBOARD_CACHE_TTL = {
+    "profile": 0,
+    "consultations": 0,
+    "unread": 0,
+    "modules": 60,
+}
+
+# ========================
+# GÉO / RÉGIONS
+# ========================
+# Agrégats par région mis en cache (invalidés à chaque écriture d'un paysan)
+REGION_AGGREGATES_TTL = config("REGION_AGGREGATES_TTL", default=3600, cast=int)
+NEARBY_RADIUS_KM = 25
+NEARBY_RADIUS_MAX_KM = 150
+
 # ========================
 # CORS
 # ========================
@@ -157,3 +291,36 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Téléversements reprenables des modules (hors MEDIA_ROOT : non publics)
+MODULE_UPLOAD_TEMP_DIR = config("MODULE_UPLOAD_TEMP_DIR", default=os.path.join(BASE_DIR, 'tmp_uploads'))
+MODULE_UPLOAD_MAX_SIZE = 2 * 1024 ** 3      # 2 Go
+MODULE_UPLOAD_CHUNK_MAX = 8 * 1024 ** 2     # 8 Mo par PATCH
+
+# Paquets hors ligne des modules (python manage.py build_bundles)
+BUNDLE_DELTA_DEPTH = 5          # deltas produits depuis les N versions précédentes
+BUNDLE_KEEP_VERSIONS = 5        # versions complètes conservées
+
+# Purge des comptes supprimés (python manage.py purge_users)
+USER_PURGE_GRACE_HOURS = config("USER_PURGE_GRACE_HOURS", default=24, cast=int)
+USER_PURGE_BATCH_SIZE = 1000    # lignes par DELETE
+USER_PURGE_PAUSE = 0.05         # secondes entre deux lots
+
+# Sondes du répartiteur et de l'autoscaler (core.middleware.HealthMiddleware)
+HEALTH_LIVE_PATH = "/healthz"
+HEALTH_READY_PATH = "/readyz"
+SATURATION_PATH = "/saturation"
+SATURATION_TOKEN = config("SATURATION_TOKEN", default="")   # vide : /saturation fermée (403)
+SATURATION_CACHE_TTL = 10           # secondes ; base et files partagées entre workers
+SATURATION_QUEUE_CAP = 10000        # comptage des files borné
+SATURATION_WINDOW_SECONDS = 60      # fenêtre glissante des latences
+SATURATION_BUFFER_SIZE = 4096       # requêtes gardées par worker
+
+# Journal d'audit (core.audit) : écrit dans la transaction de l'action ;
+# tampon par lots pour les événements non durables (transitions, modules)
+AUDIT_FLUSH_SIZE = 500          # événements par bulk_create
+AUDIT_FLUSH_INTERVAL = config("AUDIT_FLUSH_INTERVAL", default=5.0, cast=float)  # 0 : à chaque commit
+
+# Admin Django sur grosses tables (core.admin)
+ADMIN_COUNT_LIMIT = 10000       # au-delà : estimation du moteur / comptage borné
+ADMIN_ACTION_CHUNK = 1000       # lignes par UPDATE des actions groupées
@@ -1,11 +1,359 @@
-from django.contrib import admin
-from .models import User
+from collections import Counter as Tally
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import audit
+from .cache import bump_generation
+from .models import (
+    AuditEvent,
+    Consultation,
+    ConsultationTransition,
+    Counter,
+    Expert,
+    Message,
+    MessageArchive,
+    Module,
+    ModuleBundle,
+    ModuleUpload,
+    Notification,
+    OutboxEvent,
+    Paysan,
+    Region,
+    User,
+)
+
+
+# ============================================================
+# LISTES SANS COUNT(*) NI OFFSET PROFOND
+# ============================================================
+
+_ESTIMATE_QUERIES = {
+    "mysql": (
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    ),
+    "postgresql": "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+}
+
+
+def estimated_rows(model, using="default"):
+    """Nombre de lignes d'après les statistiques du moteur (None si inconnu)."""
+    connection = connections[using]
+    sql = _ESTIMATE_QUERIES.get(connection.vendor)
+    if sql is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Table entière : estimation du moteur au-delà de ADMIN_COUNT_LIMIT.
+    Liste filtrée : comptage borné à ADMIN_COUNT_LIMIT lignes.
+
+    Dans les deux cas, seules les pages couvrant les ADMIN_COUNT_LIMIT
+    premières lignes sont servies (OFFSET borné) : une page au-delà
+    renvoie la dernière page atteignable et lève ``clamped``. Pour aller
+    plus loin, on affine avec les filtres, la recherche ou ?id__lt=<id>
+    (saut par clé, la liste étant triée sur -pk).
+    """
+    clamped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+    @cached_property
+    def reachable_pages(self):
+        rows = min(self.count, settings.ADMIN_COUNT_LIMIT)
+        return max(1, -(-rows // self.per_page))
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            pass
+        else:
+            if number > self.reachable_pages:
+                self.clamped = True
+                number = self.reachable_pages
+        return super().validate_number(number)
+
+
+class ScalableChangeList(ChangeList):
+    """Page hors de portée : dernière page atteignable et invitation à affiner."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        if getattr(self.paginator, "clamped", False):
+            self.page_num = self.paginator.reachable_pages
+            self.model_admin.message_user(
+                request,
+                "Liste trop longue pour être parcourue page à page : affinez avec "
+                "les filtres, la recherche ou ?id__lt=<id>.",
+                messages.WARNING,
+            )
+
+
+def chunked_pks(queryset, size):
+    """Clés primaires par tranches croissantes (parcours par clé, sans OFFSET)."""
+    queryset = queryset.order_by("pk")
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(page.values_list("pk", flat=True)[:size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+
+
+def chunked_update(queryset, **updates):
+    """UPDATE par tranches de ADMIN_ACTION_CHUNK lignes, une transaction courte chacune."""
+    manager = queryset.model._default_manager
+    updated = 0
+    for pks in chunked_pks(queryset, settings.ADMIN_ACTION_CHUNK):
+        with transaction.atomic():
+            updated += manager.filter(pk__in=pks).update(**updates)
+    return updated
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Base des listes admin sur de grosses tables : pas de COUNT(*) complet,
+    tri sur la clé primaire (index), relations en jointure, clés
+    étrangères en champ brut (pas de liste déroulante de tous les comptes)
+    et pas de suppression groupée par le collecteur Django.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    list_max_show_all = 200
+    ordering = ("-pk",)
+
+    def get_changelist(self, request, **kwargs):
+        return ScalableChangeList
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+
+class ReadOnlyAdmin(ScalableAdmin):
+    """Tables en ajout seul ou tenues par l'application : consultation seule."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# ============================================================
+# COMPTES
+# ============================================================
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email', 'role', 'is_verified')
+class UserAdmin(ScalableAdmin):
+    list_display = ('id', 'username', 'email', 'role', 'is_verified', 'date_joined')
     list_filter = ('role', 'is_verified')
-    actions = ['validate_users']
+    # Préfixe / égalité : recherche par index, jamais LIKE '%…%'
+    search_fields = ('^username', '=email')
+    actions = ['validate_users', 'soft_delete_users']
+
+    # Tous les comptes, supprimés compris (en attente de purge)
+    def get_queryset(self, request):
+        return User.all_objects.all()
 
+    @admin.action(description="Valider les comptes sélectionnés")
     def validate_users(self, request, queryset):
-        queryset.update(is_verified=True)
\ No newline at end of file
+        validated = 0
+        for pks in chunked_pks(queryset.filter(is_verified=False), settings.ADMIN_ACTION_CHUNK):
+            with transaction.atomic():
+                rows = list(
+                    User.objects.filter(pk__in=pks, is_verified=False)
+                    .select_for_update().values_list('id', 'role')
+                )
+                User.objects.filter(pk__in=[pk for pk, _ in rows]).update(is_verified=True)
+                for role, n in Tally(role for _, role in rows).items():
+                    User.bump_pending(role, -n)
+                audit.record_many(
+                    audit.event('user.verified', request.user, User(pk=pk), role=role) for pk, role in rows
+                )
+            validated += len(rows)
+        self.message_user(request, f"{validated} compte(s) validé(s)")
+
+    @admin.action(description="Supprimer les comptes sélectionnés (purge différée)")
+    def soft_delete_users(self, request, queryset):
+        deleted = 0
+        for pks in chunked_pks(queryset.filter(deleted_at__isnull=True), settings.ADMIN_ACTION_CHUNK):
+            deleted += User.soft_delete_many(pks, actor=request.user)
+        self.message_user(request, f"{deleted} compte(s) supprimé(s) ; lignes purgées par purge_users")
+
+    # Suppression depuis la fiche : logique elle aussi (pas de cascade synchrone)
+    def delete_model(self, request, obj):
+        obj.soft_delete(actor=request.user)
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete_users(request, queryset)
+
+
+@admin.register(Paysan)
+class PaysanAdmin(ScalableAdmin):
+    list_display = ('id', 'user', 'region_ref', 'type_culture', 'superficie')
+    list_select_related = ('user', 'region_ref')
+    list_filter = ('region_ref',)
+    search_fields = ('^user__username', '^type_culture')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('region_ref',)
+
+
+@admin.register(Expert)
+class ExpertAdmin(ScalableAdmin):
+    list_display = ('id', 'user', 'domaine', 'experience', 'disponible', 'open_consultations')
+    list_select_related = ('user',)
+    list_filter = ('disponible',)
+    search_fields = ('^user__username', '^domaine')
+    raw_id_fields = ('user',)
+    readonly_fields = ('open_consultations', 'completed_consultations', 'modules_published', 'avg_response_seconds')
+    actions = ['mark_available', 'mark_unavailable']
+
+    def _set_disponible(self, request, queryset, value):
+        updated = chunked_update(queryset, disponible=value)
+        # Annuaire en cache (ExpertViewSet)
+        bump_generation('experts')
+        self.message_user(request, f"{updated} expert(s) mis à jour")
+
+    @admin.action(description="Marquer disponibles")
+    def mark_available(self, request, queryset):
+        self._set_disponible(request, queryset, True)
+
+    @admin.action(description="Marquer indisponibles")
+    def mark_unavailable(self, request, queryset):
+        self._set_disponible(request, queryset, False)
+
+
+@admin.register(Region)
+class RegionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'latitude', 'longitude')
+    search_fields = ('^name', '^code')
+
+
+# ============================================================
+# CONSULTATIONS ET MESSAGES
+# ============================================================
+
+@admin.register(Consultation)
+class ConsultationAdmin(ScalableAdmin):
+    list_display = ('id', 'sujet', 'status', 'paysan', 'expert', 'priority', 'last_activity_at')
+    list_select_related = ('paysan', 'expert')
+    list_filter = ('status',)
+    search_fields = ('^sujet',)
+    raw_id_fields = ('paysan', 'expert', 'previous_expert', 'last_message')
+    # Statut : transitions par l'API (historique, compteurs, notifications)
+    readonly_fields = ('status', 'paysan_unread', 'expert_unread', 'assigned_at', 'last_activity_at')
+
+
+@admin.register(ConsultationTransition)
+class ConsultationTransitionAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'consultation', 'from_status', 'to_status', 'actor', 'created_at')
+    list_select_related = ('consultation', 'actor')
+    raw_id_fields = ('consultation', 'actor')
+
+
+@admin.register(Message)
+class MessageAdmin(ScalableAdmin):
+    list_display = ('id', 'consultation_id', 'sender', 'receiver', 'created_at', 'read_at')
+    list_select_related = ('sender', 'receiver')
+    raw_id_fields = ('sender', 'receiver', 'consultation')
+
+
+@admin.register(MessageArchive)
+class MessageArchiveAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'consultation_id', 'message_count', 'first_created_at', 'last_created_at')
+    raw_id_fields = ('consultation',)
+    exclude = ('payload',)
+
+
+# ============================================================
+# MODULES
+# ============================================================
+
+@admin.register(Module)
+class ModuleAdmin(ScalableAdmin):
+    list_display = ('id', 'titre', 'expert', 'type_culture', 'created_at')
+    list_select_related = ('expert',)
+    search_fields = ('^titre', '^type_culture')
+    raw_id_fields = ('expert',)
+
+
+@admin.register(ModuleUpload)
+class ModuleUploadAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'filename', 'expert', 'status', 'offset', 'size', 'updated_at')
+    list_select_related = ('expert',)
+    list_filter = ('status',)
+    raw_id_fields = ('expert', 'module')
+    ordering = ('-created_at',)
+
+
+@admin.register(ModuleBundle)
+class ModuleBundleAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'culture', 'version', 'base_version', 'size', 'created_at')
+    search_fields = ('^culture',)
+    exclude = ('manifest',)
+
+
+# ============================================================
+# NOTIFICATIONS, COMPTEURS, AUDIT
+# ============================================================
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'kind', 'recipient', 'consultation_id', 'created_at')
+    list_select_related = ('recipient',)
+    raw_id_fields = ('recipient', 'consultation')
+
+
+@admin.register(Notification)
+class NotificationAdmin(ScalableAdmin):
+    list_display = ('id', 'recipient', 'kind', 'title', 'count', 'updated_at', 'read_at')
+    list_select_related = ('recipient',)
+    raw_id_fields = ('recipient', 'consultation')
+    actions = ['mark_read']
+
+    @admin.action(description="Marquer comme lues")
+    def mark_read(self, request, queryset):
+        updated = chunked_update(queryset.filter(read_at__isnull=True), read_at=timezone.now())
+        self.message_user(request, f"{updated} notification(s) marquée(s) comme lue(s)")
+
+
+@admin.register(Counter)
+class CounterAdmin(ReadOnlyAdmin):
+    list_display = ('name', 'value')
+    ordering = ('name',)
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(ReadOnlyAdmin):
+    list_display = ('created_at', 'action', 'actor_id', 'target_type', 'target_id')
+    search_fields = ('^action',)
+    # Index (created_at, id)
+    ordering = ('-created_at', '-id')
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,127 @@
+# core/audit.py
+"""
+Journal d'audit en ajout seul (AuditEvent).
+
+`record(action, actor, target, **data)` écrit par défaut l'événement
+dans la transaction en cours : validé avec elle, annulé avec elle. Les
+actions d'administration (validation, suppression de comptes) passent
+par là ; les actions groupées écrivent tous leurs événements en un seul
+bulk_create (`record_many`).
+
+`durable=False` concerne les événements fréquents déjà tracés ailleurs
+dans la même transaction (ConsultationTransition, Module) : ils
+rejoignent au commit le tampon du processus, écrit en un bulk_create dès
+AUDIT_FLUSH_SIZE événements, au bout de AUDIT_FLUSH_INTERVAL secondes
+(fil de fond) ou à l'arrêt du worker. Un worker tué peut perdre ces
+seuls événements, la trace métier restant en base.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._oldest = None
+        self._pid = None
+
+    def _ensure_flusher(self):
+        # Par processus : après un fork, ni le fil ni le tampon du maître
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._events, self._oldest = [], None
+        if settings.AUDIT_FLUSH_INTERVAL > 0:
+            threading.Thread(target=self._run, name="audit-flush", daemon=True).start()
+
+    def _run(self):
+        interval = settings.AUDIT_FLUSH_INTERVAL
+        while True:
+            time.sleep(interval)
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= interval:
+                try:
+                    self.flush()
+                finally:
+                    close_old_connections()
+
+    def add(self, events):
+        with self._lock:
+            self._ensure_flusher()
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.extend(events)
+            due = (
+                settings.AUDIT_FLUSH_INTERVAL <= 0
+                or len(self._events) >= settings.AUDIT_FLUSH_SIZE
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        from .models import AuditEvent
+
+        with self._lock:
+            events, self._events, self._oldest = self._events, [], None
+        if not events:
+            return 0
+        try:
+            AuditEvent.objects.bulk_create(events, batch_size=settings.AUDIT_FLUSH_SIZE)
+        except DatabaseError:
+            # Base indisponible : on remet le lot en tête pour le prochain essai
+            with self._lock:
+                self._events[:0] = events
+                self._oldest = time.monotonic()
+            logger.exception("Écriture du journal d'audit reportée (%s événements)", len(events))
+            return 0
+        return len(events)
+
+    def __len__(self):
+        return len(self._events)
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def event(action, actor=None, target=None, **data):
+    from .models import AuditEvent
+
+    return AuditEvent(
+        created_at=timezone.now(),
+        action=action,
+        actor_id=getattr(actor, "pk", actor),
+        target_type=target._meta.label_lower if target is not None else "",
+        target_id=str(target.pk) if target is not None else "",
+        data=data,
+    )
+
+
+def record_many(events, durable=True):
+    """
+    Événements (cf. `event`) écrits dans la transaction en cours ; au
+    tampon, au commit, pour les événements non durables.
+    """
+    from .models import AuditEvent
+
+    events = list(events)
+    if not events:
+        return
+    if durable:
+        AuditEvent.objects.bulk_create(events, batch_size=settings.AUDIT_FLUSH_SIZE)
+    else:
+        transaction.on_commit(lambda: buffer.add(events))
+
+
+def record(action, actor=None, target=None, durable=True, **data):
+    record_many([event(action, actor, target, **data)], durable)
@@ -0,0 +1,20 @@
+# core/authentication.py
+"""
+Authentification DRF. Module sans import de vues : chargé par
+REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"] pendant l'import de DRF.
+"""
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# Génération des jetons du compte (User.token_generation, cf. core.token)
+GENERATION_CLAIM = "gen"
+
+
+class GenerationJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication + contrôle de la génération (sans requête de plus)."""
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if validated_token.get(GENERATION_CLAIM, 0) != user.token_generation:
+            raise AuthenticationFailed("Session révoquée", code="token_revoked")
+        return user
@@ -0,0 +1,195 @@
+# core/bundles.py
+"""
+Paquets hors ligne des modules, par culture (Paysan.type_culture).
+
+Un paquet est une archive zip :
+
+    manifest.json               {culture, version, base_version, modules, removed}
+    modules/<id>/<fichier>      fichiers des modules inclus
+
+La version d'une culture n'augmente que si son contenu change (empreinte
+du manifeste). À chaque nouvelle version on produit le paquet complet et
+des deltas depuis les BUNDLE_DELTA_DEPTH versions précédentes : un
+appareil à jour à la v3 ne télécharge que ce qui a changé depuis la v3.
+
+Les modules sans culture (guides généraux) font partie de tous les
+paquets ; une culture sans guide spécifique utilise le paquet « general ».
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import Module, ModuleBundle
+
+GENERAL = "general"
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry(module):
+    return {
+        "id": module.id,
+        "titre": module.titre,
+        "description": module.description,
+        "type_culture": module.type_culture,
+        "filename": os.path.basename(module.fichier.name),
+        "checksum": module.checksum,
+        "updated_at": module.updated_at.isoformat(),
+    }
+
+
+def fill_missing_checksums():
+    """Empreintes des modules antérieurs aux paquets (sans toucher updated_at)."""
+    for module in Module.objects.filter(checksum="").iterator():
+        if module.fichier:
+            Module.objects.filter(pk=module.pk).update(checksum=module.compute_checksum())
+
+
+def culture_manifests():
+    """{culture: [entrées triées par id]} en une requête sur les modules."""
+    general, specific = [], {}
+    for module in Module.objects.order_by("id"):
+        key = module.culture_key
+        if key:
+            specific.setdefault(key, []).append(module)
+        else:
+            general.append(module)
+
+    # Une culture sans guide spécifique se synchronise sur le paquet général
+    manifests = {GENERAL: [_entry(m) for m in general]}
+    for key, modules in specific.items():
+        modules = sorted(general + modules, key=lambda m: m.id)
+        manifests[key] = [_entry(m) for m in modules]
+    return manifests
+
+
+def fingerprint(entries):
+    payload = json.dumps([(e["id"], e["checksum"], e["updated_at"]) for e in entries])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _write_archive(culture, version, base_version, entries, changed_ids, removed_ids):
+    modules = Module.objects.in_bulk(changed_ids)
+    manifest = {
+        "culture": culture,
+        "version": version,
+        "base_version": base_version,
+        "modules": entries,
+        "removed": sorted(removed_ids),
+    }
+
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+        path = tmp.name
+    try:
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False))
+            for entry in entries:
+                if entry["id"] not in changed_ids:
+                    continue
+                module = modules[entry["id"]]
+                # Copie par blocs depuis le stockage
+                with module.fichier.open("rb") as src, \
+                        archive.open(f"modules/{entry['id']}/{entry['filename']}", "w") as dst:
+                    for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                        dst.write(chunk)
+
+        suffix = f"-from{base_version}" if base_version else "-full"
+        bundle = ModuleBundle(
+            culture=culture,
+            version=version,
+            base_version=base_version,
+            size=os.path.getsize(path),
+            checksum=_sha256_file(path),
+            manifest=entries,
+            fingerprint=fingerprint(entries),
+        )
+        with open(path, "rb") as f:
+            bundle.fichier.save(f"{culture}/v{version}{suffix}.zip", File(f), save=False)
+        bundle.save()
+        return bundle
+    finally:
+        os.unlink(path)
+
+
+def build_culture(culture, entries):
+    """Nouvelle version (complet + deltas) si le contenu a changé ; None sinon."""
+    latest = (
+        ModuleBundle.objects
+        .filter(culture=culture, base_version__isnull=True)
+        .order_by("-version")
+        .first()
+    )
+    digest = fingerprint(entries)
+    if latest is not None and latest.fingerprint == digest:
+        return None
+
+    version = latest.version + 1 if latest else 1
+    current = {e["id"]: e for e in entries}
+
+    with transaction.atomic():
+        full = _write_archive(culture, version, None, entries, set(current), set())
+
+        previous = (
+            ModuleBundle.objects
+            .filter(culture=culture, base_version__isnull=True, version__lt=version)
+            .order_by("-version")[:settings.BUNDLE_DELTA_DEPTH]
+        )
+        for base in previous:
+            before = {e["id"]: e for e in base.manifest}
+            changed = {
+                pk for pk, e in current.items()
+                if pk not in before or before[pk]["checksum"] != e["checksum"]
+            }
+            removed = set(before) - set(current)
+            _write_archive(culture, version, base.version, entries, changed, removed)
+
+    prune(culture)
+    return full
+
+
+def prune(culture):
+    """Garde BUNDLE_KEEP_VERSIONS versions complètes et les deltas vers la dernière."""
+    fulls = list(
+        ModuleBundle.objects
+        .filter(culture=culture, base_version__isnull=True)
+        .order_by("-version")
+        .values_list("version", flat=True)
+    )
+    if not fulls:
+        return
+    keep = fulls[:settings.BUNDLE_KEEP_VERSIONS]
+    stale = ModuleBundle.objects.filter(culture=culture).exclude(
+        base_version__isnull=True, version__in=keep
+    ).exclude(version=fulls[0])
+
+    for bundle in stale:
+        bundle.fichier.delete(save=False)
+        bundle.delete()
+
+
+def build_all():
+    fill_missing_checksums()
+    manifests = culture_manifests()
+
+    # Culture dont les guides spécifiques ont disparu : version de retrait
+    for culture in ModuleBundle.objects.order_by().values_list("culture", flat=True).distinct():
+        manifests.setdefault(culture, manifests[GENERAL])
+
+    built = []
+    for culture, entries in manifests.items():
+        bundle = build_culture(culture, entries)
+        if bundle is not None:
+            built.append(bundle)
+    return built
@@ -0,0 +1,153 @@
+# core/cache.py
+"""
+Cache anti-ruée (« single-flight ») pour les clés très sollicitées.
+
+`cached(key, compute, ttl)` :
+
+- un seul calcul en vol par clé et par processus : les requêtes
+  concurrentes attendent son résultat au lieu de recalculer ;
+- un verrou inter-processus dans le cache partagé (`cache.add`) : un
+  seul worker recalcule, les autres attendent la nouvelle valeur ;
+- stale-while-revalidate : l'entrée reste en cache `stale_ttl` secondes
+  après sa fraîcheur ; pendant le recalcul, les autres servent
+  l'ancienne valeur ;
+- rafraîchissement anticipé probabiliste (XFetch) : plus l'expiration
+  approche et plus le calcul est long, plus une requête a de chances de
+  recalculer en avance. Les expirations ne tombent donc pas toutes en
+  même temps.
+
+Invalidation par génération : `versioned_key(namespace, ...)` inclut un
+numéro de génération que `bump_generation(namespace)` incrémente après
+commit. Les anciennes clés deviennent inaccessibles et expirent seules.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+MISSING = object()
+POLL_INTERVAL = 0.05
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = MISSING
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _fresh(entry, beta):
+    _, delta, expiry = entry
+    # XFetch : -log(U) suit une loi exponentielle, d'où une avance aléatoire
+    return time.time() - delta * beta * math.log(1.0 - random.random()) < expiry
+
+
+def _store(key, compute, ttl, stale_ttl):
+    start = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - start
+    cache.set(key, (value, delta, time.time() + ttl), ttl + stale_ttl)
+    return value
+
+
+def _compute_once(key, compute, ttl, stale_ttl, fallback):
+    """Verrou partagé entre processus ; à défaut, valeur périmée ou attente."""
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        try:
+            return _store(key, compute, ttl, stale_ttl)
+        finally:
+            cache.delete(lock_key)
+
+    if fallback is not MISSING:
+        return fallback
+
+    # Un autre processus calcule : on attend sa valeur
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+
+    # Détenteur du verrou trop lent ou disparu : calcul local
+    return _store(key, compute, ttl, stale_ttl)
+
+
+def cached(key, compute, ttl, stale_ttl=None, beta=1.0):
+    stale_ttl = settings.SINGLE_FLIGHT_STALE_TTL if stale_ttl is None else stale_ttl
+
+    entry = cache.get(key)
+    if entry is not None and _fresh(entry, beta):
+        return entry[0]
+    fallback = entry[0] if entry is not None else MISSING
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if fallback is not MISSING:
+            return fallback
+        flight.event.wait(settings.SINGLE_FLIGHT_WAIT_TIMEOUT)
+        if flight.error is not None:
+            raise flight.error
+        if flight.value is not MISSING:
+            return flight.value
+        return compute()
+
+    try:
+        flight.value = _compute_once(key, compute, ttl, stale_ttl, fallback)
+        return flight.value
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.event.set()
+
+
+# ============================================================
+# INVALIDATION PAR GÉNÉRATION
+# ============================================================
+
+def _generation_key(namespace):
+    return f"cache_generation:{namespace}"
+
+
+def generation(namespace):
+    key = _generation_key(namespace)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, 1, None)
+        value = cache.get(key) or 1
+    return value
+
+
+def bump_generation(namespace):
+    def bump():
+        try:
+            cache.incr(_generation_key(namespace))
+        except ValueError:
+            # Clé absente : les lecteurs ont utilisé la génération 1
+            cache.add(_generation_key(namespace), 2, None)
+
+    # Après commit : un lecteur concurrent ne recache pas l'état d'avant
+    transaction.on_commit(bump)
+
+
+def versioned_key(namespace, *parts):
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    return f"{namespace}:g{generation(namespace)}:{digest}"
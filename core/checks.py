@@ -0,0 +1,46 @@
+# core/checks.py
+"""
+Contrôles de déploiement (`manage.py check --deploy`, et au démarrage de
+gunicorn : cf. when_ready dans gunicorn.conf.py).
+
+Débits (core.throttling), Idempotency-Key et liste de refus des refresh
+JWT vivent dans le cache : un cache propre à chaque worker (LocMem)
+multiplie les limites par le nombre de workers et laisse passer les
+rejeux d'un worker à l'autre.
+"""
+import importlib.util
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.utils.module_loading import import_string
+
+# Caches propres au processus : rien n'est partagé entre workers gunicorn
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_counter_store(app_configs, **kwargs):
+    if settings.DEBUG:
+        return []
+
+    from .throttling import CacheCounterStore
+
+    store = import_string(getattr(settings, "RATE_LIMIT_STORE", "core.throttling.CacheCounterStore"))
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend == "django.core.cache.backends.redis.RedisCache" and importlib.util.find_spec("redis") is None:
+        return [Error(
+            "REDIS_URL est défini mais le paquet `redis` n'est pas installé.",
+            hint="Installer requirements.txt (redis).",
+            id="core.E002",
+        )]
+    if issubclass(store, CacheCounterStore) and backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [Error(
+        f"Compteurs de débit non partagés entre workers ({store.__name__}, {backend}).",
+        hint="Définir REDIS_URL (redis://hote:6379/0) : limites, Idempotency-Key et refresh JWT exigent un cache partagé.",
+        id="core.E001",
+    )]
@@ -0,0 +1,130 @@
+# core/dashboard.py
+"""
+Tableau de bord agrégé : ce que l'application charge au démarrage
+(profil, consultations récentes, non-lus, derniers modules) en une seule
+réponse au lieu de 5 allers-retours.
+
+Chaque section fait un nombre fixe de requêtes (1 ou 2) et s'appuie sur
+les compteurs dénormalisés des consultations plutôt que sur des COUNT
+de messages. Les sections indépendantes tournent en parallèle, chacune
+dans un thread avec sa propre connexion, et peuvent être mises en cache
+(DASHBOARD_CACHE_TTL : durée par section, 0 = pas de cache).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Q, Sum
+
+from .cache import cached, versioned_key
+from .models import Consultation, Expert, Module, Notification, Paysan
+from .serializers import (
+    ConsultationSerializer,
+    ExpertSerializer,
+    ModuleSerializer,
+    PaysanSerializer,
+    UserSerializer,
+)
+
+RECENT_CONSULTATIONS = 10
+NEWEST_MODULES = 10
+
+
+# ============================================================
+# SECTIONS
+# ============================================================
+
+def profile_section(user, request):
+    data = {"user": UserSerializer(user, context={"request": request}).data}
+
+    if user.role == "paysan":
+        paysan = Paysan.objects.filter(user=user).first()
+        data["paysan"] = PaysanSerializer(paysan, context={"request": request}).data if paysan else None
+    elif user.role == "expert":
+        expert = Expert.objects.filter(user=user).first()
+        data["expert"] = ExpertSerializer(expert, context={"request": request}).data if expert else None
+    return data
+
+
+def consultations_section(user, request):
+    mine = Consultation.objects.filter(Q(paysan=user) | Q(expert=user))
+
+    recent = mine.order_by("-last_activity_at")[:RECENT_CONSULTATIONS]
+    counts = mine.order_by().aggregate(**{
+        status: Count("id", filter=Q(status=status))
+        for status, _ in Consultation.STATUS
+    })
+    return {
+        "recent": ConsultationSerializer(recent, many=True, context={"request": request}).data,
+        "status_counts": counts,
+    }
+
+
+def unread_section(user, request):
+    # Compteurs entretenus par Consultation.record_messages / mark_read
+    messages = Consultation.objects.filter(Q(paysan=user) | Q(expert=user)).aggregate(
+        paysan=Sum("paysan_unread", filter=Q(paysan=user)),
+        expert=Sum("expert_unread", filter=Q(expert=user)),
+    )
+    return {
+        "messages": (messages["paysan"] or 0) + (messages["expert"] or 0),
+        "notifications": Notification.objects.filter(recipient=user, read_at__isnull=True).count(),
+    }
+
+
+def modules_section(user, request):
+    modules = Module.objects.select_related("expert").order_by("-created_at")[:NEWEST_MODULES]
+    return ModuleSerializer(modules, many=True, context={"request": request}).data
+
+
+SECTIONS = {
+    "profile": profile_section,
+    "consultations": consultations_section,
+    "unread": unread_section,
+    "modules": modules_section,
+}
+
+# Sections identiques pour tous les utilisateurs : clé partagée, invalidée
+# avec la génération du même nom (cf. core.cache)
+SHARED_SECTIONS = ("modules",)
+
+
+# ============================================================
+# ASSEMBLAGE
+# ============================================================
+
+def cache_key(name, user, request):
+    if name in SHARED_SECTIONS:
+        return versioned_key(name, "dashboard", request.get_host())
+    return f"dashboard:{name}:{user.pk}"
+
+
+def build_section(name, user, request):
+    ttl = settings.DASHBOARD_CACHE_TTL.get(name, 0)
+    if not ttl:
+        return SECTIONS[name](user, request)
+    return cached(cache_key(name, user, request), lambda: SECTIONS[name](user, request), ttl)
+
+
+def _build_in_worker(name, user, request):
+    # Thread hors requête : on libère sa connexion comme en fin de requête
+    try:
+        return build_section(name, user, request)
+    finally:
+        close_old_connections()
+
+
+async def collect(user, request, names):
+    if not settings.DASHBOARD_CONCURRENT:
+        # Une seule connexion, sections à la suite
+        build = sync_to_async(
+            lambda: {name: build_section(name, user, request) for name in names}
+        )
+        return await build()
+
+    results = await asyncio.gather(*(
+        sync_to_async(_build_in_worker, thread_sensitive=False)(name, user, request)
+        for name in names
+    ))
+    return dict(zip(names, results))
@@ -0,0 +1,129 @@
+# core/fast_serializers.py
+"""
+Chemin de sérialisation rapide pour les listes volumineuses.
+
+Les RowSerializer travaillent sur des tuples `values_list()` avec une
+table de champs compilée une fois par classe, sans introspection
+ModelSerializer par ligne. Les utilisateurs référencés sont dédupliqués
+dans une table annexe `users` indexée par id :
+
+    {"results": [{"id": 1, "sender": 3, ...}], "users": {"3": {...}}}
+
+Activé sur les listes par le paramètre `?lean=1`.
+"""
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+
+User = get_user_model()
+
+# Mêmes champs que UserSerializer
+USER_FIELDS = (
+    'id', 'username', 'first_name', 'last_name',
+    'email', 'role', 'phone', 'avatar', 'is_active',
+)
+
+
+def wants_lean(request):
+    return request.query_params.get("lean") in ("1", "true")
+
+
+class RowSerializer:
+    """
+    `fields` : tuple (clé de sortie, chemin ORM pour values_list).
+    `user_fields` : clés de sortie contenant un id utilisateur.
+    `file_fields` : clés de sortie contenant un nom de fichier stocké.
+    """
+    fields = ()
+    user_fields = ()
+    file_fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Compilation de la table des champs, une fois par classe
+        cls._keys = tuple(key for key, _ in cls.fields)
+        cls._paths = tuple(path for _, path in cls.fields)
+        cls._user_idx = tuple(cls._keys.index(k) for k in cls.user_fields)
+        cls._file_idx = tuple(cls._keys.index(k) for k in cls.file_fields)
+
+    def __init__(self, request=None):
+        self.request = request
+        self._media_base = None
+
+    def file_url(self, name):
+        if not name:
+            return None
+        url = default_storage.url(name)
+        if self.request is None:
+            return url
+        if self._media_base is None:
+            # Schéma/hôte calculés une seule fois par réponse
+            self._media_base = self.request.build_absolute_uri("/").rstrip("/")
+        return url if url.startswith("http") else self._media_base + url
+
+    def rows(self, queryset):
+        keys = self._keys
+        file_idx = self._file_idx
+
+        if not file_idx:
+            return [dict(zip(keys, values)) for values in queryset.values_list(*self._paths)]
+
+        rows = []
+        for values in queryset.values_list(*self._paths):
+            values = list(values)
+            urls = {}
+            for i in file_idx:
+                name = values[i]
+                if name not in urls:
+                    urls[name] = self.file_url(name)
+                values[i] = urls[name]
+            rows.append(dict(zip(keys, values)))
+        return rows
+
+    def users(self, rows):
+        ids = {row[key] for row in rows for key in self.user_fields if row[key] is not None}
+        if not ids:
+            return {}
+
+        users = {}
+        for values in User.objects.filter(pk__in=ids).values_list(*USER_FIELDS):
+            user = dict(zip(USER_FIELDS, values))
+            user['avatar'] = self.file_url(user['avatar'])
+            users[user['id']] = user
+        return users
+
+    def serialize(self, queryset):
+        rows = self.rows(queryset)
+        data = {"results": rows}
+        if self.user_fields:
+            data["users"] = self.users(rows)
+        return data
+
+
+class MessageRowSerializer(RowSerializer):
+    fields = (
+        ('id', 'id'),
+        ('content', 'content'),
+        ('created_at', 'created_at'),
+        ('read_at', 'read_at'),
+        ('sender', 'sender_id'),
+        ('receiver', 'receiver_id'),
+        ('consultation', 'consultation_id'),
+    )
+    user_fields = ('sender', 'receiver')
+
+
+class ModuleRowSerializer(RowSerializer):
+    fields = (
+        ('id', 'id'),
+        ('titre', 'titre'),
+        ('description', 'description'),
+        ('type_culture', 'type_culture'),
+        ('fichier', 'fichier'),
+        ('fichier_url', 'fichier'),
+        ('checksum', 'checksum'),
+        ('expert', 'expert_id'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
+    user_fields = ('expert',)
+    file_fields = ('fichier', 'fichier_url')
@@ -0,0 +1,117 @@
+# core/geo.py
+"""
+Outils géographiques sans extension spatiale (SQLite / MySQL).
+
+Les positions sont indexées par geohash : une chaîne base32 dont chaque
+préfixe désigne une cellule de la grille. Une recherche de proximité
+devient un filtre `geohash LIKE 'xxxx%'` sur un index B-tree ordinaire
+(la cellule du point et ses 8 voisines), affiné ensuite par la distance
+exacte (haversine, vectorisée avec NumPy).
+"""
+import math
+
+import numpy as np
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 9  # ≈ 5 m : précision stockée en base
+EARTH_RADIUS_KM = 6371.0
+
+# Plus petit côté d'une cellule (km) selon la longueur du préfixe
+CELL_MIN_KM = {1: 5000, 2: 625, 3: 156, 4: 19.5, 5: 4.89, 6: 0.61, 7: 0.153}
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        rng, coord = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+
+    return "".join(chars)
+
+
+def bounds(geohash):
+    """(lat_min, lat_max, lon_min, lon_max) de la cellule."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def neighbors(geohash):
+    """La cellule et ses 8 voisines (moins aux pôles)."""
+    lat_min, lat_max, lon_min, lon_max = bounds(geohash)
+    dlat, dlon = lat_max - lat_min, lon_max - lon_min
+    lat_c, lon_c = lat_min + dlat / 2, lon_min + dlon / 2
+
+    cells = set()
+    for i in (-1, 0, 1):
+        lat = lat_c + i * dlat
+        if not -90 <= lat <= 90:
+            continue
+        for j in (-1, 0, 1):
+            lon = (lon_c + j * dlon + 180) % 360 - 180
+            cells.add(encode(lat, lon, len(geohash)))
+    return cells
+
+
+def precision_for_radius(radius_km):
+    """Préfixe le plus fin dont les 9 cellules couvrent encore le rayon."""
+    best = 1
+    for precision, size in CELL_MIN_KM.items():
+        if size >= radius_km:
+            best = precision
+    return best
+
+
+def cells_around(latitude, longitude, radius_km):
+    precision = precision_for_radius(radius_km)
+    return neighbors(encode(latitude, longitude, precision))
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Distances (km) d'un point vers des tableaux de points."""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def nearest(latitude, longitude, rows, radius_km, limit):
+    """
+    `rows` : tuples (id, latitude, longitude). Renvoie [(id, distance_km)]
+    des points dans le rayon, du plus proche au plus lointain.
+    """
+    if not rows:
+        return []
+    ids, latitudes, longitudes = (np.asarray(column) for column in zip(*rows))
+    distances = haversine_km(latitude, longitude, latitudes.astype(float), longitudes.astype(float))
+
+    inside = np.flatnonzero(distances <= radius_km)
+    order = inside[np.argsort(distances[inside], kind="stable")][:limit]
+    return [(int(ids[i]), round(float(distances[i]), 3)) for i in order]
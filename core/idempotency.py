@@ -0,0 +1,111 @@
+# core/idempotency.py
+"""
+Support de l'en-tête Idempotency-Key pour les endpoints d'écriture.
+
+Une requête rejouée (même utilisateur, même chemin, même clé) reçoit la
+réponse d'origine (statut, corps et en-têtes de REPLAYED_HEADERS) sans
+repasser par les serializers ni la base. Les entrées vivent dans le
+cache partagé et expirent après IDEMPOTENCY_TTL.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+HEADER = "Idempotency-Key"
+
+# Durée max d'un traitement avant qu'une relance puisse reprendre la main
+PENDING_TTL = 60
+
+# En-têtes de la réponse d'origine rendus à l'identique lors d'un rejeu
+REPLAYED_HEADERS = ("Location", "ETag", "Last-Modified", "Upload-Offset", "Upload-Length")
+
+# Entrées compactes : (état, empreinte, statut HTTP, données, en-têtes)
+PENDING, DONE = 0, 1
+
+
+def _cache_key(request, key):
+    if request.user and request.user.is_authenticated:
+        scope = f"u{request.user.pk}"
+    else:
+        # Même IP que les throttles : X-Forwarded-For lu selon NUM_PROXIES
+        scope = BaseThrottle().get_ident(request)
+    raw = f"{scope}:{request.method}:{request.path}:{key}"
+    return "idem:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()[:16]
+
+
+def run_idempotent(request, handler):
+    """Exécute `handler()` au plus une fois par Idempotency-Key."""
+    key = request.headers.get(HEADER)
+    if not key:
+        return handler()
+
+    if len(key) > 255:
+        return Response(
+            {"detail": f"{HEADER} trop longue (255 caractères max)"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    cache_key = _cache_key(request, key)
+    fingerprint = _fingerprint(request)
+
+    # add() est atomique : une seule relance concurrente obtient la main
+    if not cache.add(cache_key, (PENDING, fingerprint, None, None, None), PENDING_TTL):
+        entry = cache.get(cache_key)
+
+        if entry is None:
+            # Expirée entre add() et get() : traiter comme une première requête
+            return run_idempotent(request, handler)
+
+        state, previous_fingerprint, code, data, headers = entry
+
+        if previous_fingerprint != fingerprint:
+            return Response(
+                {"detail": f"{HEADER} déjà utilisée pour une autre requête"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        if state == PENDING:
+            return Response(
+                {"detail": "Requête identique en cours de traitement"},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": "1"}
+            )
+
+        return Response(data, status=code, headers={**headers, "Idempotent-Replayed": "true"})
+
+    try:
+        response = handler()
+    except Exception:
+        cache.delete(cache_key)
+        raise
+
+    if response.status_code >= 500:
+        # Erreur serveur : la relance doit pouvoir réessayer
+        cache.delete(cache_key)
+    else:
+        cache.set(
+            cache_key,
+            (DONE, fingerprint, response.status_code, response.data, {
+                name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)
+            }),
+            settings.IDEMPOTENCY_TTL
+        )
+
+    return response
+
+
+class IdempotentCreateMixin:
+    """À placer avant la vue DRF : rend `create()` idempotent."""
+
+    def create(self, request, *args, **kwargs):
+        return run_idempotent(request, lambda: super(IdempotentCreateMixin, self).create(request, *args, **kwargs))
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Consultation, Message, MessageArchive
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive (JSON colonnaire compressé) les messages des consultations "
+        "terminées plus anciens que MESSAGE_RETENTION_DAYS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.MESSAGE_RETENTION_DAYS)
+        parser.add_argument("--chunk-size", type=int, default=5000,
+                            help="Messages maximum par ligne d'archive")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        chunk_size = options["chunk_size"]
+
+        consultations = (
+            Consultation.objects
+            .filter(status="completed", last_activity_at__lt=cutoff)
+            .only("id", "last_message_id")
+            .order_by("id")
+        )
+
+        archived = 0
+        for consultation in consultations.iterator():
+            # Le dernier message reste chaud : la boîte de réception en dépend
+            pending = (
+                Message.objects
+                .filter(consultation=consultation, created_at__lt=cutoff)
+                .exclude(pk=consultation.last_message_id)
+                .order_by("created_at", "id")
+            )
+
+            while True:
+                messages = list(pending[:chunk_size])
+                if not messages:
+                    break
+
+                if options["dry_run"]:
+                    # Même sélection que l'archivage réel, tous lots compris
+                    archived += pending.count()
+                    break
+
+                with transaction.atomic():
+                    MessageArchive.pack(consultation, messages).save()
+                    Message.objects.filter(pk__in=[m.pk for m in messages]).delete()
+
+                archived += len(messages)
+
+        label = "à archiver (simulation)" if options["dry_run"] else "archivé(s)"
+        self.stdout.write(self.style.SUCCESS(f"{archived} message(s) {label}"))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.scheduler import assign_batch, escalate_waiting, reassign_overdue
+
+
+class Command(BaseCommand):
+    help = (
+        "Attribue les consultations en attente aux experts (équité pondérée par "
+        "la charge et le délai de réponse), remet en file celles dont le SLA est "
+        "dépassé. Plusieurs instances peuvent tourner en parallèle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--loop", action="store_true", help="Tourner en continu")
+        parser.add_argument("--interval", type=float, default=10.0,
+                            help="Pause (s) quand la file est vide")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        assigned = reassigned = escalated = 0
+
+        while True:
+            reassigned += reassign_overdue(batch_size)
+            escalated += escalate_waiting()
+
+            count = assign_batch(batch_size)
+            assigned += count
+
+            if count < batch_size:
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{assigned} attribuée(s), {reassigned} réattribuée(s) (SLA), {escalated} escaladée(s)"
+        ))
@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.fast_serializers import MessageRowSerializer, ModuleRowSerializer
+from core.models import Consultation, Message, Module, User
+from core.renderers import FastJSONRenderer
+from core.serializers import MessageSerializer, ModuleSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark (lignes/s) : ModelSerializer + JSONRenderer contre "
+        "RowSerializer + FastJSONRenderer. Les données de test sont créées "
+        "dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        request = APIRequestFactory().get("/api/messages/")
+
+        with transaction.atomic():
+            self.seed(rows)
+
+            messages = Message.objects.select_related("sender", "receiver", "consultation")
+            modules = Module.objects.select_related("expert")
+
+            cases = [
+                ("messages  ModelSerializer", lambda: JSONRenderer().render(
+                    MessageSerializer(messages.all(), many=True, context={"request": request}).data)),
+                ("messages  RowSerializer  ", lambda: FastJSONRenderer().render(
+                    MessageRowSerializer(request).serialize(messages.all()))),
+                ("modules   ModelSerializer", lambda: JSONRenderer().render(
+                    ModuleSerializer(modules.all(), many=True, context={"request": request}).data)),
+                ("modules   RowSerializer  ", lambda: FastJSONRenderer().render(
+                    ModuleRowSerializer(request).serialize(modules.all()))),
+            ]
+
+            for label, run in cases:
+                best = min(self.timed(run) for _ in range(options["repeat"]))
+                self.stdout.write(f"{label} {rows / best:>12,.0f} lignes/s  ({best * 1000:.1f} ms)")
+
+            transaction.set_rollback(True)
+
+    def timed(self, run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+
+    def seed(self, rows):
+        users = [
+            User.objects.create(username=f"bench-{role}-{i}", role=role)
+            for i in range(10)
+            for role in ("paysan", "expert")
+        ]
+        paysans, experts = users[0::2], users[1::2]
+
+        consultations = [
+            Consultation.objects.create(
+                paysan=paysans[i], expert=experts[i], sujet="bench", description="bench"
+            )
+            for i in range(10)
+        ]
+
+        Message.objects.bulk_create(
+            Message(
+                consultation=consultations[i % 10],
+                sender=paysans[i % 10],
+                receiver=experts[i % 10],
+                content="Bonjour, les feuilles de maïs jaunissent depuis une semaine.",
+            )
+            for i in range(rows)
+        )
+        Module.objects.bulk_create(
+            Module(
+                expert=experts[i % 10],
+                titre=f"Guide {i}",
+                description="Guide de production",
+                fichier=f"modules/guide-{i}.pdf",
+            )
+            for i in range(rows)
+        )
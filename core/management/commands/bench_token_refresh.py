@@ -0,0 +1,65 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import User
+from core.token import RotatingRefreshSerializer, RotatingRefreshToken, denylist_key, successor_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark (refresh/s) : refresh sans rotation (access seul) contre "
+        "rotation + liste de refus en cache + génération. L'utilisateur de test "
+        "est créé dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--refreshes", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        count = options["refreshes"]
+
+        with transaction.atomic():
+            user = User.objects.create(username="bench-token-refresh", role="paysan")
+
+            # Ancien comportement : access seul, refresh réutilisable à volonté
+            def plain():
+                token = str(RefreshToken.for_user(user))
+                for _ in range(count):
+                    str(RefreshToken(token).access_token)
+
+            jtis = []
+
+            def rotating():
+                token = str(RotatingRefreshToken.for_user(user))
+                for _ in range(count):
+                    jtis.append(RotatingRefreshToken(token)["jti"])
+                    serializer = RotatingRefreshSerializer(data={"refresh": token})
+                    serializer.is_valid(raise_exception=True)
+                    token = serializer.validated_data["refresh"]
+
+            cases = [
+                ("sans rotation             ", plain),
+                ("rotation + liste de refus ", rotating),
+            ]
+            for label, run in cases:
+                best = min(self.timed(run) for _ in range(options["repeat"]))
+                self.stdout.write(
+                    f"{label} {count / best:>10,.0f} refresh/s  ({best / count * 1e6:.0f} µs par refresh)"
+                )
+
+            # Décodage compris dans la mesure ci-dessus ; la liste de refus ne
+            # garde qu'une clé par refresh consommé, expirant avec le jeton
+            self.stdout.write(f"liste de refus : {len(jtis)} clé(s) courte(s), TTL = durée de vie restante")
+            cache.delete_many([key(jti) for jti in jtis for key in (denylist_key, successor_key)])
+
+            transaction.set_rollback(True)
+
+    def timed(self, run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bundles import build_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Construit les paquets hors ligne des modules par culture : nouvelle "
+        "version (complet + deltas) uniquement pour les cultures modifiées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Tourner en continu")
+        parser.add_argument("--interval", type=float, default=300.0,
+                            help="Pause (s) entre deux passes")
+
+    def handle(self, *args, **options):
+        while True:
+            for bundle in build_all():
+                self.stdout.write(f"{bundle.culture} v{bundle.version} ({bundle.size} octets)")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Paquets à jour"))
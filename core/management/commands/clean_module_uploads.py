@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ModuleUpload
+
+
+class Command(BaseCommand):
+    help = "Supprime les téléversements de modules abandonnés et leurs fichiers temporaires."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=48,
+                            help="Inactivité au-delà de laquelle un téléversement est abandonné")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        stale = ModuleUpload.objects.filter(status="uploading", updated_at__lt=cutoff)
+
+        count = 0
+        for upload in stale.iterator():
+            upload.discard()
+            upload.delete()
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{count} téléversement(s) supprimé(s)"))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import dispatch, get_channels
+
+
+class Command(BaseCommand):
+    help = (
+        "Vide l'outbox des notifications par lots (résumés par destinataire). "
+        "Plusieurs instances peuvent tourner en parallèle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="Tourner en continu")
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="Pause (s) quand l'outbox est vide")
+
+    def handle(self, *args, **options):
+        channels = get_channels()
+        total = 0
+
+        while True:
+            processed = dispatch(options["batch_size"], channels)
+            total += processed
+
+            if not processed:
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} événement(s) traité(s)"))
@@ -0,0 +1,229 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from core import geo
+from core.models import User, Paysan, Region
+
+REQUIRED = ("email", "region", "type_culture", "superficie", "experience")
+
+
+def _init_worker():
+    # Processus lancés en « spawn » : Django doit être initialisé
+    django.setup()
+
+
+def _hash(password):
+    return make_password(password)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import groupé de paysans (User + Paysan) depuis un CSV ou un JSON. "
+        "Colonnes : email, region, type_culture, superficie, experience, "
+        "et en option username, first_name, last_name, phone, password, latitude, longitude. "
+        "Sans mot de passe, le compte est créé avec un mot de passe inutilisable "
+        "(réinitialisation requise), ce qui évite tout hachage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "json"),
+                            help="Déduit de l'extension par défaut")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Processus de hachage (défaut : nombre de CPU)")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Mêmes contrôles (doublons en base, régions) sans écriture ni hachage")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("json" if path.endswith(".json") else "csv")
+
+        dry_run = options["dry_run"]
+        created = skipped = 0
+        errors = []
+        self.unknown_regions = set()
+        # Simulation : comptes « créés » par les lots précédents, vus comme pris
+        self.planned_emails, self.planned_usernames = set(), set()
+
+        pool = nullcontext() if dry_run else ProcessPoolExecutor(options["workers"], initializer=_init_worker)
+        with open(path, encoding="utf-8-sig", newline="") as f, pool:
+            rows = csv.DictReader(f) if fmt == "csv" else iter(json.load(f))
+            line = 0
+
+            while True:
+                chunk = list(islice(rows, options["chunk_size"]))
+                if not chunk:
+                    break
+
+                n_created, n_skipped, chunk_errors = self.import_chunk(chunk, line, pool, dry_run)
+                created += n_created
+                skipped += n_skipped
+                errors.extend(chunk_errors)
+                line += len(chunk)
+
+                self.stdout.write(f"{line} ligne(s) lue(s), {created} créée(s)")
+
+        for error in errors[:50]:
+            self.stderr.write(error)
+
+        if self.unknown_regions:
+            self.stdout.write(
+                f"Région(s) hors référentiel (region_ref vide) : {', '.join(sorted(self.unknown_regions)[:20])}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} paysan(s) {'à importer (simulation)' if dry_run else 'importé(s)'}, "
+            f"{skipped} doublon(s), {len(errors)} erreur(s)"
+        ))
+
+    def import_chunk(self, chunk, offset, pool, dry_run=False):
+        errors, records = [], []
+        seen_emails, seen_usernames = set(), set()
+
+        for i, row in enumerate(chunk, start=offset + 1):
+            try:
+                record = self.clean(row)
+            except (KeyError, TypeError, ValueError) as exc:
+                errors.append(f"Ligne {i} : {exc}")
+                continue
+
+            # Doublons internes au lot : première occurrence conservée
+            if record["email_key"] in seen_emails or record["username"] in seen_usernames:
+                continue
+            seen_emails.add(record["email_key"])
+            seen_usernames.add(record["username"])
+            records.append(record)
+
+        if not records:
+            return 0, 0, errors
+
+        # Une seule requête par lot (index LOWER(email) + unicité username)
+        existing = User.objects.annotate(email_key=Lower("email")).filter(
+            Q(email_key__in=[r["email_key"] for r in records]) |
+            Q(username__in=[r["username"] for r in records])
+        ).values_list("email_key", "username")
+
+        taken_emails, taken_usernames = set(self.planned_emails), set(self.planned_usernames)
+        for email_key, username in existing:
+            taken_emails.add(email_key)
+            taken_usernames.add(username)
+
+        new = [
+            r for r in records
+            if r["email_key"] not in taken_emails and r["username"] not in taken_usernames
+        ]
+        skipped = len(records) - len(new)
+
+        # Région normalisée comme à l'insertion (référentiel Region)
+        regions = Region.lookup()
+        self.unknown_regions.update(
+            r["region"] for r in new if Region.normalize(r["region"]) not in regions
+        )
+        if dry_run:
+            self.planned_emails.update(r["email_key"] for r in new)
+            self.planned_usernames.update(r["username"] for r in new)
+            return len(new), skipped, errors
+
+        # Hachage PBKDF2 réparti sur plusieurs processus
+        to_hash = [r for r in new if r["password"]]
+        for record, hashed in zip(to_hash, pool.map(_hash, [r["password"] for r in to_hash], chunksize=4)):
+            record["password"] = hashed
+
+        users = []
+        for r in new:
+            user = User(
+                username=r["username"],
+                email=r["email"],
+                first_name=r["first_name"],
+                last_name=r["last_name"],
+                phone=r["phone"],
+                role="paysan",
+            )
+            if r["password"]:
+                user.password = r["password"]
+            else:
+                user.set_unusable_password()
+            users.append(user)
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+
+            # MySQL ne renvoie pas les clés de bulk_create : relecture groupée
+            ids = dict(
+                User.objects.filter(username__in=[u.username for u in users])
+                .values_list("username", "id")
+            )
+
+            # bulk_create n'appelle pas save() : région et geohash calculés ici
+            paysans = [
+                Paysan(
+                    user_id=ids[r["username"]],
+                    region=r["region"],
+                    region_ref_id=regions.get(Region.normalize(r["region"])),
+                    latitude=r["latitude"],
+                    longitude=r["longitude"],
+                    geohash=geo.encode(r["latitude"], r["longitude"]) if r["latitude"] is not None else "",
+                    type_culture=r["type_culture"],
+                    superficie=r["superficie"],
+                    experience=r["experience"],
+                )
+                for r in new
+            ]
+            Paysan.objects.bulk_create(paysans)
+            User.bump_pending("paysan", len(new))
+            Region.invalidate_aggregates(*{p.region_ref_id for p in paysans})
+
+        return len(new), skipped, errors
+
+    def clean(self, row):
+        # JSON : chaque entrée doit être un objet ; valeurs converties en texte
+        if not isinstance(row, dict):
+            raise ValueError(f"objet attendu, reçu {type(row).__name__}")
+
+        def text(field):
+            value = row.get(field)
+            return "" if value is None else str(value).strip()
+
+        missing = [field for field in REQUIRED if not text(field)]
+        if missing:
+            raise ValueError(f"champ(s) manquant(s) : {', '.join(missing)}")
+
+        email = text("email")
+        if "@" not in email:
+            raise ValueError(f"email invalide : {email}")
+
+        return {
+            "email": email,
+            "email_key": User.normalize_email_key(email),
+            "username": text("username") or email,
+            "first_name": text("first_name"),
+            "last_name": text("last_name"),
+            "phone": text("phone") or None,
+            "password": str(row.get("password") or ""),
+            "region": text("region"),
+            "type_culture": text("type_culture"),
+            "superficie": float(row["superficie"]),
+            "experience": int(row["experience"]),
+            **self.clean_position(row),
+        }
+
+    def clean_position(self, row):
+        latitude = str(row.get("latitude") or "").strip()
+        longitude = str(row.get("longitude") or "").strip()
+        if not latitude and not longitude:
+            return {"latitude": None, "longitude": None}
+
+        latitude, longitude = float(latitude), float(longitude)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError(f"position hors limites : {latitude}, {longitude}")
+        return {"latitude": latitude, "longitude": longitude}
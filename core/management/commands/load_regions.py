@@ -0,0 +1,86 @@
+import json
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg
+
+from core.models import Paysan, Region
+
+
+class Command(BaseCommand):
+    help = (
+        "Charge le gazetteer des régions puis rattache les paysans à leur région "
+        "normalisée. Fichier JSON : [{\"name\", \"code\"?, \"aliases\"?, "
+        "\"latitude\"?, \"longitude\"?}]. --from-paysans crée les régions manquantes "
+        "à partir des saisies existantes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?")
+        parser.add_argument("--from-paysans", action="store_true")
+
+    def handle(self, *args, **options):
+        if not options["path"] and not options["from_paysans"]:
+            raise CommandError("Indiquer un fichier JSON et/ou --from-paysans")
+
+        if options["path"]:
+            with open(options["path"], encoding="utf-8") as f:
+                entries = json.load(f)
+            for entry in entries:
+                self.upsert(entry)
+            self.stdout.write(f"{len(entries)} région(s) chargée(s)")
+
+        if options["from_paysans"]:
+            self.stdout.write(f"{self.bootstrap()} région(s) créée(s) depuis les paysans")
+
+        linked = self.relink()
+        cache.delete_many([Region.aggregates_key(pk) for pk in Region.objects.values_list("id", flat=True)])
+        self.stdout.write(self.style.SUCCESS(f"{linked} paysan(s) rattaché(s)"))
+
+    def upsert(self, entry):
+        name = entry["name"].strip()
+        Region.objects.update_or_create(
+            code=entry.get("code") or Region.normalize(name),
+            defaults={
+                "name": name,
+                "aliases": [Region.normalize(a) for a in entry.get("aliases", [])],
+                "latitude": entry.get("latitude"),
+                "longitude": entry.get("longitude"),
+            },
+        )
+
+    def bootstrap(self):
+        # Graphies non résolues, regroupées par forme normalisée
+        spellings = defaultdict(Counter)
+        rows = Paysan.objects.filter(region_ref__isnull=True).values_list("region", flat=True)
+        for raw in rows.iterator():
+            key = Region.normalize(raw)
+            if key and Region.resolve_id(raw) is None:
+                spellings[key][raw.strip()] += 1
+
+        for key, counter in spellings.items():
+            centroid = Paysan.objects.filter(
+                region__in=list(counter), latitude__isnull=False, longitude__isnull=False,
+            ).aggregate(latitude=Avg("latitude"), longitude=Avg("longitude"))
+            Region.objects.create(
+                code=key,
+                name=counter.most_common(1)[0][0],
+                latitude=centroid["latitude"],
+                longitude=centroid["longitude"],
+            )
+        return len(spellings)
+
+    def relink(self):
+        # Un UPDATE par graphie distincte, pas par paysan
+        linked = 0
+        for raw in Paysan.objects.order_by().values_list("region", flat=True).distinct():
+            region_id = Region.resolve_id(raw)
+            if region_id is None:
+                continue
+            linked += (
+                Paysan.objects.filter(region=raw)
+                .exclude(region_ref_id=region_id)
+                .update(region_ref_id=region_id)
+            )
+        return linked
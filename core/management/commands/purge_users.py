@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import User
+from core.purge import Purger
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime définitivement les comptes supprimés logiquement depuis plus de "
+        "USER_PURGE_GRACE_HOURS heures, avec leurs lignes dépendantes, par lots "
+        "bornés en SQL brut et avec une pause entre deux lots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=int, default=settings.USER_PURGE_GRACE_HOURS)
+        parser.add_argument("--batch-size", type=int, default=settings.USER_PURGE_BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=settings.USER_PURGE_PAUSE,
+                            help="Pause (s) entre deux lots")
+        parser.add_argument("--limit", type=int, default=100, help="Comptes par passage")
+        parser.add_argument("--loop", action="store_true", help="Tourner en continu")
+        parser.add_argument("--interval", type=float, default=300.0,
+                            help="Pause (s) quand rien n'est à purger")
+
+    def handle(self, *args, **options):
+        purger = Purger(batch_size=options["batch_size"], pause=options["pause"])
+        purged = 0
+
+        while True:
+            cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+            user_ids = list(
+                User.all_objects
+                .filter(deleted_at__isnull=False, deleted_at__lte=cutoff)
+                .order_by("id")
+                .values_list("id", flat=True)[:options["limit"]]
+            )
+            for user_id in user_ids:
+                purger.delete_rows(User, [user_id])
+                purged += 1
+
+            if len(user_ids) < options["limit"]:
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+
+        for label, count in sorted(purger.deleted.items()):
+            self.stdout.write(f"  {label}: {count} supprimée(s)")
+        for label, count in sorted(purger.nullified.items()):
+            self.stdout.write(f"  {label}: {count} détachée(s)")
+        self.stdout.write(self.style.SUCCESS(f"{purged} compte(s) purgé(s)"))
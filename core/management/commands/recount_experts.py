@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import bump_generation
+from core.models import Expert
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs dénormalisés des experts (réparation d'écarts)."
+
+    def handle(self, *args, **options):
+        count = 0
+        for expert in Expert.objects.iterator():
+            expert.recount()
+            count += 1
+        bump_generation('experts')
+
+        self.stdout.write(self.style.SUCCESS(f"{count} expert(s) recalculé(s)"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = "Recalcule le compteur des comptes en attente de validation (réparation d'écarts)."
+
+    def handle(self, *args, **options):
+        User.recount_pending()
+        self.stdout.write(self.style.SUCCESS(
+            f"{User.pending_count()} compte(s) en attente de validation"
+        ))
@@ -0,0 +1,138 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Exécuté dans un interpréteur neuf (python -X importtime) : démarrage
+# d'un worker jusqu'à l'URLconf chargée, puis mémoire d'un processus
+# forké (comme un worker gunicorn préchargé) après un cycle de GC
+PROBE = r"""
+import gc, json, os, resource, sys, time
+
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter() - start
+
+
+def smaps():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = [line.split() for line in f]
+    except OSError:
+        return None
+    return {p[0][:-1]: int(p[1]) for p in lines if len(p) >= 2 and p[0].endswith(":") and p[1].isdigit()}
+
+
+def forked(freeze):
+    if not hasattr(os, "fork"):
+        return None
+    gc.collect()
+    if freeze:
+        gc.freeze()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        gc.collect()
+        os.write(write_fd, json.dumps(smaps()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        data = json.loads(f.read() or "null")
+    os.waitpid(pid, 0)
+    if freeze:
+        gc.unfreeze()
+    return data
+
+
+print(json.dumps({
+    "ready": ready,
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "self": smaps(),
+    "fork": forked(False),
+    "fork_frozen": forked(True),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """[(paquet, propre µs, cumulé µs)] depuis la sortie de -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def _mb(kb):
+    return f"{kb / 1024:7.1f} Mo"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le démarrage à froid d'un worker (python -X importtime, jusqu'à "
+        "l'URLconf chargée) et la mémoire par worker avec et sans préchargement "
+        "gunicorn / gc.freeze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15)
+
+    def run_probe(self):
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE],
+            capture_output=True, text=True, env=env, cwd=os.getcwd(),
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        runs = [self.run_probe() for _ in range(max(1, options["repeat"]))]
+        probes = [probe for probe, _ in runs]
+        probe, imports = runs[-1]
+
+        ready = [p["ready"] * 1000 for p in probes]
+        self.stdout.write(self.style.MIGRATE_HEADING("Démarrage à froid d'un worker"))
+        self.stdout.write(
+            f"  médiane {statistics.median(ready):.0f} ms "
+            f"(min {min(ready):.0f}, max {max(ready):.0f}, {len(ready)} essais)"
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Mémoire par worker"))
+        own = probe["self"]
+        rss = own["Rss"] if own else probe["maxrss_kb"]
+        self.stdout.write(f"  sans préchargement         RSS    {_mb(rss)} (tout est privé)")
+        for label, key in (("préchargement", "fork"), ("préchargement + gc.freeze", "fork_frozen")):
+            stats = probe[key]
+            if not stats:
+                self.stdout.write(f"  {label:<26} non mesurable sur cette plateforme")
+                continue
+            private = stats.get("Private_Clean", 0) + stats.get("Private_Dirty", 0)
+            shared = stats.get("Shared_Clean", 0) + stats.get("Shared_Dirty", 0)
+            self.stdout.write(f"  {label:<26} privé  {_mb(private)}, partagé {_mb(shared)}")
+
+        top = options["top"]
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Imports les plus longs (cumulé, top {top})"))
+        for name, _, cumulative in sorted(imports, key=lambda r: -r[2])[:top]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        by_package = defaultdict(int)
+        for name, own_us, _ in imports:
+            by_package[name.split(".")[0]] += own_us
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Par paquet (temps propre, top {top})"))
+        for name, own_us in sorted(by_package.items(), key=lambda r: -r[1])[:top]:
+            self.stdout.write(f"  {own_us / 1000:8.1f} ms  {name}")
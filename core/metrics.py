@@ -0,0 +1,165 @@
+# core/metrics.py
+"""
+Signaux de saturation pour l'autoscaler (GET /saturation, cf.
+core.middleware.HealthMiddleware).
+
+Par worker (chaque processus gunicorn a les siens) :
+
+- latence des requêtes sur une fenêtre glissante (p50/p95/p99, débit),
+  gardée dans un tampon circulaire de taille fixe sans verrou : chaque
+  requête prend sa case via `next()` sur un itertools.count (atomique
+  sous le GIL) et y écrit un seul tuple ;
+- taux d'occupation : temps passé à servir des requêtes dans la fenêtre
+  rapporté au temps disponible (threads × fenêtre), et requêtes en cours.
+
+Globaux (base de données) : connexions utilisées / maximum du serveur,
+profondeur des files de fond (outbox des notifications, consultations
+en attente d'attribution). Comptages bornés à SATURATION_QUEUE_CAP et
+mis en cache partagé SATURATION_CACHE_TTL secondes : une sonde fréquente
+ne coûte pas un COUNT(*) à chaque appel.
+"""
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+class LatencyWindow:
+    """Tampon circulaire de (horodatage, durée) ; lecture par copie."""
+
+    def __init__(self, size):
+        self.size = size
+        self._slots = [None] * size
+        self._cursor = itertools.count()
+
+    def record(self, duration, now=None):
+        self._slots[next(self._cursor) % self.size] = (time.monotonic() if now is None else now, duration)
+
+    def window(self, seconds, now=None):
+        """(durées de la fenêtre, durée réellement couverte en secondes)."""
+        now = time.monotonic() if now is None else now
+        start = now - seconds
+        entries = [slot for slot in list(self._slots) if slot is not None and slot[0] >= start]
+        if len(entries) == self.size:
+            # Tampon rempli dans la fenêtre : il ne couvre que depuis sa plus vieille entrée
+            seconds = max(now - min(ts for ts, _ in entries), 1e-3)
+        return np.array([d for _, d in entries], dtype=float), seconds
+
+
+class WorkerStats:
+    def __init__(self):
+        self.latency = LatencyWindow(settings.SATURATION_BUFFER_SIZE)
+        # Requêtes en cours, par thread (écriture/suppression de clé atomiques)
+        self._active = {}
+        self.booted = time.monotonic()
+        # Threads par worker : fixé par gunicorn (post_fork), 1 par défaut
+        self.capacity = 1
+
+    def request_started(self):
+        self._active[threading.get_ident()] = time.monotonic()
+
+    def request_finished(self, duration):
+        self._active.pop(threading.get_ident(), None)
+        self.latency.record(duration)
+
+    def snapshot(self):
+        window = settings.SATURATION_WINDOW_SECONDS
+        seconds = min(window, max(time.monotonic() - self.booted, 1e-3))
+        durations, seconds = self.latency.window(seconds)
+
+        if durations.size:
+            p50, p95, p99 = (float(v) * 1000 for v in np.percentile(durations, [50, 95, 99]))
+        else:
+            p50 = p95 = p99 = None
+        busy = float(durations.sum()) / (seconds * self.capacity)
+
+        return {
+            "pid": os.getpid(),
+            "window_seconds": round(seconds, 1),
+            "requests": int(durations.size),
+            "rps": round(durations.size / seconds, 2),
+            "latency_ms": {
+                "p50": _round(p50), "p95": _round(p95), "p99": _round(p99),
+            },
+            "threads": self.capacity,
+            "in_flight": len(self._active),
+            "busy_ratio": round(min(busy, 1.0), 3),
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+_stats = None
+
+
+def worker_stats():
+    global _stats
+    if _stats is None:
+        _stats = WorkerStats()
+    return _stats
+
+
+# ============================================================
+# BASE DE DONNÉES ET FILES DE FOND
+# ============================================================
+
+_CONNECTION_QUERIES = {
+    "mysql": (
+        "SHOW GLOBAL STATUS LIKE 'Threads_connected'",
+        "SELECT @@max_connections",
+    ),
+    "postgresql": (
+        "SELECT count(*) FROM pg_stat_activity",
+        "SELECT setting::int FROM pg_settings WHERE name = 'max_connections'",
+    ),
+}
+
+
+def database_usage(alias="default"):
+    connection = connections[alias]
+    usage = {
+        "alias": alias,
+        "vendor": connection.vendor,
+        "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE", 0),
+    }
+    queries = _CONNECTION_QUERIES.get(connection.vendor)
+    if queries is None:
+        return usage
+
+    with connection.cursor() as cursor:
+        cursor.execute(queries[0])
+        used = int(cursor.fetchone()[-1])
+        cursor.execute(queries[1])
+        maximum = int(cursor.fetchone()[-1])
+    usage.update(used=used, max=maximum, ratio=round(used / maximum, 3) if maximum else None)
+    return usage
+
+
+def queue_depths():
+    from .models import Consultation, OutboxEvent
+
+    # Comptage borné : au-delà du plafond, la file est de toute façon saturée
+    cap = settings.SATURATION_QUEUE_CAP
+    return {
+        "outbox": OutboxEvent.objects.order_by()[:cap].count(),
+        "unassigned_consultations": (
+            Consultation.objects.filter(status="pending", expert__isnull=True).order_by()[:cap].count()
+        ),
+        "cap": cap,
+    }
+
+
+def saturation():
+    shared = cache.get_or_set(
+        "saturation:shared",
+        lambda: {"database": database_usage(), "queues": queue_depths()},
+        settings.SATURATION_CACHE_TTL,
+    )
+    return {"worker": worker_stats().snapshot(), **shared}
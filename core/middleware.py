@@ -0,0 +1,221 @@
+# core/middleware.py
+import gzip
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip seul
+    brotli = None
+
+
+# ============================================================
+# COMPRESSION DES RÉPONSES (réseaux 2G/3G)
+# ============================================================
+
+# Types de l'API seulement : les pages HTML (admin, API navigable) portent
+# un jeton CSRF, et leur compression les exposerait à BREACH
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/x-ndjson")
+
+
+class CompressionStats:
+    """Octets économisés et CPU de compression, par endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def record(self, endpoint, encoding, size_in, size_out, cpu):
+        with self._lock:
+            row = self._data.setdefault(
+                (endpoint, encoding), {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_ms": 0.0}
+            )
+            row["responses"] += 1
+            row["bytes_in"] += size_in
+            row["bytes_out"] += size_out
+            row["cpu_ms"] += cpu * 1000
+
+    def snapshot(self):
+        with self._lock:
+            rows = [
+                {"endpoint": endpoint, "encoding": encoding, **row}
+                for (endpoint, encoding), row in self._data.items()
+            ]
+
+        for row in rows:
+            row["bytes_saved"] = row["bytes_in"] - row["bytes_out"]
+            row["ratio"] = round(row["bytes_out"] / row["bytes_in"], 3) if row["bytes_in"] else None
+            row["cpu_ms_per_response"] = round(row["cpu_ms"] / row["responses"], 3)
+            row["cpu_ms"] = round(row["cpu_ms"], 3)
+        return sorted(rows, key=lambda r: -r["bytes_saved"])
+
+
+compression_stats = CompressionStats()
+
+
+def _level(encoding, size):
+    """Niveau adapté à la taille : fort pour les petits corps, léger pour les gros."""
+    for max_size, levels in settings.COMPRESSION_LEVELS:
+        if max_size is None or size <= max_size:
+            return levels[encoding]
+
+
+def _qvalue(params):
+    """Poids `q` d'un élément d'Accept-Encoding (1 par défaut, 0 si illisible)."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _accepted_encoding(request):
+    accepted = {}
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, *params = part.split(";")
+        # Seul q=0 (ou 0.0, 0.000…) est un refus
+        accepted[name.strip().lower()] = _qvalue(params) > 0
+    if brotli is not None and accepted.get("br"):
+        return "br"
+    if accepted.get("gzip"):
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compression gzip/brotli négociée via Accept-Encoding, au-delà de
+    COMPRESSION_MIN_SIZE octets, avec niveau choisi selon la taille,
+    pour les seuls types de COMPRESSIBLE_TYPES.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+            or not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = _accepted_encoding(request)
+        if encoding is None:
+            return response
+
+        content = response.content
+        level = _level(encoding, len(content))
+
+        start = time.thread_time()
+        if encoding == "br":
+            compressed = brotli.compress(content, quality=level)
+        else:
+            compressed = gzip.compress(content, compresslevel=level, mtime=0)
+        cpu = time.thread_time() - start
+
+        if len(compressed) >= len(content):
+            return response
+
+        match = getattr(request, "resolver_match", None)
+        endpoint = f"{request.method} {match.route if match else request.path}"
+        compression_stats.record(endpoint, encoding, len(content), len(compressed), cpu)
+
+        response.content = compressed
+        response["Content-Encoding"] = encoding
+        response["Content-Length"] = str(len(compressed))
+        return response
+
+
+# ============================================================
+# SANTÉ, DISPONIBILITÉ ET SATURATION (répartiteur, autoscaler)
+# ============================================================
+
+class HealthMiddleware:
+    """
+    Premier de MIDDLEWARE : répond aux sondes avant CORS, sessions,
+    authentification et routage, et chronomètre les autres requêtes
+    (core.metrics).
+
+    HEALTH_LIVE_PATH    processus vivant, sans aucune E/S
+    HEALTH_READY_PATH   base joignable et migrations appliquées (503 sinon)
+    SATURATION_PATH     charge du worker, connexions, files de fond
+                        (X-Saturation-Token = SATURATION_TOKEN exigé)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.stats = metrics.worker_stats()
+        self.probes = {
+            settings.HEALTH_LIVE_PATH: self.live,
+            settings.HEALTH_READY_PATH: self.ready,
+            settings.SATURATION_PATH: self.saturation,
+        }
+        self.migrated = False
+
+    def __call__(self, request):
+        probe = self.probes.get(request.path_info)
+        if probe is not None:
+            response = probe(request)
+            response["Cache-Control"] = "no-store"
+            return response
+
+        start = time.perf_counter()
+        self.stats.request_started()
+        try:
+            return self.get_response(request)
+        finally:
+            self.stats.request_finished(time.perf_counter() - start)
+
+    def live(self, request):
+        return JsonResponse({"status": "ok"})
+
+    def ready(self, request):
+        checks = {}
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            checks["database"] = "ok"
+            checks["migrations"] = self.pending_migrations()
+        except DatabaseError as exc:
+            checks.setdefault("database", str(exc))
+
+        ok = all(value == "ok" for value in checks.values())
+        return JsonResponse(
+            {"status": "ok" if ok else "unavailable", "checks": checks},
+            status=200 if ok else 503,
+        )
+
+    def pending_migrations(self):
+        # Vérifié jusqu'au premier succès : une migration appliquée le reste
+        if not self.migrated:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            if plan:
+                return f"{len(plan)} migration(s) en attente"
+            self.migrated = True
+        return "ok"
+
+    def saturation(self, request):
+        # Sans jeton configuré, la sonde est fermée (pas d'accès anonyme)
+        token = settings.SATURATION_TOKEN
+        if not token or not hmac.compare_digest(request.headers.get("X-Saturation-Token", ""), token):
+            return JsonResponse({"detail": "Jeton de supervision invalide."}, status=403)
+        return JsonResponse(metrics.saturation())
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_inbox(apps, schema_editor):
+    Consultation = apps.get_model('core', 'Consultation')
+    Message = apps.get_model('core', 'Message')
+
+    # L'historique existant est considéré comme lu
+    Message.objects.update(read_at=models.F('created_at'))
+
+    for consultation in Consultation.objects.only('id', 'created_at').iterator():
+        last = (
+            Message.objects.filter(consultation_id=consultation.id)
+            .order_by('-created_at', '-id')
+            .only('id', 'created_at')
+            .first()
+        )
+        Consultation.objects.filter(pk=consultation.id).update(
+            last_message=last,
+            last_activity_at=last.created_at if last else consultation.created_at,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_consultationtransition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultation',
+            name='expert_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message'),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='paysan_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['expert', '-last_activity_at'], name='consult_expert_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['paysan', '-last_activity_at'], name='consult_paysan_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['consultation', 'receiver', 'read_at'], name='message_unread_idx'),
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:42
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Expert = apps.get_model('core', 'Expert')
+    Consultation = apps.get_model('core', 'Consultation')
+    Module = apps.get_model('core', 'Module')
+
+    for expert in Expert.objects.iterator():
+        counts = Consultation.objects.filter(expert_id=expert.user_id).aggregate(
+            open=Count('id', filter=Q(status__in=('pending', 'accepted'))),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+        Expert.objects.filter(pk=expert.pk).update(
+            open_consultations=counts['open'],
+            completed_consultations=counts['completed'],
+            modules_published=Module.objects.filter(expert_id=expert.user_id).count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_messagearchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expert',
+            name='completed_consultations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='expert',
+            name='disponible',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='expert',
+            name='modules_published',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='expert',
+            name='open_consultations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='expert',
+            index=models.Index(fields=['domaine', 'experience'], name='expert_directory_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
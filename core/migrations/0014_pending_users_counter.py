@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:49
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_pending_users(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Counter = apps.get_model('core', 'Counter')
+
+    counts = dict(
+        User.objects.filter(is_verified=False)
+        .values_list('role').annotate(n=Count('id'))
+    )
+    for role in ('paysan', 'expert', 'admin'):
+        Counter.objects.create(name=f'pending_users:{role}', value=counts.get(role, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_user_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_verified', 'id'], name='user_review_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_verified', 'role', 'id'], name='user_review_role_idx'),
+        ),
+        migrations.RunPython(backfill_pending_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_region_gazetteer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultation',
+            name='assigned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='domaine',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='previous_expert',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='expert',
+            name='avg_response_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('consultation_assigned', 'Consultation attribuée'), ('consultation_accepted', 'Consultation acceptée'), ('consultation_rejected', 'Consultation rejetée'), ('consultation_completed', 'Consultation terminée'), ('message_created', 'Nouveau message')], max_length=40),
+        ),
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='kind',
+            field=models.CharField(choices=[('consultation_assigned', 'Consultation attribuée'), ('consultation_accepted', 'Consultation acceptée'), ('consultation_rejected', 'Consultation rejetée'), ('consultation_completed', 'Consultation terminée'), ('message_created', 'Nouveau message')], max_length=40),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['status', 'expert', '-priority', 'created_at'], name='consult_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['status', 'assigned_at'], name='consult_sla_idx'),
+        ),
+    ]
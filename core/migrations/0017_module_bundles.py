@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_consultation_assignment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='checksum',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='type_culture',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='moduleupload',
+            name='type_culture',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.CreateModel(
+            name='ModuleBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('culture', models.SlugField(max_length=150)),
+                ('version', models.PositiveIntegerField()),
+                ('base_version', models.PositiveIntegerField(blank=True, null=True)),
+                ('fichier', models.FileField(upload_to='bundles/')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('checksum', models.CharField(max_length=64)),
+                ('manifest', models.JSONField(default=list)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['culture', '-version'], name='bundle_latest_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='modulebundle',
+            constraint=models.UniqueConstraint(fields=('culture', 'version', 'base_version'), name='bundle_version_uniq'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_user_token_generation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('action', models.CharField(max_length=64)),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('target_type', models.CharField(blank=True, default='', max_length=100)),
+                ('target_id', models.CharField(blank=True, default='', max_length=64)),
+                ('data', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='audit_time_idx'), models.Index(fields=['target_type', 'target_id', 'created_at'], name='audit_target_idx'), models.Index(fields=['actor_id', 'created_at'], name='audit_actor_idx')],
+            },
+        ),
+    ]
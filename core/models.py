@@ -1,10 +1,36 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+import hashlib
+import json
+import os
+import uuid
+import zlib
+from collections import Counter as Tally
+
+from django.conf import settings
+
+from django.core.cache import cache
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Count, Subquery, Value, When
+from django.db.models.functions import Cast, Concat, Left, Lower
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from . import audit, geo
+from .cache import bump_generation
 
 
 # =====================================================
 # USER
 # =====================================================
+class ActiveUserManager(UserManager):
+    """Comptes non supprimés (cf. User.soft_delete)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ('paysan', 'Paysan'),
@@ -16,33 +42,361 @@ class User(AbstractUser):
     phone = models.CharField(max_length=20, blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
     is_verified = models.BooleanField(default=False)
+    # Incrémentée pour révoquer tous les jetons JWT du compte (core.token)
+    token_generation = models.PositiveIntegerField(default=0)
+    # Suppression logique : masqué partout, lignes purgées par `purge_users`
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # Gestionnaire par défaut sans les comptes supprimés (vues, auth, JWT) ;
+    # `all_objects` pour la maintenance
+    objects = ActiveUserManager()
+    all_objects = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Unicité d'email insensible à la casse sans balayage de table
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            # File de validation admin : parcours par clé (id) filtré par rôle
+            models.Index(fields=['is_verified', 'id'], name='user_review_queue_idx'),
+            models.Index(fields=['is_verified', 'role', 'id'], name='user_review_role_idx'),
+        ]
 
     def __str__(self):
         return f"{self.username} ({self.role})"
 
+    @staticmethod
+    def normalize_email_key(email):
+        return (email or '').strip().lower()
+
+    @classmethod
+    def existing_emails(cls, emails):
+        """Emails (normalisés) déjà utilisés : une requête sur l'index LOWER(email)."""
+        keys = {cls.normalize_email_key(e) for e in emails if e}
+        if not keys:
+            return set()
+        return set(
+            cls.objects.annotate(email_key=Lower('email'))
+            .filter(email_key__in=keys)
+            .values_list('email_key', flat=True)
+        )
+
+    # Compteur des comptes en attente de validation, par rôle
+    @staticmethod
+    def pending_counter(role):
+        return f'pending_users:{role}'
+
+    @classmethod
+    def bump_pending(cls, role, delta=1):
+        Counter.bump(cls.pending_counter(role), delta)
+
+    @classmethod
+    def pending_count(cls, role=None):
+        roles = [role] if role else [r for r, _ in cls.ROLE_CHOICES]
+        return Counter.total(cls.pending_counter(r) for r in roles)
+
+    # Champs qui décident de la présence du compte dans la file de validation
+    PENDING_FIELDS = ('is_verified', 'role', 'deleted_at')
+
+    @staticmethod
+    def _pending_role(is_verified, role, deleted_at):
+        return role if not is_verified and deleted_at is None else None
+
+    def save(self, *args, **kwargs):
+        """
+        Tient le compteur de la file de validation pour toute écriture par
+        save() (create_user, admin, serializers) : compare l'état en base
+        (rôle, validé, supprimé) à l'état enregistré, même transaction.
+        Les UPDATE groupés (verify, soft_delete, import) le font eux-mêmes.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(update_fields) & set(self.PENDING_FIELDS):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            old = None
+            if not self._state.adding:
+                row = User.all_objects.filter(pk=self.pk).values_list(*self.PENDING_FIELDS).first()
+                old = self._pending_role(*row) if row else None
+            super().save(*args, **kwargs)
+            new = self._pending_role(self.is_verified, self.role, self.deleted_at)
+            if old != new:
+                if old:
+                    User.bump_pending(old, -1)
+                if new:
+                    User.bump_pending(new)
+
+    def verify(self, actor=None):
+        """Valide le compte ; False s'il l'était déjà (compteur inchangé)."""
+        with transaction.atomic():
+            updated = User.objects.filter(pk=self.pk, is_verified=False).update(is_verified=True)
+            if updated:
+                User.bump_pending(self.role, -1)
+                audit.record('user.verified', actor, self, role=self.role)
+        self.is_verified = True
+        return bool(updated)
+
+    @staticmethod
+    def revoke_tokens(user_id):
+        """Invalide tous les jetons (access et refresh) émis pour ce compte."""
+        User.all_objects.filter(pk=user_id).update(token_generation=F('token_generation') + 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            # Compte déjà supprimé logiquement : compteur déjà décrémenté
+            if not self.is_verified and self.deleted_at is None:
+                User.bump_pending(self.role, -1)
+        return result
+
+    def soft_delete(self, actor=None):
+        """
+        Suppression immédiate et sans cascade : le compte et ses lignes
+        disparaissent des requêtes (gestionnaires par défaut), la commande
+        `purge_users` les supprime ensuite par lots. False si déjà fait.
+        """
+        if not User.soft_delete_many([self.pk], actor):
+            return False
+        self.deleted_at, self.is_active, self.username = (
+            User.all_objects.filter(pk=self.pk).values_list('deleted_at', 'is_active', 'username').get()
+        )
+        return True
+
+    @classmethod
+    def soft_delete_many(cls, pks, actor=None):
+        """
+        Suppression logique groupée (un UPDATE, une transaction, un
+        bulk_create d'audit) ; renvoie le nombre de comptes supprimés.
+        """
+        with transaction.atomic():
+            rows = list(
+                cls.all_objects.filter(pk__in=pks, deleted_at__isnull=True)
+                .select_for_update().values_list('id', 'username', 'role', 'is_verified')
+            )
+            if not rows:
+                return 0
+            ids = [pk for pk, *_ in rows]
+
+            # Libère le nom d'utilisateur (unique) pour une nouvelle inscription
+            cls.all_objects.filter(pk__in=ids).update(
+                deleted_at=timezone.now(), is_active=False,
+                username=Left(Concat(
+                    Value('deleted-'), Cast('id', models.CharField()), Value('-'), F('username'),
+                    output_field=models.CharField(),
+                ), 150),
+            )
+            for role, n in Tally(role for _, _, role, verified in rows if not verified).items():
+                cls.bump_pending(role, -n)
+
+            # Consultations ouvertes des comptes : plus dans la charge de leur expert
+            open_by_expert = (
+                Consultation._base_manager
+                .filter(paysan_id__in=ids, status__in=Consultation.OPEN_STATUSES, expert__isnull=False)
+                .values_list('expert_id').annotate(n=Count('id')).order_by()
+            )
+            for expert_id, n in open_by_expert:
+                Expert.bump(expert_id, open_consultations=-n)
+
+            Region.invalidate_aggregates(
+                *Paysan._base_manager.filter(user_id__in=ids).values_list('region_ref_id', flat=True).distinct()
+            )
+            bump_generation('experts')
+            bump_generation('modules')
+            audit.record_many(
+                audit.event('user.deleted', actor, User(pk=pk), username=username, role=role)
+                for pk, username, role, _ in rows
+            )
+        return len(rows)
+
+    @classmethod
+    def recount_pending(cls):
+        counts = dict(
+            cls.objects.filter(is_verified=False)
+            .values_list('role').annotate(n=Count('id'))
+        )
+        for role, _ in cls.ROLE_CHOICES:
+            Counter.objects.update_or_create(
+                name=cls.pending_counter(role), defaults={'value': counts.get(role, 0)}
+            )
+
+
+# =====================================================
+# COMPTEURS ENTRETENUS (évite les COUNT(*) sur les grosses tables)
+# =====================================================
+class Counter(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+    @staticmethod
+    def bump(name, delta=1):
+        if not delta:
+            return
+        if not Counter.objects.filter(name=name).update(value=F('value') + delta):
+            Counter.objects.get_or_create(name=name)
+            Counter.objects.filter(name=name).update(value=F('value') + delta)
+
+    @staticmethod
+    def total(names):
+        rows = Counter.objects.filter(name__in=list(names)).values_list('value', flat=True)
+        return max(sum(rows), 0)
+
+
+class LiveOwnerManager(models.Manager):
+    """
+    Gestionnaire par défaut des lignes rattachées à un utilisateur : exclut
+    celles d'un compte supprimé en attente de purge. Sous-requête plutôt
+    que jointure : les UPDATE conditionnels restent une seule requête.
+    """
+
+    def __init__(self, *user_fields):
+        super().__init__()
+        self.user_fields = user_fields
+
+    def get_queryset(self):
+        deleted = User.all_objects.filter(deleted_at__isnull=False).values('id')
+        queryset = super().get_queryset()
+        for field in self.user_fields:
+            queryset = queryset.exclude(**{f'{field}__in': deleted})
+        return queryset
+
+
+# =====================================================
+# RÉGIONS (GAZETTEER) + POSITION GÉOGRAPHIQUE
+# =====================================================
+class Region(models.Model):
+    """Région normalisée ; `aliases` : autres graphies rencontrées."""
+    code = models.SlugField(max_length=100, unique=True)
+    name = models.CharField(max_length=100)
+    aliases = models.JSONField(default=list, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    CACHE_KEY = 'region_gazetteer'
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def normalize(name):
+        # « Thiès », « THIES », « thies » → « thies »
+        return slugify(name or '')
+
+    @classmethod
+    def lookup(cls):
+        """Table {nom normalisé: id}, en cache (quelques dizaines de lignes)."""
+        table = cache.get(cls.CACHE_KEY)
+        if table is None:
+            table = {}
+            for pk, code, name, aliases in cls.objects.values_list('id', 'code', 'name', 'aliases'):
+                for key in (code, name, *aliases):
+                    table.setdefault(cls.normalize(key), pk)
+            cache.set(cls.CACHE_KEY, table, None)
+        return table
+
+    @classmethod
+    def resolve_id(cls, name):
+        return cls.lookup().get(cls.normalize(name))
+
+    @staticmethod
+    def aggregates_key(region_id):
+        return f'region_aggregates:{region_id}'
+
+    @staticmethod
+    def invalidate_aggregates(*region_ids):
+        keys = {Region.aggregates_key(pk) for pk in region_ids if pk is not None}
+        if keys:
+            # Après commit : un lecteur concurrent ne recache pas l'ancien état
+            transaction.on_commit(lambda: cache.delete_many(list(keys)))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(Region.CACHE_KEY)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        cache.delete(Region.CACHE_KEY)
+        return result
+
+
+class Localisable(models.Model):
+    """Position optionnelle, indexée par geohash (recherche par préfixe)."""
+    latitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def has_position(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def save(self, *args, **kwargs):
+        self.geohash = geo.encode(self.latitude, self.longitude) if self.has_position else ''
+        super().save(*args, **kwargs)
+
 
 # =====================================================
 # PAYSAN (NOUVEAU)
 # =====================================================
-class Paysan(models.Model):
+class Paysan(Localisable):
     user = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
         related_name="paysan_profile"
     )
     region = models.CharField(max_length=100)
+    region_ref = models.ForeignKey(
+        Region,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='paysans',
+    )
     type_culture = models.CharField(max_length=150)
     superficie = models.FloatField(help_text="Superficie en hectares")
     experience = models.IntegerField(help_text="Années d'expérience agricole")
 
+    objects = LiveOwnerManager('user')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['region_ref', 'type_culture'], name='paysan_region_culture_idx'),
+        ]
+
     def __str__(self):
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        # Le texte saisi reste la source ; la région normalisée en est déduite
+        old_region_id = None
+        if self.pk:
+            old_region_id = Paysan.objects.filter(pk=self.pk).values_list('region_ref_id', flat=True).first()
+        self.region_ref_id = Region.resolve_id(self.region)
+
+        super().save(*args, **kwargs)
+        Region.invalidate_aggregates(old_region_id, self.region_ref_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Region.invalidate_aggregates(self.region_ref_id)
+        return result
+
 
 # =====================================================
 # EXPERT
 # =====================================================
-class Expert(models.Model):
+class Expert(Localisable):
     user = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
@@ -51,10 +405,92 @@ class Expert(models.Model):
     domaine = models.CharField(max_length=200)
     experience = models.IntegerField()
     description = models.TextField()
+    disponible = models.BooleanField(default=True)
+
+    # Compteurs dénormalisés (annuaire sans COUNT par ligne)
+    open_consultations = models.PositiveIntegerField(default=0)
+    completed_consultations = models.PositiveIntegerField(default=0)
+    modules_published = models.PositiveIntegerField(default=0)
+
+    # Délai moyen (EMA) entre attribution et réponse, pour l'ordonnanceur
+    avg_response_seconds = models.FloatField(null=True, blank=True)
+
+    objects = LiveOwnerManager('user')
+
+    # Tranches d'expérience pour les facettes : (libellé, min, max)
+    EXPERIENCE_RANGES = (
+        ('0-2', 0, 2),
+        ('3-5', 3, 5),
+        ('6-10', 6, 10),
+        ('10+', 11, None),
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['domaine', 'experience'], name='expert_directory_idx'),
+        ]
 
     def __str__(self):
         return self.user.username
 
+    # Annuaire en cache invalidé à chaque écriture du profil ; les
+    # compteurs (Expert.bump) se rafraîchissent à l'expiration
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_generation('experts')
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_generation('experts')
+        return result
+
+    @staticmethod
+    def record_response(user_id, seconds):
+        """Moyenne mobile exponentielle du délai de réponse, en un UPDATE."""
+        if user_id is None:
+            return
+        alpha = settings.ASSIGNMENT_RESPONSE_EMA_ALPHA
+        Expert.objects.filter(user_id=user_id).update(avg_response_seconds=Case(
+            When(avg_response_seconds__isnull=True, then=Value(seconds)),
+            default=F('avg_response_seconds') * (1 - alpha) + seconds * alpha,
+            output_field=models.FloatField(),
+        ))
+
+    @staticmethod
+    def bump(user_id, **deltas):
+        """
+        Incrémente les compteurs de l'expert `user_id` en un UPDATE
+        (à appeler dans la transaction du changement d'état).
+        """
+        if user_id is None or not deltas:
+            return
+        Expert.objects.filter(user_id=user_id).update(**{
+            field: Expert._floored(field, delta)
+            for field, delta in deltas.items()
+        })
+        # Compteurs affichés par l'annuaire en cache (ExpertViewSet)
+        bump_generation('experts')
+
+    @staticmethod
+    def _floored(field, delta):
+        # Plancher à 0 sans passer par une valeur négative (colonnes non signées sous MySQL)
+        if delta >= 0:
+            return F(field) + delta
+        return Case(When(**{f'{field}__gte': -delta}, then=F(field) + delta), default=Value(0))
+
+    def recount(self):
+        """Recalcule les compteurs depuis les tables sources."""
+        counts = Consultation.objects.filter(expert_id=self.user_id).aggregate(
+            open=Count('id', filter=Q(status__in=Consultation.OPEN_STATUSES)),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+        self.open_consultations = counts['open']
+        self.completed_consultations = counts['completed']
+        self.modules_published = Module.objects.filter(expert_id=self.user_id).count()
+        self.save(update_fields=[
+            'open_consultations', 'completed_consultations', 'modules_published'
+        ])
+
 
 # =====================================================
 # CONSULTATION
@@ -85,9 +521,240 @@ class Consultation(models.Model):
     status = models.CharField(max_length=20, choices=STATUS, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Résumé dénormalisé pour la boîte de réception (maintenu à chaque message)
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    paysan_unread = models.PositiveIntegerField(default=0)
+    expert_unread = models.PositiveIntegerField(default=0)
+
+    # Attribution automatique (commande assign_consultations)
+    domaine = models.CharField(max_length=200, blank=True, default='')
+    priority = models.PositiveSmallIntegerField(default=0)
+    assigned_at = models.DateTimeField(null=True, blank=True)
+    previous_expert = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+
+    objects = LiveOwnerManager('paysan', 'expert')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expert', '-last_activity_at'], name='consult_expert_inbox_idx'),
+            models.Index(fields=['paysan', '-last_activity_at'], name='consult_paysan_inbox_idx'),
+            # Files d'attente : non attribuées par priorité, attribuées par ancienneté (SLA)
+            models.Index(fields=['status', 'expert', '-priority', 'created_at'], name='consult_queue_idx'),
+            models.Index(fields=['status', 'assigned_at'], name='consult_sla_idx'),
+        ]
+
+    # Machine à états : statut cible -> statuts de départ autorisés
+    TRANSITIONS = {
+        'accepted': ('pending',),
+        'rejected': ('pending',),
+        'completed': ('accepted',),
+    }
+
+    # Consultations comptées dans Expert.open_consultations
+    OPEN_STATUSES = ('pending', 'accepted')
+
+    # Effet d'une transition sur les compteurs de l'expert assigné
+    COUNTER_DELTAS = {
+        'rejected': {'open_consultations': -1},
+        'completed': {'open_consultations': -1, 'completed_consultations': 1},
+    }
+
     def __str__(self):
         return self.sujet
 
+    def transition(self, to_status, actor=None):
+        """
+        Applique une transition par UPDATE conditionnel
+        (WHERE id=? AND status=? AND expert_id=?) qui n'écrit que la
+        colonne `status`, puis trace le passage dans l'historique (même
+        transaction). Lève TransitionConflict si le statut ou l'expert
+        assigné (réattribution par l'ordonnanceur) a changé entre-temps.
+        """
+        with transaction.atomic():
+            for from_status in self.TRANSITIONS.get(to_status, ()):
+                updated = Consultation.objects.filter(
+                    pk=self.pk, status=from_status, expert_id=self.expert_id
+                ).update(status=to_status)
+
+                if updated:
+                    ConsultationTransition.objects.create(
+                        consultation_id=self.pk,
+                        from_status=from_status,
+                        to_status=to_status,
+                        actor=actor,
+                    )
+                    Expert.bump(self.expert_id, **self.COUNTER_DELTAS.get(to_status, {}))
+                    # Déjà tracée par ConsultationTransition : audit par lots
+                    audit.record(
+                        f'consultation.{to_status}', actor, self, durable=False, from_status=from_status,
+                    )
+
+                    # Délai de réponse d'une consultation attribuée par l'ordonnanceur
+                    if from_status == 'pending' and self.assigned_at is not None:
+                        Expert.record_response(
+                            self.expert_id, (timezone.now() - self.assigned_at).total_seconds()
+                        )
+
+                    # Notification de l'autre partie (outbox, même transaction)
+                    recipient_id = (
+                        self.expert_id
+                        if to_status == 'completed' and actor is not None and actor.pk == self.paysan_id
+                        else self.paysan_id
+                    )
+                    if recipient_id is not None:
+                        OutboxEvent.objects.create(
+                            kind=f'consultation_{to_status}',
+                            recipient_id=recipient_id,
+                            consultation_id=self.pk,
+                            payload={'sujet': self.sujet},
+                        )
+
+                    self.status = to_status
+                    return from_status
+
+        raise TransitionConflict(to_status)
+
+    def record_messages(self, messages):
+        """
+        Met à jour le résumé de la boîte de réception après la création
+        de `messages` (ordre chronologique) : un seul UPDATE incrémental.
+        Publie aussi un événement outbox par message pour le destinataire.
+        """
+        last = messages[-1]
+        to_paysan = sum(1 for m in messages if m.receiver_id == self.paysan_id)
+
+        if last.pk is None:
+            # bulk_create sans RETURNING (MySQL) : relire l'id en sous-requête
+            last_message = Subquery(
+                Message.objects.filter(consultation=self.pk).order_by('-id').values('id')[:1]
+            )
+        else:
+            last_message = last
+
+        Consultation.objects.filter(pk=self.pk).update(
+            last_message=last_message,
+            last_activity_at=last.created_at,
+            paysan_unread=F('paysan_unread') + to_paysan,
+            expert_unread=F('expert_unread') + (len(messages) - to_paysan),
+        )
+
+        OutboxEvent.objects.bulk_create(
+            OutboxEvent(
+                kind='message_created',
+                recipient_id=m.receiver_id,
+                consultation_id=self.pk,
+                payload={'sender': m.sender_id, 'preview': m.content[:80]},
+            )
+            for m in messages
+        )
+
+    def mark_read(self, user):
+        """
+        Accusé de lecture : marque lus les messages reçus par `user`. Le
+        compteur baisse du nombre de messages réellement marqués : un
+        message arrivé entre-temps reste compté s'il n'a pas été marqué.
+        """
+        unread_field = 'expert_unread' if user.pk == self.expert_id else 'paysan_unread'
+
+        with transaction.atomic():
+            count = Message.objects.filter(
+                consultation=self,
+                receiver=user,
+                read_at__isnull=True
+            ).update(read_at=timezone.now())
+            if count:
+                # Plancher à 0 sans soustraction négative (colonne non signée sous MySQL)
+                Consultation.objects.filter(pk=self.pk).update(**{unread_field: Case(
+                    When(**{f'{unread_field}__gt': count}, then=F(unread_field) - count),
+                    default=Value(0),
+                )})
+
+        return count
+
+    def counter_deltas(self, sign=1):
+        """Contribution de cette consultation aux compteurs de son expert."""
+        if self.status in self.OPEN_STATUSES:
+            return {'open_consultations': sign}
+        if self.status == 'completed':
+            return {'completed_consultations': sign}
+        return {}
+
+    def message_history(self, after=None):
+        """
+        Historique complet (archives + table chaude) trié par date.
+        Les archives ne sont lues que si la consultation en possède.
+        `after` (id de message) : reprise, filtrée en base ; les archives
+        entièrement antérieures au message de reprise ne sont pas lues.
+        """
+        archives = self.message_archives.all()
+        messages = self.messages.order_by('created_at', 'id')
+        if after is not None:
+            anchor = self.messages.filter(pk=after).values_list('created_at', flat=True).first()
+            if anchor is not None:
+                archives = archives.filter(last_created_at__gte=anchor)
+            messages = messages.filter(pk__gt=after)
+
+        rows = []
+        for archive in archives:
+            rows.extend(r for r in archive.unpack() if after is None or r['id'] > after)
+
+        for row in messages.values(*MessageArchive.COLUMNS):
+            row['archived'] = False
+            rows.append(row)
+
+        rows.sort(key=lambda r: (r['created_at'], r['id']))
+        return rows
+
+
+class TransitionConflict(Exception):
+    """Statut incompatible avec la transition (ou course perdue)."""
+
+
+# =====================================================
+# HISTORIQUE DES TRANSITIONS (APPEND-ONLY)
+# =====================================================
+class ConsultationTransition(models.Model):
+    consultation = models.ForeignKey(
+        Consultation,
+        on_delete=models.CASCADE,
+        related_name='transitions'
+    )
+    from_status = models.CharField(max_length=20, choices=Consultation.STATUS)
+    to_status = models.CharField(max_length=20, choices=Consultation.STATUS)
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='consultation_transitions',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+
+    def __str__(self):
+        return f"{self.consultation_id}: {self.from_status} → {self.to_status}"
+
+    def save(self, *args, **kwargs):
+        # Historique en ajout seul : aucune réécriture d'une ligne existante
+        if self.pk is not None:
+            raise ValueError("L'historique des transitions est en ajout seul")
+        super().save(*args, **kwargs)
+
 
 # =====================================================
 # MESSAGE
@@ -110,6 +777,14 @@ class Message(models.Model):
     )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveOwnerManager('sender', 'receiver')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['consultation', 'receiver', 'read_at'], name='message_unread_idx'),
+        ]
 
     def __str__(self):
         return self.content[:20]
@@ -127,7 +802,292 @@ class Module(models.Model):
     titre = models.CharField(max_length=255)
     description = models.TextField()
     fichier = models.FileField(upload_to="modules/")
+    # Culture visée (vide : guide général, inclus dans tous les paquets)
+    type_culture = models.CharField(max_length=150, blank=True, default='')
+    checksum = models.CharField(max_length=64, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = LiveOwnerManager('expert')
 
     def __str__(self):
         return self.titre
+
+    @property
+    def culture_key(self):
+        return slugify(self.type_culture)
+
+    def compute_checksum(self):
+        digest = hashlib.sha256()
+        for chunk in self.fichier.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    # Listes en cache (ModuleViewSet, tableau de bord) invalidées à l'écriture
+    def save(self, *args, **kwargs):
+        if self.fichier:
+            old_name = None
+            if self.pk:
+                old_name = Module.objects.filter(pk=self.pk).values_list('fichier', flat=True).first()
+            # Empreinte SHA-256 du fichier (paquets hors ligne), recalculée s'il change
+            if not self.checksum or old_name != self.fichier.name:
+                self.checksum = self.compute_checksum()
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'checksum'}
+        super().save(*args, **kwargs)
+        bump_generation('modules')
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_generation('modules')
+        return result
+
+
+# =====================================================
+# PAQUETS HORS LIGNE DES MODULES (par culture)
+# =====================================================
+class ModuleBundle(models.Model):
+    """
+    Archive zip des modules d'une culture à une version donnée.
+    `base_version` vide : paquet complet ; sinon delta depuis cette version
+    (fichiers ajoutés ou modifiés + liste des modules retirés).
+    """
+    culture = models.SlugField(max_length=150)
+    version = models.PositiveIntegerField()
+    base_version = models.PositiveIntegerField(null=True, blank=True)
+    fichier = models.FileField(upload_to="bundles/")
+    size = models.PositiveBigIntegerField(default=0)
+    checksum = models.CharField(max_length=64)
+    # Manifeste complet à `version` : [{id, titre, filename, checksum, …}]
+    manifest = models.JSONField(default=list)
+    fingerprint = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['culture', 'version', 'base_version'], name='bundle_version_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['culture', '-version'], name='bundle_latest_idx'),
+        ]
+
+    def __str__(self):
+        base = f" depuis v{self.base_version}" if self.base_version else ""
+        return f"{self.culture} v{self.version}{base}"
+
+    @property
+    def is_delta(self):
+        return self.base_version is not None
+
+
+# =====================================================
+# NOTIFICATIONS : OUTBOX + FIL IN-APP
+# =====================================================
+class OutboxEvent(models.Model):
+    """
+    Événement écrit dans la transaction du changement d'état, puis
+    consommé (et supprimé) par `dispatch_notifications`, hors du
+    chemin de requête : la table ne contient que le travail en attente.
+    """
+    KINDS = (
+        ('consultation_assigned', 'Consultation attribuée'),
+        ('consultation_accepted', 'Consultation acceptée'),
+        ('consultation_rejected', 'Consultation rejetée'),
+        ('consultation_completed', 'Consultation terminée'),
+        ('message_created', 'Nouveau message'),
+    )
+
+    kind = models.CharField(max_length=40, choices=KINDS)
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='outbox_events'
+    )
+    consultation = models.ForeignKey(
+        Consultation,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} → {self.recipient_id}"
+
+
+class Notification(models.Model):
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    kind = models.CharField(max_length=40, choices=OutboxEvent.KINDS)
+    consultation = models.ForeignKey(
+        Consultation,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveOwnerManager('recipient')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-updated_at'], name='notification_feed_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+# =====================================================
+# TÉLÉVERSEMENT REPRENABLE D'UN MODULE (par morceaux)
+# =====================================================
+class ModuleUpload(models.Model):
+    STATUS = (
+        ('uploading', 'En cours'),
+        ('completed', 'Terminé'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    expert = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='module_uploads'
+    )
+    titre = models.CharField(max_length=255)
+    description = models.TextField()
+    type_culture = models.CharField(max_length=150, blank=True, default='')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS, default='uploading')
+    module = models.ForeignKey(
+        Module,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = LiveOwnerManager('expert')
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def temp_path(self):
+        return self.temp_paths([self.id])[0]
+
+    @classmethod
+    def temp_paths(cls, pks):
+        """Fichiers partiels des téléversements `pks` (lus aussi par la purge)."""
+        return [
+            os.path.join(settings.MODULE_UPLOAD_TEMP_DIR, f"{cls._meta.pk.to_python(pk)}.part")
+            for pk in pks
+        ]
+
+    def discard(self):
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+# =====================================================
+# JOURNAL D'AUDIT (AJOUT SEUL, ÉCRIT PAR LOTS : core.audit)
+# =====================================================
+class AuditEvent(models.Model):
+    created_at = models.DateTimeField()
+    action = models.CharField(max_length=64)
+    # Identifiants bruts, sans clé étrangère : le journal survit à la purge des comptes
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    target_type = models.CharField(max_length=100, blank=True, default='')
+    target_id = models.CharField(max_length=64, blank=True, default='')
+    data = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Parcours par plage de temps (API admin/audit), curseur (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='audit_time_idx'),
+            models.Index(fields=['target_type', 'target_id', 'created_at'], name='audit_target_idx'),
+            models.Index(fields=['actor_id', 'created_at'], name='audit_actor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.action}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Le journal d'audit est en ajout seul")
+        super().save(*args, **kwargs)
+
+
+# =====================================================
+# ARCHIVE DES MESSAGES (RÉTENTION)
+# =====================================================
+class MessageArchive(models.Model):
+    COLUMNS = ('id', 'sender', 'receiver', 'content', 'created_at', 'read_at')
+
+    consultation = models.ForeignKey(
+        Consultation,
+        on_delete=models.CASCADE,
+        related_name='message_archives'
+    )
+    message_count = models.PositiveIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['first_created_at']
+
+    def __str__(self):
+        return f"Archive {self.consultation_id} ({self.message_count} messages)"
+
+    @classmethod
+    def pack(cls, consultation, messages):
+        """Construit une archive compressée (JSON colonnaire + zlib)."""
+        columns = {
+            'id': [m.id for m in messages],
+            'sender': [m.sender_id for m in messages],
+            'receiver': [m.receiver_id for m in messages],
+            'content': [m.content for m in messages],
+            # isoformat complet : pas de troncature à la milliseconde
+            'created_at': [m.created_at.isoformat() for m in messages],
+            'read_at': [m.read_at.isoformat() if m.read_at else None for m in messages],
+        }
+        raw = json.dumps(columns, separators=(',', ':'))
+
+        return cls(
+            consultation=consultation,
+            message_count=len(messages),
+            first_created_at=messages[0].created_at,
+            last_created_at=messages[-1].created_at,
+            payload=zlib.compress(raw.encode(), 9),
+        )
+
+    def unpack(self):
+        columns = json.loads(zlib.decompress(bytes(self.payload)))
+        rows = [dict(zip(self.COLUMNS, values)) for values in zip(*(columns[c] for c in self.COLUMNS))]
+
+        for row in rows:
+            row['created_at'] = parse_datetime(row['created_at'])
+            if row['read_at']:
+                row['read_at'] = parse_datetime(row['read_at'])
+            row['archived'] = True
+
+        return rows
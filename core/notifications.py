@@ -0,0 +1,163 @@
+# core/notifications.py
+"""
+Diffusion des notifications depuis l'outbox (OutboxEvent).
+
+`dispatch()` verrouille un lot d'événements (SKIP LOCKED : plusieurs
+dispatchers peuvent tourner en parallèle), les regroupe par
+destinataire / type / consultation pour former des résumés (10 messages
+→ une seule notification), les livre sur chaque canal puis supprime le
+lot — le tout dans une seule transaction.
+
+Le fil in-app est écrit dans cette transaction : exactement une fois par
+commit. Les canaux externes (SMS, email) partent après le commit via
+`on_commit` : jamais pour un lot annulé.
+"""
+import logging
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification, OutboxEvent, User
+
+logger = logging.getLogger(__name__)
+
+TITLES = {
+    'consultation_assigned': "Nouvelle consultation attribuée : {sujet}",
+    'consultation_accepted': "Consultation acceptée : {sujet}",
+    'consultation_rejected': "Consultation rejetée : {sujet}",
+    'consultation_completed': "Consultation terminée : {sujet}",
+    'message_created': "Nouveau(x) message(s)",
+}
+
+
+class Digest:
+    """Événements regroupés pour un destinataire."""
+
+    def __init__(self, recipient_id, kind, consultation_id):
+        self.recipient_id = recipient_id
+        self.kind = kind
+        self.consultation_id = consultation_id
+        self.events = []
+
+    @property
+    def count(self):
+        return len(self.events)
+
+    @property
+    def title(self):
+        payload = self.events[-1].payload
+        return TITLES[self.kind].format(sujet=payload.get('sujet', ''))
+
+    @property
+    def body(self):
+        return self.events[-1].payload.get('preview', '')
+
+
+def coalesce(events):
+    digests = {}
+    for event in events:
+        key = (event.recipient_id, event.kind, event.consultation_id)
+        if key not in digests:
+            digests[key] = Digest(*key)
+        digests[key].events.append(event)
+    return list(digests.values())
+
+
+# ============================================================
+# CANAUX
+# ============================================================
+
+class InAppChannel:
+    """Fil de notifications en base ; cumule sur une notification non lue existante."""
+
+    def deliver(self, digests):
+        for digest in digests:
+            updated = Notification.objects.filter(
+                recipient_id=digest.recipient_id,
+                kind=digest.kind,
+                consultation_id=digest.consultation_id,
+                read_at__isnull=True,
+            ).update(
+                count=F('count') + digest.count,
+                body=digest.body,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                Notification.objects.create(
+                    recipient_id=digest.recipient_id,
+                    kind=digest.kind,
+                    consultation_id=digest.consultation_id,
+                    title=digest.title,
+                    body=digest.body,
+                    count=digest.count,
+                )
+
+
+class ExternalChannel(ABC):
+    """Base des canaux hors base : envoi après commit uniquement."""
+
+    def deliver(self, digests):
+        transaction.on_commit(lambda: self.send_all(digests))
+
+    def send_all(self, digests):
+        for digest in digests:
+            try:
+                self.send(digest)
+            except Exception:
+                logger.exception("Échec d'envoi %s pour l'utilisateur %s",
+                                 type(self).__name__, digest.recipient_id)
+
+    @abstractmethod
+    def send(self, digest):
+        """Envoie un résumé ; une exception est journalisée, sans bloquer les autres."""
+
+
+class EmailChannel(ExternalChannel):
+    """Email via EMAIL_BACKEND (backend console en local)."""
+
+    def send(self, digest):
+        email = User.objects.filter(pk=digest.recipient_id).values_list('email', flat=True).first()
+        if email:
+            send_mail(digest.title, digest.body, None, [email])
+
+
+class SMSChannel(ExternalChannel):
+    """Bouchon local : journalise au lieu d'appeler une passerelle SMS."""
+
+    def send(self, digest):
+        logger.info("SMS → utilisateur %s : %s", digest.recipient_id, digest.title)
+
+
+# ============================================================
+# DISPATCHER
+# ============================================================
+
+def get_channels():
+    return [import_string(path)() for path in settings.NOTIFICATION_CHANNELS]
+
+
+def dispatch(batch_size=500, channels=None):
+    """Traite un lot d'événements ; renvoie le nombre d'événements traités."""
+    channels = channels if channels is not None else get_channels()
+
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        digests = coalesce(events)
+        for channel in channels:
+            channel.deliver(digests)
+
+        OutboxEvent.objects.filter(pk__in=[e.pk for e in events]).delete()
+
+    return len(events)
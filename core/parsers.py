@@ -0,0 +1,15 @@
+# core/parsers.py
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class MessagePackParser(BaseParser):
+    """Corps de requête MessagePack (Content-Type: application/msgpack)."""
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData) as exc:
+            raise ParseError(f"MessagePack invalide : {exc}")
@@ -0,0 +1,145 @@
+# core/purge.py
+"""
+Purge des comptes supprimés logiquement (User.soft_delete).
+
+Les dépendances sont découvertes par `_meta` (relations inverses, y
+compris cachées et tables de liaison) et supprimées feuilles d'abord, en
+SQL brut par lots d'identifiants :
+
+    SELECT pk FROM t WHERE fk IN (…) ORDER BY pk LIMIT n
+    DELETE FROM t WHERE pk IN (…)
+
+Chaque instruction s'exécute en autocommit et ne verrouille que les
+lignes du lot, atteintes par clé primaire : pas de verrou large sur les
+messages, pas de collecteur Python ni de signaux. Une pause entre deux
+lots laisse passer le trafic. Les fichiers (FileField) des lignes
+supprimées sont effacés du stockage, de même que les fichiers locaux
+déclarés par le modèle (`temp_paths(pks)`, ex. morceaux de ModuleUpload).
+
+La purge est reprenable : un compte interrompu reste marqué et sa
+suppression reprend au passage suivant.
+"""
+import os
+import time
+from collections import Counter
+from contextlib import suppress
+
+from django.db import connection, models
+
+MAX_DEPTH = 5
+
+
+def reverse_relations(model):
+    """Clés étrangères (et one-to-one) d'autres modèles vers `model`."""
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if (field.one_to_many or field.one_to_one) and field.auto_created and not field.concrete
+    ]
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+class Purger:
+    def __init__(self, batch_size=1000, pause=0.0):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.deleted = Counter()
+        self.nullified = Counter()
+
+    # ---------------- SQL ----------------
+
+    def _select_ids(self, model, column, values):
+        qn = connection.ops.quote_name
+        pk = qn(model._meta.pk.column)
+        sql = (
+            f"SELECT {pk} FROM {qn(model._meta.db_table)} "
+            f"WHERE {qn(column)} IN ({_placeholders(values)}) "
+            f"ORDER BY {pk} LIMIT {int(self.batch_size)}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, list(values))
+            return [row[0] for row in cursor.fetchall()]
+
+    def _execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def _throttle(self):
+        if self.pause:
+            time.sleep(self.pause)
+
+    def _chunks(self, values):
+        values = list(values)
+        for start in range(0, len(values), self.batch_size):
+            yield values[start:start + self.batch_size]
+
+    # ---------------- PARCOURS ----------------
+
+    def _file_names(self, model, pks):
+        fields = [f for f in model._meta.concrete_fields if isinstance(f, models.FileField)]
+        if not fields:
+            return []
+        rows = model._base_manager.filter(pk__in=pks).values_list(*(f.attname for f in fields))
+        return [
+            (field.storage, name)
+            for row in rows
+            for field, name in zip(fields, row)
+            if name
+        ]
+
+    def _nullify(self, model, column, values):
+        qn = connection.ops.quote_name
+        table, pk = qn(model._meta.db_table), qn(model._meta.pk.column)
+        for chunk in self._chunks(values):
+            while True:
+                ids = self._select_ids(model, column, chunk)
+                if not ids:
+                    break
+                self.nullified[model._meta.label] += self._execute(
+                    f"UPDATE {table} SET {qn(column)} = NULL WHERE {pk} IN ({_placeholders(ids)})",
+                    ids,
+                )
+                self._throttle()
+
+    def _purge_where(self, model, column, values, depth):
+        for chunk in self._chunks(values):
+            while True:
+                ids = self._select_ids(model, column, chunk)
+                if not ids:
+                    break
+                self.delete_rows(model, ids, depth)
+                self._throttle()
+
+    def delete_rows(self, model, pks, depth=0):
+        """Supprime les lignes `pks` de `model` après leurs dépendances."""
+        if depth > MAX_DEPTH:
+            raise RuntimeError(f"Cascade trop profonde depuis {model._meta.label}")
+
+        for rel in reverse_relations(model):
+            related, column = rel.related_model, rel.field.column
+            if rel.on_delete is models.CASCADE:
+                self._purge_where(related, column, pks, depth + 1)
+            elif rel.on_delete is models.SET_NULL:
+                self._nullify(related, column, pks)
+            elif rel.on_delete is not models.DO_NOTHING:
+                raise RuntimeError(
+                    f"{related._meta.label}.{rel.field.name} : on_delete non géré par la purge"
+                )
+
+        files = self._file_names(model, pks)
+        temp_paths = model.temp_paths(pks) if hasattr(model, "temp_paths") else []
+        qn = connection.ops.quote_name
+        self.deleted[model._meta.label] += self._execute(
+            f"DELETE FROM {qn(model._meta.db_table)} "
+            f"WHERE {qn(model._meta.pk.column)} IN ({_placeholders(pks)})",
+            list(pks),
+        )
+        # Après la ligne : un échec laisse au pire un fichier orphelin
+        for storage, name in files:
+            storage.delete(name)
+        for path in temp_paths:
+            with suppress(FileNotFoundError):
+                os.remove(path)
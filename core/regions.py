@@ -0,0 +1,75 @@
+# core/regions.py
+"""
+Agrégats régionaux des exploitations (hectares par culture, par cellule).
+
+Les colonnes d'une région sont chargées en une requête `values_list`,
+puis regroupées en NumPy (np.unique + np.bincount) plutôt que ligne par
+ligne en Python. Le résultat est mis en cache par région et invalidé
+après commit à chaque écriture d'un paysan de la région.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Paysan, Region
+
+CELL_PRECISION = 5  # cellules geohash ≈ 5 km
+
+
+def _groups(keys, superficies):
+    labels, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(labels))
+    hectares = np.bincount(inverse, weights=superficies, minlength=len(labels))
+    order = np.argsort(-hectares, kind="stable")
+    return [(str(labels[i]), int(counts[i]), float(hectares[i])) for i in order]
+
+
+def compute_aggregates(region):
+    rows = list(
+        Paysan.objects.filter(region_ref=region)
+        .values_list("type_culture", "superficie", "geohash")
+    )
+    data = {
+        "region": {"id": region.id, "code": region.code, "name": region.name},
+        "paysans": len(rows),
+        "hectares": 0.0,
+        "cultures": [],
+        "cells": [],
+    }
+    if not rows:
+        return data
+
+    cultures, superficies, geohashes = zip(*rows)
+    superficies = np.asarray(superficies, dtype=np.float64)
+    data["hectares"] = round(float(superficies.sum()), 2)
+
+    # Cultures regroupées sans tenir compte de la casse ni des espaces
+    cultures = np.array([c.strip().lower() for c in cultures])
+    data["cultures"] = [
+        {
+            "type_culture": label,
+            "paysans": count,
+            "hectares": round(hectares, 2),
+            "superficie_moyenne": round(hectares / count, 2),
+        }
+        for label, count, hectares in _groups(cultures, superficies)
+    ]
+
+    # Répartition spatiale : exploitations positionnées, par cellule geohash
+    cells = np.array([g[:CELL_PRECISION] for g in geohashes])
+    located = cells != ""
+    if located.any():
+        data["cells"] = [
+            {"geohash": label, "paysans": count, "hectares": round(hectares, 2)}
+            for label, count, hectares in _groups(cells[located], superficies[located])
+        ]
+
+    return data
+
+
+def region_aggregates(region):
+    return cache.get_or_set(
+        Region.aggregates_key(region.id),
+        lambda: compute_aggregates(region),
+        settings.REGION_AGGREGATES_TTL,
+    )
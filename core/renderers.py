@@ -0,0 +1,53 @@
+# core/renderers.py
+"""
+Renderers de l'API.
+
+FastJSONRenderer sérialise avec orjson lorsqu'il est installé (bien plus
+rapide que json de la bibliothèque standard) et retombe sinon sur le
+JSONRenderer de DRF. La sortie reste identique pour les clients.
+
+MessagePackRenderer propose un encodage binaire plus compact pour les
+clients à faible bande passante (négociation par l'en-tête Accept).
+"""
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Indentation demandée (API navigable, ?indent) : chemin standard
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(
+            data,
+            default=self._encoder.default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Encodage binaire compact (Accept: application/msgpack)."""
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Dates, Decimal, UUID… : mêmes conversions que le JSON
+        return msgpack.packb(data, default=self._encoder.default, use_bin_type=True)
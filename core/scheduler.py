@@ -0,0 +1,179 @@
+# core/scheduler.py
+"""
+Attribution automatique des consultations en attente aux experts.
+
+File d'attente : consultations `pending` sans expert, par priorité puis
+ancienneté, filtrées par domaine (domaine vide : tout expert).
+
+Équité pondérée (WFQ) : chaque expert disponible a un poids qui baisse
+avec son délai de réponse moyen (EMA, Expert.avg_response_seconds). La
+consultation va à l'expert dont le « temps de fin virtuel »
+(charge ouverte + 1) / poids est le plus petit ; sa charge augmente
+aussitôt, ce qui répartit un lot entre plusieurs experts.
+
+SLA : une consultation attribuée restée sans réponse au-delà de
+ASSIGNMENT_SLA_SECONDS repart dans la file avec une priorité accrue, en
+évitant l'expert précédent. Une consultation qui attend sans expert
+monte d'un niveau de priorité par SLA écoulé.
+
+Chaque étape est une transaction sur des lignes verrouillées en
+SELECT … FOR UPDATE SKIP LOCKED : plusieurs ordonnanceurs peuvent
+tourner en parallèle sans se bloquer ni attribuer deux fois.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Least, Lower, Trim
+from django.utils import timezone
+
+from .models import Consultation, Expert, OutboxEvent
+
+
+def _domaine_key(domaine):
+    return (domaine or "").strip().lower()
+
+
+def expert_weight(expert):
+    response = expert.avg_response_seconds
+    if response is None:
+        response = settings.ASSIGNMENT_DEFAULT_RESPONSE_SECONDS
+    return 1.0 / (1.0 + response / settings.ASSIGNMENT_SLA_SECONDS)
+
+
+class _Slot:
+    """Expert candidat et sa charge courante pendant le lot."""
+
+    def __init__(self, expert):
+        self.expert = expert
+        self.load = expert.open_consultations
+        self.weight = expert_weight(expert)
+
+    @property
+    def finish(self):
+        return (self.load + 1) / self.weight
+
+
+def _pick(slots, previous_expert_id):
+    candidates = [s for s in slots if s.load < settings.ASSIGNMENT_MAX_OPEN]
+    # L'expert qui a laissé passer le SLA n'est repris qu'en dernier recours
+    others = [s for s in candidates if s.expert.user_id != previous_expert_id]
+    candidates = others or candidates
+    if not candidates:
+        return None
+    return min(candidates, key=lambda s: (s.finish, s.load, s.expert.user_id))
+
+
+def assign_batch(batch_size=100):
+    """Attribue un lot de la file ; renvoie le nombre de consultations attribuées."""
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Experts verrouillés : deux ordonnanceurs ne lisent pas la même charge
+        slots = [
+            _Slot(expert)
+            for expert in Expert.objects
+            .select_for_update(skip_locked=True)
+            .filter(disponible=True, open_consultations__lt=settings.ASSIGNMENT_MAX_OPEN)
+            .order_by("user_id")
+        ]
+        if not slots:
+            return 0
+
+        by_domaine = {}
+        for slot in slots:
+            by_domaine.setdefault(_domaine_key(slot.expert.domaine), []).append(slot)
+
+        # Seuls les domaines servis par un expert libre : pas de blocage en
+        # tête de file par un domaine sans expert
+        queue = list(
+            Consultation.objects
+            .select_for_update(skip_locked=True)
+            .annotate(domaine_key=Lower(Trim("domaine")))
+            .filter(status="pending", expert__isnull=True)
+            .filter(Q(domaine_key="") | Q(domaine_key__in=list(by_domaine)))
+            .order_by("-priority", "created_at")[:batch_size]
+        )
+        if not queue:
+            return 0
+
+        assigned = []
+        for consultation in queue:
+            key = _domaine_key(consultation.domaine)
+            slot = _pick(by_domaine.get(key, []) if key else slots, consultation.previous_expert_id)
+            if slot is None:
+                continue
+            slot.load += 1
+            consultation.expert_id = slot.expert.user_id
+            consultation.assigned_at = now
+            assigned.append(consultation)
+
+        if not assigned:
+            return 0
+
+        Consultation.objects.bulk_update(assigned, ["expert", "assigned_at"])
+        for user_id, count in Counter(c.expert_id for c in assigned).items():
+            Expert.bump(user_id, open_consultations=count)
+
+        OutboxEvent.objects.bulk_create(
+            OutboxEvent(
+                kind="consultation_assigned",
+                recipient_id=c.expert_id,
+                consultation_id=c.pk,
+                payload={"sujet": c.sujet},
+            )
+            for c in assigned
+        )
+
+    return len(assigned)
+
+
+def reassign_overdue(batch_size=100):
+    """Remet en file les attributions sans réponse au-delà du SLA."""
+    now = timezone.now()
+    sla = settings.ASSIGNMENT_SLA_SECONDS
+
+    with transaction.atomic():
+        overdue = list(
+            Consultation.objects
+            .select_for_update(skip_locked=True)
+            .filter(status="pending", assigned_at__lt=now - timedelta(seconds=sla))
+            .order_by("assigned_at")[:batch_size]
+        )
+        if not overdue:
+            return 0
+
+        for consultation in overdue:
+            # Un SLA manqué compte comme une réponse au bout du délai écoulé
+            Expert.record_response(
+                consultation.expert_id, (now - consultation.assigned_at).total_seconds()
+            )
+            Expert.bump(consultation.expert_id, open_consultations=-1)
+
+        Consultation.objects.filter(pk__in=[c.pk for c in overdue]).update(
+            previous_expert=F("expert"),
+            expert=None,
+            assigned_at=None,
+            priority=Least(F("priority") + 1, settings.ASSIGNMENT_MAX_PRIORITY),
+        )
+
+    return len(overdue)
+
+
+def escalate_waiting():
+    """Un niveau de priorité par SLA passé dans la file sans expert."""
+    now = timezone.now()
+    sla = settings.ASSIGNMENT_SLA_SECONDS
+    escalated = 0
+
+    for level in range(1, settings.ASSIGNMENT_MAX_PRIORITY + 1):
+        escalated += Consultation.objects.filter(
+            status="pending",
+            expert__isnull=True,
+            priority__lt=level,
+            created_at__lt=now - timedelta(seconds=sla * level),
+        ).update(priority=level)
+
+    return escalated
@@ -1,19 +1,89 @@
 # core/serializers.py
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import Expert, Consultation, Message, Module, Paysan
+from .token import RotatingRefreshToken
+from .models import (
+    Expert, Consultation, Message, Module, ModuleBundle, ModuleUpload, Notification, Paysan, Region,
+)
 
 User = get_user_model()
 
 
+# ============================================================
+# PROJECTION (?fields= / ?exclude=)
+# ============================================================
+
+def sparse_fields(request, field_names):
+    """
+    Champs à rendre d'après `?fields=a,b` puis `?exclude=c`.
+    Renvoie None sans projection (ou hors lecture).
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+
+    params = getattr(request, "query_params", request.GET)
+    only = params.get("fields")
+    exclude = params.get("exclude")
+    if not only and not exclude:
+        return None
+
+    kept = set(field_names)
+    if only:
+        kept &= {name.strip() for name in only.split(",")}
+    if exclude:
+        kept -= {name.strip() for name in exclude.split(",")}
+    return kept
+
+
+class SparseFieldsMixin:
+    """Retire de la sortie les champs non demandés (serializer racine seulement)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        # Racine, ou élément d'une liste racine : les serializers imbriqués
+        # (ex. `user`) gardent tous leurs champs
+        root_item = isinstance(self.parent, serializers.ListSerializer) and self.parent is self.root
+        if self is not self.root and not root_item:
+            return fields
+
+        kept = sparse_fields(self.context.get("request"), fields)
+        if kept is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in kept}
+
+    @classmethod
+    def deferred_columns(cls, request):
+        """
+        Colonnes simples (hors clés étrangères) inutiles au rendu :
+        passées à `.defer()` pour ne pas charger les gros TextField.
+        """
+        fields = cls().fields
+        kept = sparse_fields(request, fields.keys())
+        if kept is None:
+            return []
+
+        # Champs calculés : colonne source déclarée dans Meta.projection_sources
+        sources = getattr(cls.Meta, "projection_sources", {})
+        needed = {sources.get(name, fields[name].source.split(".")[0]) for name in kept}
+        return [
+            f.name for f in cls.Meta.model._meta.concrete_fields
+            if not f.primary_key and not f.is_relation and f.name not in needed
+        ]
+
+
 # ============================================================
 # USER SERIALIZERS
 # ============================================================
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -36,7 +106,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def validate_email(self, value):
-        if User.objects.filter(email__iexact=value).exists():
+        if User.existing_emails([value]):
             raise serializers.ValidationError("Cet email est déjà utilisé.")
         return value
 
@@ -54,6 +124,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 
         user = User(**validated_data)
         user.set_password(password)
+        # Compteur de la file de validation tenu par User.save()
         user.save()
         return user
 
@@ -64,6 +135,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 
 class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = 'email'
+    token_class = RotatingRefreshToken
 
     def validate(self, attrs):
         email = attrs.get("email")
@@ -94,12 +166,19 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
 # EXPERT SERIALIZERS
 # ============================================================
 
-class ExpertSerializer(serializers.ModelSerializer):
+class ExpertSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
         model = Expert
-        fields = ['id', 'user', 'domaine', 'experience', 'description']
+        fields = [
+            'id', 'user', 'domaine', 'experience', 'description', 'disponible',
+            'latitude', 'longitude',
+            'open_consultations', 'completed_consultations', 'modules_published',
+        ]
+        read_only_fields = [
+            'open_consultations', 'completed_consultations', 'modules_published',
+        ]
 
 
 # ============================================================
@@ -115,25 +194,36 @@ class PaysanSerializer(serializers.ModelSerializer):
             'id',
             'user',
             'region',
+            'region_ref',
+            'latitude',
+            'longitude',
             'type_culture',
             'superficie',
             'experience',
         ]
+        read_only_fields = ['region_ref']
+
+
+class RegionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Region
+        fields = ['id', 'code', 'name', 'aliases', 'latitude', 'longitude']
 
 
 # ============================================================
 # CONSULTATION SERIALIZER
 # ============================================================
 
-class ConsultationSerializer(serializers.ModelSerializer):
+class ConsultationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Consultation
         fields = [
             'id', 'sujet', 'description',
             'status', 'created_at',
-            'paysan', 'expert'
+            'paysan', 'expert',
+            'domaine', 'priority', 'assigned_at',
         ]
-        read_only_fields = ['id', 'created_at', 'status', 'paysan']
+        read_only_fields = ['id', 'created_at', 'status', 'paysan', 'priority', 'assigned_at']
 
     def create(self, validated_data):
         request = self.context["request"]
@@ -153,9 +243,10 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = [
-            'id', 'content', 'created_at',
+            'id', 'content', 'created_at', 'read_at',
             'sender', 'receiver', 'consultation'
         ]
+        read_only_fields = ['read_at']
 
     def validate(self, attrs):
         request = self.context.get("request")
@@ -184,21 +275,82 @@ class MessageSerializer(serializers.ModelSerializer):
             else consultation.paysan
         )
 
-        return super().create(validated_data)
+        with transaction.atomic():
+            message = super().create(validated_data)
+            consultation.record_messages([message])
+
+        return message
+
+
+class MessageBatchItemSerializer(serializers.Serializer):
+    """Élément d'un envoi groupé : la participation est vérifiée par la vue."""
+    consultation = serializers.IntegerField()
+    content = serializers.CharField()
+
     
 # ============================================================
 # MODULE SERIALIZER
 # ============================================================
-class ModuleSerializer(serializers.ModelSerializer):
+class ModuleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     expert = UserSerializer(read_only=True)
     fichier_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Module
-        fields = ["id", "titre", "description", "fichier", "fichier_url", "expert", "created_at"]
+        fields = [
+            "id", "titre", "description", "type_culture", "fichier", "fichier_url",
+            "checksum", "expert", "created_at", "updated_at",
+        ]
+        read_only_fields = ["checksum", "updated_at"]
+        projection_sources = {"fichier_url": "fichier"}
 
     def get_fichier_url(self, obj):
         request = self.context.get("request")
         if obj.fichier:
             return request.build_absolute_uri(obj.fichier.url)
-        return None
\ No newline at end of file
+        return None
+
+
+# ============================================================
+# PAQUETS HORS LIGNE
+# ============================================================
+class ModuleBundleSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+    is_delta = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = ModuleBundle
+        fields = [
+            "id", "culture", "version", "base_version", "is_delta",
+            "size", "checksum", "download_url", "created_at",
+        ]
+
+    def get_download_url(self, obj):
+        request = self.context.get("request")
+        url = reverse("bundles-download", args=[obj.pk])
+        return request.build_absolute_uri(url) if request else url
+
+
+# ============================================================
+# TÉLÉVERSEMENT REPRENABLE (MODULE)
+# ============================================================
+class ModuleUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ModuleUpload
+        fields = ["id", "titre", "description", "type_culture", "filename", "size", "offset", "status", "module"]
+        read_only_fields = ["id", "offset", "status", "module"]
+
+    def validate_size(self, value):
+        if value <= 0 or value > settings.MODULE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError("Taille de fichier invalide.")
+        return value
+
+
+# ============================================================
+# NOTIFICATION SERIALIZER
+# ============================================================
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ["id", "kind", "consultation", "title", "body", "count", "created_at", "updated_at", "read_at"]
+        read_only_fields = fields
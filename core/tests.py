@@ -1,3 +1,1277 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib.util
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+
+from django.conf import settings
+from django.contrib import admin as django_admin
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import audit, bundles, geo, notifications, scheduler, views
+from .admin import EstimatedCountPaginator, ScalableAdmin
+from .cache import cached, versioned_key
+from .checks import check_shared_counter_store
+from .idempotency import _cache_key
+from .middleware import CompressionMiddleware, _accepted_encoding, brotli
+from .models import (
+    AuditEvent, Consultation, ConsultationTransition, Expert, Message, Module, ModuleBundle, ModuleUpload, Notification,
+    OutboxEvent, Paysan, Region, TransitionConflict, User,
+)
+from .notifications import EmailChannel, InAppChannel
+from .renderers import FastJSONRenderer
+from .throttling import (
+    CacheCounterStore, LoginEndpointThrottle, MemoryCounterStore, MessageUserThrottle, get_store,
+)
+from .token import RotatingRefreshToken
+
+
+def make_consultation():
+    paysan = User.objects.create_user(username="paysan", password="x", role="paysan")
+    expert = User.objects.create_user(username="expert", password="x", role="expert")
+    Expert.objects.create(user=expert, domaine="Maïs", experience=3, description="-")
+    consultation = Consultation.objects.create(
+        paysan=paysan, expert=expert, sujet="Maladie", description="-"
+    )
+    return paysan, expert, consultation
+
+
+# SQLite verrouille toute la base à l'écriture : pas d'écrivains concurrents
+@skipUnlessDBFeature("has_select_for_update")
+class ConsultationTransitionConcurrencyTest(TransactionTestCase):
+    THREADS = 16
+
+    def test_une_seule_transition_gagne(self):
+        _, expert, consultation = make_consultation()
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = [], []
+
+        def worker(i):
+            try:
+                barrier.wait()
+                target = "accepted" if i % 2 else "rejected"
+                try:
+                    Consultation.objects.get(pk=consultation.pk).transition(target, actor=expert)
+                    results.append(target)
+                except TransitionConflict:
+                    results.append(None)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        winners = [r for r in results if r]
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(len(winners), 1)
+
+        consultation.refresh_from_db()
+        self.assertEqual(consultation.status, winners[0])
+        self.assertEqual(
+            list(ConsultationTransition.objects.values_list("from_status", "to_status")),
+            [("pending", winners[0])],
+        )
+
+
+class ConsultationTransitionAPITest(TestCase):
+    def setUp(self):
+        self.paysan, self.expert, self.consultation = make_consultation()
+        self.client = APIClient()
+        self.client.force_authenticate(self.expert)
+
+    def url(self, action):
+        return f"/api/consultations/{self.consultation.pk}/{action}/"
+
+    def test_transitions_valides_puis_conflit(self):
+        self.assertEqual(self.client.post(self.url("accept")).status_code, 200)
+        self.assertEqual(self.client.post(self.url("reject")).status_code, 409)
+        self.assertEqual(self.client.post(self.url("close")).status_code, 200)
+        self.assertEqual(self.client.post(self.url("close")).status_code, 409)
+        self.assertEqual(self.consultation.transitions.count(), 2)
+
+    def test_conflit_affiche_le_statut_relu(self):
+        stale = Consultation.objects.get(pk=self.consultation.pk)
+        self.consultation.transition("accepted", actor=self.expert)
+        with mock.patch.object(views.ConsultationViewSet, "get_object", return_value=stale):
+            response = self.client.post(self.url("reject"))
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("« accepted »", response.json()["detail"])
+
+
+def login_rates(**rates):
+    return override_settings(
+        RATE_LIMIT_STORE="core.throttling.MemoryCounterStore",
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {**settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"], **rates},
+        },
+    )
+
+
+@login_rates(login="12/min", login_ip="3/min", login_account="100/min")
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        get_store().clear()
+        self.client = APIClient()
+
+    def login(self, ip, **extra):
+        return self.client.post(
+            "/api/auth/login/", {"login_input": "inconnu", "password": "x"},
+            format="json", REMOTE_ADDR=ip, **extra,
+        )
+
+    def test_une_ip_ne_remplit_pas_le_compteur_global(self):
+        codes = [self.login("10.0.0.1").status_code for _ in range(50)]
+        self.assertEqual(codes[:3], [400] * 3)
+        self.assertEqual(set(codes[3:]), {429})
+        # Les refus par IP ne sont pas décomptés par l'endpoint
+        self.assertEqual(self.login("10.0.0.2").status_code, 400)
+
+    def test_x_forwarded_for_ignore_sans_proxy(self):
+        codes = [
+            self.login("10.0.0.1", HTTP_X_FORWARDED_FOR=f"192.0.2.{i}").status_code
+            for i in range(4)
+        ]
+        self.assertEqual(codes, [400, 400, 400, 429])
+
+
+
+class SlidingWindowTest(SimpleTestCase):
+    def consume(self, store, now, cost=1):
+        throttle = MessageUserThrottle()
+        return throttle.consume(store, "rl:test", 10, 60, now, cost), throttle.wait_seconds
+
+    def test_part_de_la_fenetre_precedente(self):
+        store = MemoryCounterStore()
+        self.assertTrue(all(self.consume(store, 30)[0] for _ in range(10)))
+        self.assertEqual(self.consume(store, 30), (False, 30))
+        # Refus non décomptés : la fenêtre 0 garde 10 requêtes servies
+        self.assertEqual(store.get("rl:test:0"), 10)
+
+        # Mi-fenêtre suivante : la précédente compte encore pour moitié
+        self.assertTrue(all(self.consume(store, 90)[0] for _ in range(5)))
+        allowed, wait = self.consume(store, 90)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 6)
+        self.assertTrue(self.consume(store, 96)[0])
+
+    def test_pas_de_refus_par_contention(self):
+        store = CacheCounterStore()
+        store.cache.clear()
+        barrier = threading.Barrier(20)
+        results = []
+
+        def worker():
+            barrier.wait()
+            throttle = LoginEndpointThrottle()
+            results.append(throttle.consume(store, "rl:login:all", 100, 60, 30))
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [True] * 20)
+        self.assertEqual(store.get("rl:login:all:0"), 20)
+
+class ModuleUploadTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.enterContext(override_settings(MEDIA_ROOT=tmp, MODULE_UPLOAD_TEMP_DIR=os.path.join(tmp, "parts")))
+
+        _, self.expert, _ = make_consultation()
+        self.client = APIClient()
+        self.client.force_authenticate(self.expert)
+        response = self.client.post("/api/module-uploads/", {
+            "titre": "Semis", "description": "-", "filename": "semis.pdf", "size": 6,
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.url = f"/api/module-uploads/{response.data['id']}/"
+
+    def patch(self, offset, data):
+        return self.client.generic(
+            "PATCH", self.url, data, content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_reprise_puis_finalisation_unique(self):
+        self.assertEqual(self.patch(0, b"abc").status_code, 204)
+        # Offset périmé : refusé sans toucher aux octets déjà reçus
+        response = self.patch(0, b"XYZ")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], "3")
+        self.assertEqual(self.patch(3, b"def").status_code, 204)
+
+        self.assertEqual(self.client.post(self.url + "finalize/").status_code, 201)
+        self.assertEqual(self.client.post(self.url + "finalize/").status_code, 200)
+        module = Module.objects.get(expert=self.expert)
+        with module.fichier.open("rb") as f:
+            self.assertEqual(f.read(), b"abcdef")
+        self.assertEqual(self.patch(6, b"g").status_code, 409)
+
+    def test_morceau_recu_avant_le_verrou(self):
+        calls = []
+        get_upload = views.ModuleUploadViewSet._get_upload
+
+        def spy(viewset, request, pk, lock=False):
+            # Octets du corps encore à lire
+            stream = request._request._stream
+            calls.append(("lock" if lock else "read", stream.limit - stream._pos))
+            return get_upload(viewset, request, pk, lock)
+
+        with mock.patch.object(views.ModuleUploadViewSet, "_get_upload", spy):
+            self.assertEqual(self.patch(0, b"abc").status_code, 204)
+        # Corps entièrement lu (tampon) avant la transaction verrouillée
+        self.assertEqual(calls, [("read", 3), ("lock", 0)])
+
+
+class AssignmentSchedulerTest(TestCase):
+    def test_acceptation_refusee_apres_reattribution(self):
+        _, expert, consultation = make_consultation()
+        Consultation.objects.filter(pk=consultation.pk).update(
+            assigned_at=timezone.now() - timedelta(seconds=settings.ASSIGNMENT_SLA_SECONDS + 1)
+        )
+        stale = Consultation.objects.get(pk=consultation.pk)
+
+        self.assertEqual(scheduler.reassign_overdue(), 1)
+        with self.assertRaises(TransitionConflict):
+            stale.transition("accepted", actor=expert)
+
+        consultation.refresh_from_db()
+        self.assertEqual((consultation.status, consultation.expert_id), ("pending", None))
+        self.assertEqual(consultation.previous_expert_id, expert.pk)
+        self.assertFalse(consultation.transitions.exists())
+
+
+
+class AssignmentFairnessTest(TestCase):
+    def setUp(self):
+        self.paysan = User.objects.create_user(username="paysan", password="x", role="paysan")
+
+    def expert(self, name, domaine="Maïs", response=None):
+        user = User.objects.create_user(username=name, password="x", role="expert")
+        Expert.objects.create(
+            user=user, domaine=domaine, experience=1, description="-", avg_response_seconds=response,
+        )
+        return user
+
+    def pending(self, n, domaine="Maïs", priority=0):
+        return [
+            Consultation.objects.create(
+                paysan=self.paysan, sujet=f"{domaine}{i}", description="-", domaine=domaine, priority=priority,
+            )
+            for i in range(n)
+        ]
+
+    def assigned_to(self):
+        return Counter(Consultation.objects.exclude(expert=None).values_list("expert__username", flat=True))
+
+    def test_repartition_ponderee_par_delai_de_reponse(self):
+        self.expert("rapide", response=0)
+        self.expert("lent", response=settings.ASSIGNMENT_SLA_SECONDS)
+        self.pending(6)
+        # Domaine sans expert libre : ignoré sans bloquer la file
+        self.pending(1, domaine="Riz", priority=5)
+
+        self.assertEqual(scheduler.assign_batch(), 6)
+        # Poids 1 contre 1/2 : deux fois plus de consultations pour le plus rapide
+        self.assertEqual(self.assigned_to(), {"rapide": 4, "lent": 2})
+        self.assertEqual(
+            dict(Expert.objects.values_list("user__username", "open_consultations")), {"rapide": 4, "lent": 2},
+        )
+        self.assertEqual(OutboxEvent.objects.filter(kind="consultation_assigned").count(), 6)
+
+    @override_settings(ASSIGNMENT_MAX_OPEN=2)
+    def test_capacite_et_priorite(self):
+        self.expert("a")
+        self.expert("b")
+        Expert.objects.filter(user__username="b").update(open_consultations=1)
+        normal = self.pending(3)
+        urgent = self.pending(1, priority=3)
+
+        self.assertEqual(scheduler.assign_batch(), 3)
+        self.assertEqual(self.assigned_to(), {"a": 2, "b": 1})
+        # Urgente d'abord, puis par ancienneté ; la plus récente attend
+        waiting = Consultation.objects.filter(expert=None).values_list("pk", flat=True)
+        self.assertEqual(list(waiting), [normal[-1].pk])
+        self.assertIsNotNone(Consultation.objects.get(pk=urgent[0].pk).expert_id)
+        # Plus aucune capacité : le lot suivant ne fait rien
+        self.assertEqual(scheduler.assign_batch(), 0)
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+class AssignmentSkipLockedTest(TransactionTestCase):
+    def test_experts_verrouilles_ignores(self):
+        paysan, expert, _ = make_consultation()
+        Consultation.objects.update(expert=None)
+        locked, release = threading.Event(), threading.Event()
+
+        def holder():
+            try:
+                with transaction.atomic():
+                    list(Expert.objects.select_for_update())
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        locked.wait(5)
+        try:
+            # Second ordonnanceur : ne bloque pas, n'attribue rien
+            self.assertEqual(scheduler.assign_batch(), 0)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(scheduler.assign_batch(), 1)
+
+class SparseFieldsTest(TestCase):
+    def setUp(self):
+        _, expert, _ = make_consultation()
+        self.expert = Expert.objects.get(user=expert)
+        self.client = APIClient()
+        self.client.force_authenticate(expert)
+
+    def test_projection_sur_la_racine_seulement(self):
+        detail = self.client.get(f"/api/experts/{self.expert.pk}/?fields=id,user,domaine").json()
+        listing = self.client.get("/api/experts/?fields=id,user,domaine").json()
+        rows = listing["results"] if isinstance(listing, dict) else listing
+
+        for row in (detail, rows[0]):
+            self.assertEqual(set(row), {"id", "user", "domaine"})
+            # Le serializer imbriqué garde tous ses champs
+            self.assertEqual(row["user"]["username"], "expert")
+
+
+class AcceptEncodingTest(SimpleTestCase):
+    def encoding(self, header):
+        return _accepted_encoding(RequestFactory().get("/", HTTP_ACCEPT_ENCODING=header))
+
+    def test_seul_q_nul_refuse(self):
+        self.assertEqual(self.encoding("gzip"), "gzip")
+        self.assertEqual(self.encoding("gzip;q=0.5"), "gzip")
+        self.assertEqual(self.encoding("gzip; q=0.8, br;q=0"), "gzip")
+        self.assertIsNone(self.encoding("gzip;q=0"))
+        self.assertIsNone(self.encoding("gzip;q=0.000, br;q=0"))
+
+
+class CompressionTest(SimpleTestCase):
+    BODY = json.dumps([{"id": i, "domaine": "Maïs"} for i in range(100)]).encode()
+
+    def respond(self, body, content_type="application/json", **headers):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(body, content_type=content_type))
+        return middleware(RequestFactory().get("/api/experts/", **headers))
+
+    def test_gzip_et_brotli(self):
+        response = self.respond(self.BODY, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.BODY)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        if brotli is not None:
+            response = self.respond(self.BODY, HTTP_ACCEPT_ENCODING="gzip, br")
+            self.assertEqual(response["Content-Encoding"], "br")
+            self.assertEqual(brotli.decompress(response.content), self.BODY)
+
+    def test_sans_compression(self):
+        # Client sans Accept-Encoding : corps intact, réponse variable malgré tout
+        response = self.respond(self.BODY)
+        self.assertEqual(response.content, self.BODY)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        small = self.respond(b"[]", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertFalse(small.has_header("Vary"))
+
+        # Pages HTML (jeton CSRF) : jamais compressées (BREACH)
+        page = self.respond(b"<p>csrfmiddlewaretoken</p>" * 100, "text/html", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(page.has_header("Content-Encoding"))
+
+
+class PendingCounterTest(TestCase):
+    def test_compteur_suit_toutes_les_ecritures(self):
+        users = [User.objects.create_user(username=f"u{i}", password="x", role="paysan") for i in range(3)]
+        self.assertEqual(User.pending_count(), 3)
+
+        users[0].role = "expert"
+        users[0].save()
+        self.assertEqual((User.pending_count("paysan"), User.pending_count("expert")), (2, 1))
+
+        users[1].is_verified = True
+        users[1].save()
+        users[1].save()
+        self.assertTrue(users[2].verify())
+        self.assertFalse(users[2].verify())
+        users[0].soft_delete()
+        self.assertEqual(User.pending_count(), 0)
+
+        User.recount_pending()
+        self.assertEqual(User.pending_count(), 0)
+
+
+
+class ReviewQueueTest(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username="admin", password="x", role="admin", is_verified=True)
+        self.ids = [
+            User.objects.create_user(username=f"u{i}", password="x", role="expert" if i % 2 else "paysan").pk
+            for i in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def test_curseur_continu(self):
+        url, ids = "/api/admin/review-queue/?limit=2", []
+        while url:
+            body = self.client.get(url).json()
+            self.assertEqual(body["count"], 5)
+            ids += [row["id"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(ids, self.ids)
+
+        body = self.client.get("/api/admin/review-queue/?role=expert").json()
+        self.assertEqual((body["count"], len(body["results"])), (2, 2))
+        # Filtre de date : pas de compteur entretenu, total inconnu
+        self.assertIsNone(self.client.get("/api/admin/review-queue/?joined_after=2000-01-01").json()["count"])
+
+    def test_flux_ndjson(self):
+        with mock.patch.object(views, "REVIEW_STREAM_CHUNK", 2):
+            response = self.client.get("/api/admin/review-queue/?stream=1")
+            body = b"".join(response.streaming_content).decode()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertTrue(body.endswith("\n"))
+        self.assertEqual([json.loads(line)["id"] for line in body.splitlines()], self.ids)
+
+    def test_ancienne_liste_paginee(self):
+        response = self.client.get("/api/admin/pending-users/?limit=3")
+        self.assertEqual([row["id"] for row in response.json()], self.ids[:3])
+        next_url = response["Link"].split(">")[0].lstrip("<")
+        response = self.client.get(next_url)
+        self.assertEqual([row["id"] for row in response.json()], self.ids[3:])
+        self.assertFalse(response.has_header("Link"))
+
+class InboxCounterTest(TestCase):
+    def test_lecture_ne_perd_pas_un_message_concurrent(self):
+        paysan, expert, consultation = make_consultation()
+        messages = [
+            Message.objects.create(consultation=consultation, sender=paysan, receiver=expert, content=c)
+            for c in ("a", "b")
+        ]
+        consultation.record_messages(messages)
+        # Message validé par un autre worker après la sélection des messages à marquer
+        Consultation.objects.filter(pk=consultation.pk).update(expert_unread=F("expert_unread") + 1)
+
+        self.assertEqual(consultation.mark_read(expert), 2)
+        consultation.refresh_from_db()
+        self.assertEqual(consultation.expert_unread, 1)
+
+    def test_boite_de_reception_paginee(self):
+        paysan, expert, first = make_consultation()
+        consultations = [first] + [
+            Consultation.objects.create(paysan=paysan, expert=expert, sujet=f"s{i}", description="-")
+            for i in range(3)
+        ]
+        for n, consultation in enumerate(consultations[1:], start=1):
+            consultation.record_messages([
+                Message.objects.create(consultation=consultation, sender=paysan, receiver=expert, content=str(i))
+                for i in range(n)
+            ])
+        # Activité identique pour deux consultations : départage par id
+        moment = timezone.now() - timedelta(hours=1)
+        Consultation.objects.filter(pk__in=[consultations[0].pk, consultations[1].pk]).update(last_activity_at=moment)
+
+        client = APIClient()
+        client.force_authenticate(expert)
+        url, rows = "/api/consultations/inbox/?limit=1", []
+        while url:
+            body = client.get(url).json()
+            rows += body["results"]
+            url = body["next"]
+
+        self.assertEqual(
+            [(row["id"], row["unread_count"]) for row in rows],
+            [(consultations[3].pk, 3), (consultations[2].pk, 2), (consultations[1].pk, 1), (consultations[0].pk, 0)],
+        )
+        self.assertEqual(rows[0]["last_message"]["content"], "2")
+        self.assertEqual(client.get("/api/consultations/inbox/?cursor=x").status_code, 400)
+
+
+@login_rates(messages="5/min")
+class MessageBatchTest(TestCase):
+    def setUp(self):
+        get_store().clear()
+        self.paysan, _, self.consultation = make_consultation()
+        self.client = APIClient()
+        self.client.force_authenticate(self.paysan)
+
+    def send(self, n):
+        return self.client.post("/api/messages/batch/", {
+            "messages": [{"consultation": self.consultation.pk, "content": f"m{i}"} for i in range(n)],
+        }, format="json")
+
+    def test_lot_decompte_par_message(self):
+        self.assertEqual(self.send(4).status_code, 201)
+        self.assertEqual(self.send(2).status_code, 429)
+        self.assertEqual(self.send(6).status_code, 400)
+        self.assertEqual(self.send(1).status_code, 201)
+
+    def test_historique_apres_un_message(self):
+        self.send(3)
+        first = Message.objects.filter(consultation=self.consultation).order_by("id").first()
+        response = self.client.get(f"/api/consultations/{self.consultation.pk}/history/?after={first.pk}")
+        self.assertEqual(response.json()["columns"]["content"], ["m1", "m2"])
+
+
+class RefreshRotationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="paysan", password="x", role="paysan")
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post("/api/auth/token/refresh/", {"refresh": token}, format="json")
+
+    def test_rotation(self):
+        first = str(RotatingRefreshToken.for_user(self.user))
+        response = self.refresh(first)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["refresh"], first)
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, 200)
+
+    def test_nouvel_essai_dans_le_delai_de_grace(self):
+        first = str(RotatingRefreshToken.for_user(self.user))
+        successor = self.refresh(first).data
+        # Réponse perdue : le client renvoie l'ancien refresh
+        retry = self.refresh(first)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data["refresh"], successor["refresh"])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_generation, 0)
+
+    @override_settings(JWT_REFRESH_REUSE_GRACE=0)
+    def test_rejeu_hors_delai_revoque_la_session(self):
+        first = str(RotatingRefreshToken.for_user(self.user))
+        successor = self.refresh(first).data["refresh"]
+        time.sleep(0.01)
+        self.assertEqual(self.refresh(first).status_code, 401)
+        # Toute la session tombe, successeur compris
+        self.assertEqual(self.refresh(successor).status_code, 401)
+
+
+class SharedStoreCheckTest(SimpleTestCase):
+    LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    REDIS = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://x"}}
+
+    def test_cache_local_refuse_hors_debug(self):
+        with self.settings(DEBUG=False, CACHES=self.LOCMEM):
+            self.assertEqual([e.id for e in check_shared_counter_store(None)], ["core.E001"])
+        with self.settings(DEBUG=False, CACHES=self.REDIS), \
+                mock.patch("core.checks.importlib.util.find_spec", return_value=object()):
+            self.assertEqual(check_shared_counter_store(None), [])
+        with self.settings(DEBUG=True, CACHES=self.LOCMEM):
+            self.assertEqual(check_shared_counter_store(None), [])
+
+    def test_redis_sans_client(self):
+        with self.settings(DEBUG=False, CACHES=self.REDIS), \
+                mock.patch("core.checks.importlib.util.find_spec", return_value=None):
+            self.assertEqual([e.id for e in check_shared_counter_store(None)], ["core.E002"])
+
+
+class CachedListKeyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, expert, _ = make_consultation()
+        self.client = APIClient()
+        self.client.force_authenticate(expert)
+
+    def test_cle_par_format_et_schema(self):
+        with mock.patch("core.views.cached", wraps=views.cached) as spy:
+            json_response = self.client.get("/api/experts/")
+            packed = self.client.get("/api/experts/", HTTP_ACCEPT="application/msgpack")
+            self.client.get("/api/experts/", secure=True)
+
+        self.assertEqual(len({c.args[0] for c in spy.call_args_list}), 3)
+        self.assertEqual(packed["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(packed.content), json_response.json())
+
+
+
+class SingleFlightCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_un_seul_calcul_pour_des_absences_concurrentes(self):
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "valeur"
+
+        def worker():
+            barrier.wait()
+            results.append(cached("sf:cle", compute, 60))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ["valeur"] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_valeur_perimee_servie_pendant_le_recalcul(self):
+        # Entrée expirée, verrou tenu par un autre worker
+        cache.set("sf:cle", ("ancienne", 0.01, time.time() - 1), 60)
+        cache.add("sf:cle:lock", 1, 30)
+        compute = mock.Mock(return_value="nouvelle")
+        self.assertEqual(cached("sf:cle", compute, 60), "ancienne")
+        compute.assert_not_called()
+
+        cache.delete("sf:cle:lock")
+        self.assertEqual(cached("sf:cle", compute, 60), "nouvelle")
+        self.assertEqual(cached("sf:cle", compute, 60), "nouvelle")
+        compute.assert_called_once()
+
+    def test_compteur_expert_invalide_l_annuaire(self):
+        _, expert, _ = make_consultation()
+        client = APIClient()
+        client.force_authenticate(expert)
+        key = versioned_key("experts", "x")
+
+        def open_count():
+            body = client.get("/api/experts/").json()
+            rows = body["results"] if isinstance(body, dict) else body
+            return rows[0]["open_consultations"]
+
+        self.assertEqual(open_count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Expert.bump(expert.pk, open_consultations=1)
+        self.assertNotEqual(versioned_key("experts", "x"), key)
+        self.assertEqual(open_count(), 1)
+
+class AuditLogTest(TestCase):
+    def test_evenement_ecrit_dans_la_transaction(self):
+        user = User.objects.create_user(username="paysan", password="x", role="paysan")
+
+        with transaction.atomic():
+            user.verify()
+            # Écrit avant le commit, sans passer par le tampon du processus
+            self.assertEqual(AuditEvent.objects.filter(action="user.verified").count(), 1)
+        self.assertEqual(len(audit.buffer), 0)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            audit.record("user.exported", user, user)
+            raise RuntimeError
+        self.assertFalse(AuditEvent.objects.filter(action="user.exported").exists())
+
+    @override_settings(AUDIT_FLUSH_SIZE=3, AUDIT_FLUSH_INTERVAL=3600)
+    def test_transitions_ecrites_par_lots_au_commit(self):
+        self.addCleanup(audit.buffer.flush)
+        audit.buffer.flush()
+        paysan, expert, _ = make_consultation()
+        consultations = [
+            Consultation.objects.create(paysan=paysan, expert=expert, sujet=str(i), description="-")
+            for i in range(3)
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            consultations[0].transition("accepted", actor=expert)
+            # Transition annulée avec son point de sauvegarde : pas d'événement
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                consultations[1].transition("accepted", actor=expert)
+                raise RuntimeError
+        self.assertEqual(len(audit.buffer), 1)
+        self.assertFalse(AuditEvent.objects.filter(action="consultation.accepted").exists())
+
+        for consultation in consultations[1:]:
+            with self.captureOnCommitCallbacks(execute=True):
+                consultation.transition("rejected", actor=expert)
+        # Seuil atteint : un seul INSERT pour les trois événements
+        self.assertEqual(len(audit.buffer), 0)
+        self.assertEqual(
+            sorted(AuditEvent.objects.filter(action__startswith="consultation.").values_list("action", flat=True)),
+            ["consultation.accepted", "consultation.rejected", "consultation.rejected"],
+        )
+
+
+class DryRunTest(TestCase):
+    def run_command(self, *args, **options):
+        out = io.StringIO()
+        call_command(*args, stdout=out, **options)
+        return out.getvalue().strip().splitlines()[-1]
+
+    def test_import_simule_comme_reel(self):
+        User.objects.create_user(username="deja", email="deja@coop.org", password="x")
+        path = os.path.join(tempfile.mkdtemp(), "paysans.csv")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["email", "region", "type_culture", "superficie", "experience"])
+            # Doublon en base (casse), doublon entre lots, région inconnue
+            for email in ("Deja@Coop.org", "a@coop.org", "b@coop.org", "A@coop.org", "c@coop.org"):
+                writer.writerow([email, "Nulle part", "Maïs", "1.5", "2"])
+
+        simulated = self.run_command("import_paysans", path, chunk_size=2, dry_run=True)
+        self.assertFalse(Paysan.objects.exists())
+        real = self.run_command("import_paysans", path, chunk_size=2)
+
+        self.assertIn("3 paysan(s) à importer (simulation), 2 doublon(s)", simulated)
+        self.assertIn("3 paysan(s) importé(s), 2 doublon(s)", real)
+        self.assertEqual(Paysan.objects.count(), 3)
+
+    def test_import_json_par_lots(self):
+        region = Region.objects.create(code="thies", name="Thiès")
+        path = os.path.join(tempfile.mkdtemp(), "paysans.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        row = {"region": "thies", "type_culture": "Maïs", "superficie": 2, "experience": 3}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([
+                {**row, "email": "a@coop.org", "password": "semis2024", "latitude": 14.79, "longitude": -16.93},
+                ["b@coop.org", "thies"],
+                "c@coop.org",
+                {**row, "email": "d@coop.org", "username": 42},
+                {**row, "email": "e@coop.org", "superficie": "beaucoup"},
+            ], f)
+
+        pending = User.pending_count("paysan")
+        err = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_paysans", path, chunk_size=2, workers=1, stdout=io.StringIO(), stderr=err)
+
+        self.assertEqual(err.getvalue().splitlines(), [
+            "Ligne 2 : objet attendu, reçu list",
+            "Ligne 3 : objet attendu, reçu str",
+            "Ligne 5 : could not convert string to float: 'beaucoup'",
+        ])
+        paysans = {p.user.username: p for p in Paysan.objects.select_related("user")}
+        self.assertEqual(set(paysans), {"a@coop.org", "42"})
+        a = paysans["a@coop.org"]
+        self.assertTrue(a.user.check_password("semis2024"))
+        self.assertEqual((a.region_ref_id, a.geohash[:5]), (region.pk, geo.encode(14.79, -16.93, 5)))
+        self.assertFalse(paysans["42"].user.has_usable_password())
+        self.assertEqual(User.pending_count("paysan"), pending + 2)
+
+    def test_archivage_simule_compte_tous_les_lots(self):
+        paysan, expert, consultation = make_consultation()
+        old = timezone.now() - timedelta(days=settings.MESSAGE_RETENTION_DAYS + 1)
+        for i in range(5):
+            Message.objects.create(consultation=consultation, sender=paysan, receiver=expert, content=str(i))
+        Message.objects.update(created_at=old)
+        Consultation.objects.filter(pk=consultation.pk).update(status="completed", last_activity_at=old)
+
+        simulated = self.run_command("archive_messages", chunk_size=2, dry_run=True)
+        real = self.run_command("archive_messages", chunk_size=2)
+        self.assertEqual(simulated.split()[0], real.split()[0])
+        self.assertEqual(real.split()[0], "5")
+
+
+class LeanListTest(TestCase):
+    def test_lignes_et_utilisateurs_dedupliques(self):
+        paysan, expert, consultation = make_consultation()
+        messages = [
+            Message.objects.create(consultation=consultation, sender=paysan, receiver=expert, content=str(i))
+            for i in range(3)
+        ]
+        # Insertion et chronologie divergent : l'ordre vient du tri explicite
+        Message.objects.filter(pk=messages[0].pk).update(created_at=timezone.now() + timedelta(minutes=1))
+        client = APIClient()
+        client.force_authenticate(paysan)
+
+        lean = client.get("/api/messages/?lean=1").json()
+        self.assertEqual([r["content"] for r in lean["results"]], ["1", "2", "0"])
+        standard = client.get("/api/messages/").json()
+        self.assertEqual([r["content"] for r in standard], ["1", "2", "0"])
+        self.assertEqual({r["sender"] for r in lean["results"]}, {paysan.pk})
+        self.assertEqual(
+            {int(pk): user["username"] for pk, user in lean["users"].items()},
+            {paysan.pk: "paysan", expert.pk: "expert"},
+        )
+
+    def test_rendu_identique_au_json_standard(self):
+        data = {"id": uuid.uuid4(), "at": timezone.now(), "prix": Decimal("1.50"), 3: [None, "é"]}
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+
+class ExpertDirectoryTest(TestCase):
+    def setUp(self):
+        self.paysan = User.objects.create_user(username="paysan", password="x", role="paysan")
+        for name, domaine, experience, disponible in (
+            ("e1", "Maïs", 1, True), ("e2", "Maïs", 7, False), ("e3", "Riz", 12, True),
+        ):
+            user = User.objects.create_user(username=name, password="x", role="expert")
+            Expert.objects.create(
+                user=user, domaine=domaine, experience=experience, description="-", disponible=disponible,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.paysan)
+
+    def test_filtres_et_facettes(self):
+        rows = self.client.get("/api/experts/?domaine=Maïs&disponible=true").json()
+        rows = rows["results"] if isinstance(rows, dict) else rows
+        self.assertEqual([r["user"]["username"] for r in rows], ["e1"])
+
+        facets = self.client.get("/api/experts/facets/").json()
+        self.assertEqual(facets["domaine"][0], {"value": "Maïs", "count": 2})
+        self.assertEqual(facets["disponible"], {"true": 2, "false": 1})
+        self.assertEqual(
+            {f["range"]: f["count"] for f in facets["experience"]},
+            {"0-2": 1, "3-5": 0, "6-10": 1, "10+": 1},
+        )
+
+    def test_compteurs_denormalises(self):
+        expert = User.objects.get(username="e1")
+        response = self.client.post("/api/consultations/", {
+            "expert": expert.pk, "sujet": "Maladie", "description": "-",
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        consultation = Consultation.objects.get(pk=response.data["id"])
+        consultation.transition("accepted", actor=expert)
+        consultation.transition("completed", actor=expert)
+
+        profile = Expert.objects.get(user=expert)
+        self.assertEqual((profile.open_consultations, profile.completed_consultations), (0, 1))
+        # Plancher à 0 : un décrément de trop ne passe pas sous zéro
+        Expert.bump(expert.pk, open_consultations=-1)
+        profile.refresh_from_db()
+        self.assertEqual(profile.open_consultations, 0)
+        profile.recount()
+        self.assertEqual((profile.open_consultations, profile.completed_consultations), (0, 1))
+
+
+class NotificationDispatchTest(TestCase):
+    def test_resume_par_destinataire_et_envoi_apres_commit(self):
+        paysan, expert, consultation = make_consultation()
+        User.objects.filter(pk=expert.pk).update(email="expert@coop.org")
+
+        def send(n):
+            messages = [
+                Message.objects.create(consultation=consultation, sender=paysan, receiver=expert, content=str(i))
+                for i in range(n)
+            ]
+            consultation.record_messages(messages)
+
+        send(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(notifications.dispatch(channels=[InAppChannel(), EmailChannel()]), 3)
+        send(1)
+        notifications.dispatch(channels=[InAppChannel()])
+
+        self.assertFalse(OutboxEvent.objects.exists())
+        notification = Notification.objects.get(recipient=expert, kind="message_created")
+        self.assertEqual((notification.count, notification.body), (4, "0"))
+        # Un email pour le lot résumé, pas un par message
+        self.assertEqual([m.to for m in mail.outbox], [["expert@coop.org"]])
+
+    def test_canal_externe_abstrait_et_isole(self):
+        with self.assertRaises(TypeError):
+            notifications.ExternalChannel()
+
+        class FlakyChannel(notifications.ExternalChannel):
+            sent = []
+
+            def send(self, digest):
+                if digest.recipient_id == 1:
+                    raise ConnectionError
+                self.sent.append(digest.recipient_id)
+
+        digests = [notifications.Digest(pk, "message_created", None) for pk in (1, 2)]
+        with self.assertLogs("core.notifications", "ERROR"):
+            FlakyChannel().send_all(digests)
+        self.assertEqual(FlakyChannel.sent, [2])
+
+
+class IdempotencyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.paysan, _, self.consultation = make_consultation()
+        self.client = APIClient()
+
+    def test_relance_rejouee_sans_nouvelle_ecriture(self):
+        self.client.force_authenticate(self.paysan)
+        payload = {"messages": [{"consultation": self.consultation.pk, "content": "bonjour"}]}
+        first = self.client.post("/api/messages/batch/", payload, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        retry = self.client.post("/api/messages/batch/", payload, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_creation_de_module_rejouee_avec_ses_en_tetes(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.enterContext(override_settings(MEDIA_ROOT=tmp))
+        self.client.force_authenticate(self.consultation.expert)
+
+        def post():
+            return self.client.post("/api/modules/", {
+                "titre": "Semis", "description": "-", "type_culture": "maïs",
+                "fichier": ContentFile(b"%PDF-1.4", name="semis.pdf"),
+            }, format="multipart", HTTP_IDEMPOTENCY_KEY="m1")
+
+        first, retry = post(), post()
+        self.assertEqual(first.status_code, 201)
+        module = Module.objects.get()
+        self.assertEqual(first["Location"], f"/api/modules/{module.pk}/")
+        self.assertEqual(first["ETag"], f'"{module.checksum}"')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual((retry["Location"], retry["ETag"]), (first["Location"], first["ETag"]))
+        self.assertEqual(retry.json(), first.json())
+
+    def test_portee_anonyme_ignore_x_forwarded_for(self):
+        request = RequestFactory().post("/api/auth/register/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="192.0.2.1")
+        request.user = None
+        spoofed = RequestFactory().post("/api/auth/register/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="192.0.2.2")
+        spoofed.user = None
+        self.assertEqual(_cache_key(request, "k"), _cache_key(spoofed, "k"))
+
+
+class RegistrationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def register(self, email, username):
+        return APIClient().post("/api/auth/register/", {
+            "username": username, "email": email, "password": "secret1", "password2": "secret1", "role": "paysan",
+        }, format="json")
+
+    def test_email_unique_sans_tenir_compte_de_la_casse(self):
+        self.assertEqual(self.register("Awa@Coop.org", "awa").status_code, 201)
+        response = self.register("awa@coop.ORG", "awa2")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json())
+        self.assertEqual(User.existing_emails([" AWA@coop.org "]), {"awa@coop.org"})
+        self.assertEqual(User.pending_count("paysan"), 1)
+
+
+class RegionAggregatesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.region = Region.objects.create(code="thies", name="Thiès", aliases=["Thies ville"])
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="admin", password="x", role="admin"))
+
+    def add_paysan(self, username, region, culture, superficie, position=(None, None)):
+        user = User.objects.create_user(username=username, password="x", role="paysan")
+        return Paysan.objects.create(
+            user=user, region=region, type_culture=culture, superficie=superficie, experience=1,
+            latitude=position[0], longitude=position[1],
+        )
+
+    def test_region_normalisee_et_agregats_invalides(self):
+        paysan = self.add_paysan("p1", "THIES VILLE", "Maïs", 2.0, (14.79, -16.93))
+        self.assertEqual(paysan.region_ref_id, self.region.pk)
+        self.assertEqual(paysan.geohash[:5], geo.encode(14.79, -16.93, 5))
+        self.assertEqual(geo.encode(57.64911, 10.40744), "u4pruydqq")
+
+        url = f"/api/regions/{self.region.pk}/aggregates/"
+        self.assertEqual(self.client.get(url).json()["paysans"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_paysan("p2", "thiès", " maïs ", 3.0)
+        data = self.client.get(url).json()
+        self.assertEqual((data["paysans"], data["hectares"]), (2, 5.0))
+        self.assertEqual(data["cultures"], [
+            {"type_culture": "maïs", "paysans": 2, "hectares": 5.0, "superficie_moyenne": 2.5},
+        ])
+        self.assertEqual([c["paysans"] for c in data["cells"]], [1])
+
+
+@override_settings(DASHBOARD_CONCURRENT=False)
+class DashboardTest(TestCase):
+    def test_sections_demandees_en_un_aller_retour(self):
+        paysan, expert, consultation = make_consultation()
+        consultation.record_messages([
+            Message.objects.create(consultation=consultation, sender=expert, receiver=paysan, content="a"),
+        ])
+        access = RotatingRefreshToken.for_user(paysan).access_token
+
+        response = self.client.get(
+            "/api/dashboard/?sections=unread,consultations", HTTP_AUTHORIZATION=f"Bearer {access}",
+        )
+        data = response.json()
+        self.assertEqual(set(data), {"unread", "consultations"})
+        self.assertEqual(data["unread"], {"messages": 1, "notifications": 0})
+        self.assertEqual(data["consultations"]["status_counts"]["pending"], 1)
+        self.assertEqual(self.client.get("/api/dashboard/").status_code, 401)
+
+
+class ModuleBundleTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.enterContext(override_settings(MEDIA_ROOT=tmp))
+        self.paysan, self.expert, _ = make_consultation()
+        Paysan.objects.create(user=self.paysan, region="-", type_culture="Maïs", superficie=1, experience=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.paysan)
+
+    def add_module(self, titre, culture):
+        return Module.objects.create(
+            expert=self.expert, titre=titre, description="-", type_culture=culture,
+            fichier=ContentFile(titre.encode() * 100, name=f"{titre}.pdf"),
+        )
+
+    def test_version_delta_et_reprise(self):
+        self.add_module("general", "")
+        self.add_module("semis", "Maïs")
+        self.assertEqual(sorted(b.culture for b in bundles.build_all()), ["general", "mais"])
+        self.assertEqual(bundles.build_all(), [])
+
+        new = self.add_module("recolte", "Maïs")
+        bundles.build_all()
+        sync = self.client.get("/api/bundles/sync/?version=1").json()
+        delta = ModuleBundle.objects.get(pk=sync["bundle"]["id"])
+        self.assertEqual((delta.version, delta.base_version), (2, 1))
+        with zipfile.ZipFile(delta.fichier.path) as archive:
+            self.assertEqual(
+                [n for n in archive.namelist() if n.startswith("modules/")],
+                [f"modules/{new.pk}/recolte.pdf"],
+            )
+        self.assertTrue(self.client.get("/api/bundles/sync/?version=2").json()["up_to_date"])
+
+        response = self.client.get(f"/api/bundles/{delta.pk}/download/", HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        with open(delta.fichier.path, "rb") as f:
+            f.seek(10)
+            self.assertEqual(b"".join(response.streaming_content), f.read(10))
+
+
+class SoftDeleteTest(TestCase):
+    def test_suppression_logique_puis_purge(self):
+        paysan, expert, consultation = make_consultation()
+        Message.objects.create(consultation=consultation, sender=paysan, receiver=expert, content="a")
+        # Compteur tenu par la vue de création
+        Expert.bump(expert.pk, **consultation.counter_deltas())
+        self.assertEqual(Expert.objects.get(user=expert).open_consultations, 1)
+
+        self.assertTrue(paysan.soft_delete(actor=expert))
+        self.assertFalse(paysan.soft_delete(actor=expert))
+        self.assertFalse(User.objects.filter(pk=paysan.pk).exists())
+        self.assertFalse(Consultation.objects.filter(pk=consultation.pk).exists())
+        self.assertEqual(Expert.objects.get(user=expert).open_consultations, 0)
+        # Nom d'utilisateur libéré pour une nouvelle inscription
+        User.objects.create_user(username="paysan", password="x")
+
+        # Délai de grâce : rien n'est purgé
+        call_command("purge_users", stdout=io.StringIO())
+        self.assertTrue(User.all_objects.filter(pk=paysan.pk).exists())
+
+        out = io.StringIO()
+        call_command("purge_users", "--grace-hours=0", "--pause=0", stdout=out)
+        self.assertIn("1 compte(s) purgé(s)", out.getvalue())
+        self.assertFalse(User.all_objects.filter(pk=paysan.pk).exists())
+        self.assertFalse(Consultation._base_manager.filter(pk=consultation.pk).exists())
+        self.assertFalse(Message._base_manager.filter(consultation_id=consultation.pk).exists())
+        self.assertTrue(User.objects.filter(pk=expert.pk).exists())
+
+
+    def test_purge_efface_les_televersements_en_cours(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.enterContext(override_settings(MODULE_UPLOAD_TEMP_DIR=tmp))
+        expert = User.objects.create_user(username="expert", password="x", role="expert")
+        uploads = [
+            ModuleUpload.objects.create(expert=expert, titre="Semis", description="-", filename="semis.pdf", size=6)
+            for _ in range(2)
+        ]
+        for upload in uploads:
+            with open(upload.temp_path, "wb") as f:
+                f.write(b"abc")
+
+        expert.soft_delete(actor=expert)
+        call_command("purge_users", "--grace-hours=0", "--pause=0", stdout=io.StringIO())
+        self.assertFalse(ModuleUpload._base_manager.exists())
+        self.assertEqual(os.listdir(tmp), [])
+
+
+class GunicornConfigTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        spec = importlib.util.spec_from_file_location(
+            "gunicorn_conf", os.path.join(settings.BASE_DIR, "gunicorn.conf.py")
+        )
+        cls.conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(cls.conf)
+
+    def test_workers_bornes_par_la_memoire(self):
+        mb = 1024 ** 2
+        self.assertEqual(self.conf.autotune(4, None, 200 * mb), (9, 1))
+        self.assertEqual(self.conf.autotune(4, 8192 * mb, 200 * mb), (9, 1))
+        # 1 Gio : 3 workers, les threads compensent
+        self.assertEqual(self.conf.autotune(4, 1024 * mb, 200 * mb), (3, 3))
+        self.assertEqual(self.conf.autotune(8, 100 * mb, 200 * mb), (1, 8))
+
+    def test_demarrage_refuse_sans_cache_partage(self):
+        server = mock.Mock()
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with self.settings(DEBUG=False, CACHES=locmem), mock.patch.object(self.conf, "preload_app", True):
+            with self.assertRaises(SystemExit):
+                self.conf.when_ready(server)
+        self.assertTrue(server.log.error.called)
+
+
+class HealthProbeTest(TestCase):
+    def test_vivant_et_pret(self):
+        live = self.client.get("/healthz")
+        self.assertEqual((live.status_code, live.json()), (200, {"status": "ok"}))
+        self.assertEqual(live["Cache-Control"], "no-store")
+
+        ready = self.client.get("/readyz")
+        self.assertEqual(ready.status_code, 200)
+        self.assertEqual(ready.json()["checks"], {"database": "ok", "migrations": "ok"})
+
+    def test_migrations_en_attente(self):
+        with mock.patch("core.middleware.MigrationExecutor") as executor:
+            executor.return_value.migration_plan.return_value = [("core", "9999_x")]
+            response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["checks"]["migrations"], "1 migration(s) en attente")
+
+    def test_saturation(self):
+        self.client.get("/healthz")
+        self.client.get("/api/experts/")
+        # Aucun jeton configuré : sonde fermée
+        self.assertEqual(self.client.get("/saturation").status_code, 403)
+
+        cache.clear()
+        with self.settings(SATURATION_TOKEN="s3cret", SATURATION_QUEUE_CAP=2):
+            self.assertEqual(self.client.get("/saturation").status_code, 403)
+            body = self.client.get("/saturation", HTTP_X_SATURATION_TOKEN="s3cret").json()
+            self.assertEqual(set(body), {"worker", "database", "queues"})
+            self.assertGreaterEqual(body["worker"]["requests"], 1)
+            self.assertEqual(body["queues"], {"outbox": 0, "unassigned_consultations": 0, "cap": 2})
+
+            # Chiffres globaux servis depuis le cache : aucune requête SQL
+            with self.assertNumQueries(0):
+                self.client.get("/saturation", HTTP_X_SATURATION_TOKEN="s3cret")
+
+
+@override_settings(ADMIN_ACTION_CHUNK=2)
+class AdminTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="root", email="root@x.fr", password="x")
+        self.client.force_login(self.admin)
+
+    def test_listes(self):
+        make_consultation()
+        request = RequestFactory().get("/admin/")
+        request.user = self.admin
+        for model, model_admin in django_admin.site._registry.items():
+            if model._meta.app_label != "core":
+                continue
+            opts = model._meta
+            with self.subTest(model=opts.model_name):
+                response = self.client.get(reverse(f"admin:core_{opts.model_name}_changelist"))
+                self.assertEqual(response.status_code, 200)
+                if isinstance(model_admin, ScalableAdmin):
+                    self.assertNotIn("delete_selected", model_admin.get_actions(request))
+
+    def test_validation_groupee(self):
+        users = [User.objects.create_user(username=f"u{i}", password="x", role="paysan") for i in range(5)]
+        users[0].verify()
+        pending = User.pending_count("paysan")
+
+        response = self.client.post(reverse("admin:core_user_changelist"), {
+            "action": "validate_users",
+            "_selected_action": [u.pk for u in users],
+        }, follow=True)
+        self.assertContains(response, "4 compte(s) validé(s)")
+        self.assertEqual(User.objects.filter(pk__in=[u.pk for u in users], is_verified=False).count(), 0)
+        self.assertEqual(User.pending_count("paysan"), pending - 4)
+        self.assertEqual(AuditEvent.objects.filter(action="user.verified").count(), 5)
+
+    def test_suppression_logique_groupee(self):
+        users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(3)]
+        pending = User.pending_count()
+        self.client.post(reverse("admin:core_user_changelist"), {
+            "action": "soft_delete_users",
+            "_selected_action": [u.pk for u in users],
+        })
+        self.assertFalse(User.objects.filter(pk__in=[u.pk for u in users]).exists())
+        self.assertEqual(User.all_objects.filter(pk__in=[u.pk for u in users]).count(), 3)
+        self.assertEqual(
+            sorted(User.all_objects.filter(pk__in=[u.pk for u in users]).values_list("username", flat=True)),
+            [f"deleted-{u.pk}-{u.username}" for u in users],
+        )
+        self.assertEqual(User.pending_count(), pending - 3)
+        self.assertEqual(AuditEvent.objects.filter(action="user.deleted").count(), 3)
+
+    def test_suppression_groupee_une_transaction_par_tranche(self):
+        users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(4)]
+        with mock.patch.object(audit, "record_many", wraps=audit.record_many) as spy:
+            self.client.post(reverse("admin:core_user_changelist"), {
+                "action": "soft_delete_users",
+                "_selected_action": [u.pk for u in users],
+            })
+        # ADMIN_ACTION_CHUNK=2 : deux tranches, un lot d'audit chacune
+        self.assertEqual(spy.call_count, 2)
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_comptage_borne(self):
+        for i in range(4):
+            User.objects.create_user(username=f"u{i}", password="x", role="expert")
+        paginator = EstimatedCountPaginator(User.objects.filter(role="expert").order_by("-pk"), 50)
+        self.assertEqual(paginator.count, 2)
+
+    @override_settings(ADMIN_COUNT_LIMIT=4)
+    def test_page_hors_plafond(self):
+        experts = [User.objects.create_user(username=f"u{i}", password="x", role="expert") for i in range(7)]
+        url = reverse("admin:core_user_changelist")
+        with mock.patch.object(django_admin.site._registry[User], "list_per_page", 2):
+            # 4 lignes comptées, 2 pages atteignables : ?p=5 sert la page 2
+            response = self.client.get(url, {"role__exact": "expert", "p": 5})
+            self.assertEqual(response.status_code, 200)
+            cl = response.context["cl"]
+            self.assertEqual(cl.page_num, 2)
+            self.assertEqual([u.pk for u in cl.result_list], [experts[4].pk, experts[3].pk])
+            self.assertContains(response, "affinez avec les filtres")
+
+            response = self.client.get(url, {"role__exact": "expert", "p": 2})
+            self.assertNotContains(response, "affinez avec les filtres")
+
+            # Saut par clé au-delà du plafond
+            response = self.client.get(url, {"role__exact": "expert", "id__lt": experts[2].pk})
+            self.assertEqual([u.pk for u in response.context["cl"].result_list], [experts[1].pk, experts[0].pk])
@@ -0,0 +1,248 @@
+# core/throttling.py
+"""
+Limitation de débit pour l'authentification et la messagerie.
+
+Deux algorithmes (fenêtre fixe, fenêtre glissante) appliqués par IP,
+par utilisateur ou par endpoint, sur des compteurs incrémentés de façon
+atomique (add/incr du cache, sans verrou). Les compteurs vivent dans le cache partagé
+(settings.CACHES) ; MemoryCounterStore le remplace dans les tests via
+le réglage RATE_LIMIT_STORE.
+
+Les throttles DRF s'exécutent dans `initial()`, donc avant le hachage
+du mot de passe et toute requête en base. DRF les évalue tous, même
+après un refus : une requête refusée par l'un n'est pas décomptée par
+les suivants (l'ordre de `throttle_classes` compte, du plus fin au plus
+large). L'IP vient de REMOTE_ADDR, ou de X-Forwarded-For selon
+REST_FRAMEWORK["NUM_PROXIES"] (proxys de confiance).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+# ============================================================
+# STOCKAGE DES COMPTEURS
+# ============================================================
+
+class CacheCounterStore:
+    """
+    Compteurs dans le cache Django (Redis/Memcached en production).
+    Uniquement add() et incr(), atomiques côté serveur : pas de verrou,
+    donc pas de refus dû à la contention sur une clé très sollicitée.
+    """
+
+    def __init__(self, alias="default"):
+        self.cache = caches[alias]
+
+    def incr(self, key, ttl, delta=1):
+        self.cache.add(key, 0, ttl)
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # Clé expirée entre add() et incr()
+            self.cache.add(key, 0, ttl)
+            return self.cache.incr(key, delta)
+
+    def get(self, key):
+        return self.cache.get(key) or 0
+
+
+class MemoryCounterStore:
+    """Substitut en mémoire (un seul processus), pour les tests."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        value, expires = self._data.get(key, (None, 0))
+        return value if expires > now else None
+
+    def incr(self, key, ttl, delta=1):
+        with self._lock:
+            now = time.monotonic()
+            current = self._get(key, now)
+            if current is None:
+                current, expires = 0, now + ttl
+            else:
+                expires = self._data[key][1]
+            self._data[key] = (current + delta, expires)
+            return current + delta
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key, time.monotonic()) or 0
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_stores = {}
+
+
+def get_store():
+    path = getattr(settings, "RATE_LIMIT_STORE", "core.throttling.CacheCounterStore")
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+# ============================================================
+# THROTTLES DRF
+# ============================================================
+
+class RateThrottle(BaseThrottle):
+    """
+    Base commune : `scope` désigne le débit dans DEFAULT_THROTTLE_RATES
+    ("10/min"), `key_by` la clé de comptage.
+    """
+    scope = None
+    key_by = "ip"       # ip | user | endpoint | login
+    methods = None      # None = toutes les méthodes
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def parse_rate(self):
+        num, period = api_settings.DEFAULT_THROTTLE_RATES[self.scope].split("/")
+        duration = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+        return int(num), duration
+
+    def get_key(self, request, view):
+        if self.key_by == "endpoint":
+            ident = "all"
+        elif self.key_by == "user":
+            if not request.user or not request.user.is_authenticated:
+                ident = f"ip:{self.get_ident(request)}"
+            else:
+                ident = request.user.pk
+        elif self.key_by == "login":
+            # Compte visé (attaques distribuées sur un même identifiant)
+            ident = str(request.data.get("login_input") or "").strip().lower()
+            if not ident:
+                return None
+        else:
+            ident = self.get_ident(request)
+        return f"rl:{self.scope}:{ident}"
+
+    def allow_request(self, request, view):
+        if self.methods and request.method not in self.methods:
+            return True
+        # Déjà refusée par un throttle précédent : rien à décompter ici
+        if getattr(request, "_rate_limited", False):
+            return True
+
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+
+        num, duration = self.parse_rate()
+        cost = self.get_cost(request, view)
+        if not cost:
+            return True
+        allowed = self.consume(get_store(), key, num, duration, time.time(), cost)
+        if not allowed:
+            request._rate_limited = True
+        return allowed
+
+    def get_cost(self, request, view):
+        """Unités décomptées pour cette requête (0 : non décomptée)."""
+        return 1
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class FixedWindowThrottle(RateThrottle):
+    """`num` requêtes par fenêtre alignée de `duration` secondes."""
+
+    def consume(self, store, key, num, duration, now, cost=1):
+        window = int(now // duration)
+        count = store.incr(f"{key}:{window}", duration, cost)
+
+        if count > num:
+            # Refus rendu : seules les requêtes servies remplissent la fenêtre
+            store.incr(f"{key}:{window}", duration, -cost)
+            self.wait_seconds = (window + 1) * duration - now
+            return False
+        return True
+
+
+class SlidingWindowThrottle(RateThrottle):
+    """
+    `num` requêtes sur les `duration` dernières secondes, estimées par
+    fenêtre glissante : compteur de la fenêtre courante plus la part
+    encore couverte de la précédente. Lisse les rafales en bord de
+    fenêtre sans lecture-modification-écriture (incr atomique seul).
+    """
+
+    def consume(self, store, key, num, duration, now, cost=1):
+        window = int(now // duration)
+        elapsed = now - window * duration
+        # La fenêtre courante sert encore de précédente à la suivante
+        count = store.incr(f"{key}:{window}", 2 * duration, cost)
+        previous = store.get(f"{key}:{window - 1}")
+        weight = 1 - elapsed / duration
+
+        if previous * weight + count <= num:
+            return True
+
+        store.incr(f"{key}:{window}", 2 * duration, -cost)
+        count -= cost
+        if count + cost > num or not previous:
+            # Fenêtre courante seule déjà pleine : attendre la suivante
+            self.wait_seconds = duration - elapsed
+        else:
+            # Part de la fenêtre précédente à laisser s'écouler
+            self.wait_seconds = (1 - (num - count - cost) / previous) * duration - elapsed
+        return False
+
+
+# ------------------------------------------------------------
+# Throttles des endpoints
+# ------------------------------------------------------------
+
+class LoginEndpointThrottle(SlidingWindowThrottle):
+    scope = "login"
+    key_by = "endpoint"
+
+
+class LoginIPThrottle(SlidingWindowThrottle):
+    scope = "login_ip"
+    key_by = "ip"
+
+
+class LoginAccountThrottle(FixedWindowThrottle):
+    scope = "login_account"
+    key_by = "login"
+
+
+class RegisterIPThrottle(FixedWindowThrottle):
+    scope = "register"
+    key_by = "ip"
+
+
+class MessageUserThrottle(SlidingWindowThrottle):
+    """Une unité par message, y compris dans un envoi groupé."""
+    scope = "messages"
+    key_by = "user"
+    methods = ("POST",)
+
+    @classmethod
+    def capacity(cls):
+        return cls().parse_rate()[0]
+
+    def get_cost(self, request, view):
+        if getattr(view, "action", None) != "batch":
+            return 1
+        items = request.data.get("messages") if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return 1
+        # Lot plus grand que le débit : refusé par la vue (400), rien à décompter
+        return len(items) if len(items) <= self.capacity() else 0
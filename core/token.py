@@ -1,11 +1,118 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+import time
+
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+
+from .authentication import GENERATION_CLAIM
 
 User = get_user_model()
 
+
+# ============================================================
+# ROTATION DES REFRESH TOKENS + RÉVOCATION COMPACTE
+# ============================================================
+# Pas de table des jetons émis (app blacklist de SimpleJWT) :
+#
+# - chaque jeton porte la génération de l'utilisateur (claim « gen ») ;
+#   User.revoke_tokens() l'incrémente et invalide d'un coup tous ses
+#   jetons, access compris (vérifié avec l'utilisateur déjà chargé) ;
+# - un refresh ne sert qu'une fois : son jti entre dans une liste de
+#   refus en cache qui expire avec lui. Taille bornée par les refresh
+#   de la durée de vie d'un jeton, coût O(1) par refresh.
+#
+# Le rejeu d'un refresh déjà utilisé (jeton volé) révoque toute la session,
+# sauf dans les JWT_REFRESH_REUSE_GRACE secondes qui suivent sa rotation :
+# un client qui n'a pas reçu la réponse (réseau mobile) et réessaie
+# reçoit le même successeur, gardé en cache le temps de ce délai.
+
+
+def denylist_key(jti):
+    return f"jwt_denylist:{jti}"
+
+
+def successor_key(jti):
+    return f"jwt_successor:{jti}"
+
+
+def consume_refresh(token):
+    """
+    Marque le refresh comme utilisé ; renvoie None s'il ne l'était pas,
+    sinon l'heure (epoch) de sa première utilisation.
+    """
+    now = time.time()
+    ttl = max(int(token["exp"] - now), 1)
+    key = denylist_key(token[api_settings.JTI_CLAIM])
+    if cache.add(key, now, ttl):
+        return None
+    # Anciennes entrées (valeur 1) : hors délai de grâce
+    return cache.get(key, 0)
+
+
+class RotatingRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[GENERATION_CLAIM] = user.token_generation
+        return token
+
+
+class RotatingRefreshSerializer(TokenRefreshSerializer):
+    """Nouveau couple access/refresh ; l'ancien refresh est consommé."""
+    token_class = RotatingRefreshToken
+
+    def validate(self, attrs):
+        try:
+            refresh = self.token_class(attrs["refresh"])
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+
+        user_id = refresh.get(api_settings.USER_ID_CLAIM)
+        jti = refresh[api_settings.JTI_CLAIM]
+        grace = settings.JWT_REFRESH_REUSE_GRACE
+
+        used_at = consume_refresh(refresh)
+        if used_at is not None:
+            if time.time() - used_at > grace:
+                User.revoke_tokens(user_id)
+                raise InvalidToken("Refresh token déjà utilisé : session révoquée")
+            # Nouvel essai juste après la rotation : même successeur
+            successor = cache.get(successor_key(jti))
+            if successor is None:
+                # Rotation encore en cours dans une requête concurrente
+                raise InvalidToken("Refresh token en cours de rotation, réessayez")
+            self.check_generation(user_id, refresh)
+            return successor
+
+        self.check_generation(user_id, refresh)
+
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        data = {"access": str(refresh.access_token), "refresh": str(refresh)}
+        if grace > 0:
+            cache.set(successor_key(jti), data, grace)
+        return data
+
+    @staticmethod
+    def check_generation(user_id, refresh):
+        generation = (
+            User.objects.filter(pk=user_id, is_active=True)
+            .values_list("token_generation", flat=True).first()
+        )
+        if generation is None or generation != refresh.get(GENERATION_CLAIM, 0):
+            raise InvalidToken("Session révoquée")
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RotatingRefreshToken
+
     def validate(self, attrs):
         login_input = attrs.get("username")
         password = attrs.get("password")
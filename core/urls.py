@@ -5,7 +5,11 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (
     ModuleViewSet,
+    ModuleBundleViewSet,
+    ModuleUploadViewSet,
+    NotificationViewSet,
     PaysanViewSet,
+    RegionViewSet,
     RegisterAPIView,
     LoginAPIView,
     UserViewSet,
@@ -14,7 +18,11 @@ from .views import (
     MessageViewSet,
     ModuleViewSet,
     MeAPIView,
+    dashboard,
     admin_pending_users,
+    admin_review_queue,
+    admin_compression_stats,
+    admin_audit,
     AdminVerifyUserView,
     AdminDeleteUserView
     
@@ -25,9 +33,13 @@ router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='users')
 router.register(r'experts', ExpertViewSet, basename='experts')
 router.register(r'paysans', PaysanViewSet, basename='paysans')
+router.register(r'regions', RegionViewSet, basename='regions')
 router.register(r'consultations', ConsultationViewSet, basename='consultations')
 router.register(r'messages', MessageViewSet, basename='messages')
 router.register(r'modules', ModuleViewSet, basename='modules')
+router.register(r'module-uploads', ModuleUploadViewSet, basename='module-uploads')
+router.register(r'bundles', ModuleBundleViewSet, basename='bundles')
+router.register(r'notifications', NotificationViewSet, basename='notifications')
 
 urlpatterns = [
     # AUTH
@@ -39,12 +51,22 @@ urlpatterns = [
      # ✅ PROFIL PAYSAN
     path("me/", MeAPIView.as_view()),
 
+    # TABLEAU DE BORD (démarrage de l'application)
+    path("dashboard/", dashboard, name="dashboard"),
+
     # Routes API
     path("", include(router.urls)),
  
     # ADMIN - GESTION DES UTILISATEURS
     path('admin/pending-users/', admin_pending_users, name='admin_pending_users'),
+    path('admin/review-queue/', admin_review_queue, name='admin_review_queue'),
     
     path('admin/verify-user/<int:user_id>/', AdminVerifyUserView.as_view(), name='admin_verify_user'),
     path('admin/delete-user/<int:user_id>/', AdminDeleteUserView.as_view(), name='admin_delete_user'),
+
+    # Octets économisés / CPU de compression par endpoint
+    path('admin/compression-stats/', admin_compression_stats, name='admin_compression_stats'),
+
+    # Journal d'audit : ?since=&until=&action=&actor=&target_type=&target_id=&cursor=
+    path('admin/audit/', admin_audit, name='admin_audit'),
 ]
\ No newline at end of file
@@ -1,41 +1,125 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, time
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
-from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q, Count
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import slugify
 
 from rest_framework import viewsets, generics, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import AuthenticationFailed, NotFound, PermissionDenied, ValidationError
 from rest_framework.views import APIView
-
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from .models import Expert, Consultation, Message
+from rest_framework.utils.urls import replace_query_param
+
+from rest_framework_simplejwt.exceptions import InvalidToken
+from asgiref.sync import sync_to_async
+
+from . import audit
+from . import dashboard as dashboard_sections
+from . import geo
+from .bundles import GENERAL as GENERAL_BUNDLE
+from .cache import cached, versioned_key
+from .models import Expert, Consultation, Message, MessageArchive, Paysan, Region, TransitionConflict
+from .regions import region_aggregates
 from .serializers import (
     UserSerializer,
     UserRegisterSerializer,
     ExpertSerializer,
     ConsultationSerializer,
     MessageSerializer,
+    MessageBatchItemSerializer,
+    RegionSerializer,
 )
 from .permissions import (
     IsAdminOrReadOnly,
     IsOwnerOrReadOnly,
     IsExpert,
 )
+from .fast_serializers import MessageRowSerializer, ModuleRowSerializer, wants_lean
+from .idempotency import IdempotentCreateMixin, run_idempotent
+from .middleware import compression_stats
+from .renderers import FastJSONRenderer
+from .authentication import GenerationJWTAuthentication
+from .token import RotatingRefreshSerializer, RotatingRefreshToken
+from .throttling import (
+    LoginEndpointThrottle,
+    LoginIPThrottle,
+    LoginAccountThrottle,
+    RegisterIPThrottle,
+    MessageUserThrottle,
+)
 from rest_framework.decorators import api_view, permission_classes
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from .models import Module
-from .serializers import ModuleSerializer
+from .models import AuditEvent, Module, ModuleBundle, ModuleUpload, Notification
+from .serializers import ModuleBundleSerializer, ModuleSerializer, ModuleUploadSerializer, NotificationSerializer
 
 User = get_user_model()
 
+
+# ============================================================
+# PROJECTION DES CHAMPS (?fields= / ?exclude=)
+# ============================================================
+class FieldProjectionMixin:
+    """
+    Répercute ?fields= / ?exclude= sur la requête SQL : les colonnes
+    que le serializer ne rendra pas sont différées (.defer()).
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        deferred = self.get_serializer_class().deferred_columns(self.request)
+        return queryset.defer(*deferred) if deferred else queryset
+
+
+# ============================================================
+# LISTES EN CACHE (anti-ruée, invalidées par génération)
+# ============================================================
+class CachedListMixin:
+    """
+    `cached_list(request, build)` : données de la liste mises en cache par
+    URL absolue (schéma : liens de pagination et de fichiers ; filtres,
+    ?fields=, ?lean=…) et format négocié, un seul calcul concurrent.
+    Les listes concernées sont identiques pour tous les utilisateurs.
+    """
+    cache_namespace = None
+
+    def cached_list(self, request, build):
+        key = versioned_key(
+            self.cache_namespace,
+            request.scheme,
+            request.get_host(),
+            request.get_full_path(),
+            getattr(request.accepted_renderer, "format", ""),
+        )
+        return Response(cached(key, build, settings.LIST_CACHE_TTL))
+
+
 # ============================================================
 # LOGIN JWT PERSONNALISÉ (email OU username)
 # ============================================================
 class LoginAPIView(generics.GenericAPIView):
     permission_classes = [permissions.AllowAny]
+    # Du plus fin au plus large : le compteur global n'est pas rempli par une IP déjà refusée
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle, LoginEndpointThrottle]
 
     def post(self, request):
         login_input = request.data.get("login_input")
@@ -69,7 +153,7 @@ class LoginAPIView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        refresh = RefreshToken.for_user(user)
+        refresh = RotatingRefreshToken.for_user(user)
 
         return Response({
             "access": str(refresh.access_token),
@@ -100,22 +184,25 @@ class RefreshAPIView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Rotation : nouveau refresh à chaque appel, l'ancien est consommé
+        serializer = RotatingRefreshSerializer(data={"refresh": refresh_token})
         try:
-            refresh = RefreshToken(refresh_token)
-            return Response({"access": str(refresh.access_token)})
-        except Exception:
+            serializer.is_valid(raise_exception=True)
+        except InvalidToken:
             return Response(
                 {"detail": "Refresh token invalide"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        return Response(serializer.validated_data)
 
 
 # ============================================================
 # REGISTER
 # ============================================================
-class RegisterAPIView(generics.CreateAPIView):
+class RegisterAPIView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = UserRegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegisterIPThrottle]
 
 
 # ============================================================
@@ -133,10 +220,48 @@ class MeAPIView(generics.RetrieveUpdateAPIView):
         return user
 
 
+# ============================================================
+# TABLEAU DE BORD AGRÉGÉ (vue asynchrone)
+# GET /api/dashboard/?sections=profile,consultations,unread,modules
+# Remplace /me/, /paysans|experts/me/, /consultations/, /messages/, /modules/
+# au démarrage de l'application : un aller-retour, un décodage JWT
+# ============================================================
+def _json(data, status_code=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status_code, content_type="application/json")
+
+
+async def dashboard(request):
+    if request.method != "GET":
+        return _json({"detail": f'Méthode "{request.method}" non autorisée.'}, 405)
+
+    # Vue Django native (DRF n'est pas asynchrone) : authentification JWT directe
+    authenticator = GenerationJWTAuthentication()
+    try:
+        result = await sync_to_async(authenticator.authenticate)(request)
+    except AuthenticationFailed as exc:
+        # Même corps d'erreur que DRF (InvalidToken détaille le motif)
+        result, error = None, exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+    else:
+        error = {"detail": "Informations d'authentification non fournies."}
+    if result is None:
+        response = _json(error, 401)
+        response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+        return response
+    user = result[0]
+
+    requested = request.GET.get("sections")
+    names = list(dashboard_sections.SECTIONS)
+    if requested:
+        names = [name for name in names if name in {n.strip() for n in requested.split(",")}]
+
+    data = await dashboard_sections.collect(user, request, names)
+    return _json(data)
+
+
 # ============================================================
 # USER VIEWSET
 # ============================================================
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().order_by("-id")
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
@@ -147,18 +272,133 @@ class UserViewSet(viewsets.ModelViewSet):
             return User.objects.all()
         return User.objects.filter(id=user.id)
 
+    def perform_destroy(self, instance):
+        instance.soft_delete(actor=self.request.user)
+
 
 # ============================================================
 # EXPERT VIEWSET
 # ============================================================
-class ExpertViewSet(viewsets.ModelViewSet):
+class ExpertViewSet(CachedListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     queryset = Expert.objects.select_related("user").all().order_by("-id")
     serializer_class = ExpertSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+    cache_namespace = "experts"
 
     def get_serializer_class(self):
         return ExpertSerializer
 
+    def list(self, request, *args, **kwargs):
+        parent = super().list
+        return self.cached_list(request, lambda: parent(request, *args, **kwargs).data)
+
+    # ==========================
+    # FILTRES : ?domaine=&experience_min=&experience_max=&disponible=
+    # ==========================
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        if params.get("domaine"):
+            queryset = queryset.filter(domaine=params["domaine"])
+        if params.get("experience_min", "").isdigit():
+            queryset = queryset.filter(experience__gte=int(params["experience_min"]))
+        if params.get("experience_max", "").isdigit():
+            queryset = queryset.filter(experience__lte=int(params["experience_max"]))
+        if params.get("disponible") in ("true", "false"):
+            queryset = queryset.filter(disponible=params["disponible"] == "true")
+
+        return queryset
+
+    # ==========================
+    # FACETTES (une seule requête agrégée)
+    # GET /api/experts/facets/
+    # ==========================
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        ranges = {
+            label: Count("id", filter=Q(experience__gte=low, **(
+                {"experience__lte": high} if high is not None else {}
+            )))
+            for label, low, high in Expert.EXPERIENCE_RANGES
+        }
+
+        rows = (
+            self.get_queryset()
+            .order_by()
+            .values("domaine")
+            .annotate(
+                total=Count("id"),
+                disponibles=Count("id", filter=Q(disponible=True)),
+                **ranges
+            )
+        )
+
+        domaines, experience = [], dict.fromkeys(ranges, 0)
+        disponibles = indisponibles = 0
+        for row in rows:
+            domaines.append({"value": row["domaine"], "count": row["total"]})
+            disponibles += row["disponibles"]
+            indisponibles += row["total"] - row["disponibles"]
+            for label in ranges:
+                experience[label] += row[label]
+
+        return Response({
+            "domaine": sorted(domaines, key=lambda d: -d["count"]),
+            "experience": [{"range": label, "count": n} for label, n in experience.items()],
+            "disponible": {"true": disponibles, "false": indisponibles},
+        })
+
+    # ==========================
+    # EXPERTS PROCHES
+    # GET /api/experts/nearby/?lat=&lon=&radius_km=&limit= (+ filtres ci-dessus)
+    # Sans lat/lon : position du profil paysan connecté
+    # ==========================
+    @action(detail=False, methods=["get"])
+    def nearby(self, request):
+        params = request.query_params
+
+        if "lat" in params or "lon" in params:
+            try:
+                latitude, longitude = float(params["lat"]), float(params["lon"])
+            except (KeyError, ValueError):
+                raise ValidationError({"lat": "lat et lon doivent être des nombres"})
+        else:
+            profile = Paysan.objects.filter(user=request.user).first()
+            if profile is None or not profile.has_position:
+                raise ValidationError({"lat": "Position requise (lat, lon)"})
+            latitude, longitude = profile.latitude, profile.longitude
+
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValidationError({"lat": "Coordonnées hors limites"})
+
+        try:
+            radius = float(params.get("radius_km", settings.NEARBY_RADIUS_KM))
+        except ValueError:
+            raise ValidationError({"radius_km": "Nombre attendu"})
+        radius = min(max(radius, 0.1), settings.NEARBY_RADIUS_MAX_KM)
+
+        limit = params.get("limit", "")
+        limit = min(int(limit), 100) if limit.isdigit() and int(limit) > 0 else 20
+
+        # Préfiltre sur l'index geohash (9 cellules), puis distance exacte
+        cells = geo.cells_around(latitude, longitude, radius)
+        candidates = self.get_queryset().filter(reduce(or_, (Q(geohash__startswith=c) for c in cells)))
+        nearest = geo.nearest(
+            latitude, longitude,
+            list(candidates.values_list("id", "latitude", "longitude")),
+            radius, limit,
+        )
+
+        experts = self.get_queryset().in_bulk([pk for pk, _ in nearest])
+        results = []
+        for pk, distance in nearest:
+            row = self.get_serializer(experts[pk]).data
+            row["distance_km"] = distance
+            results.append(row)
+
+        return Response({"count": len(results), "radius_km": radius, "results": results})
+
     @action(
         detail=False,
         methods=["get", "put"],
@@ -166,7 +406,7 @@ class ExpertViewSet(viewsets.ModelViewSet):
         url_path="me"
     )
     def me(self, request):
-        expert, _ = Expert.objects.get_or_create(
+        expert, created = Expert.objects.get_or_create(
             user=request.user,
             defaults={
                 "domaine": "Agriculture générale",
@@ -174,6 +414,8 @@ class ExpertViewSet(viewsets.ModelViewSet):
                 "description": "Profil expert"
             }
         )
+        if created:
+            expert.recount()
 
         if request.method == "PUT":
             serializer = ExpertSerializer(
@@ -235,10 +477,25 @@ class PaysanViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
 
+# ============================================================
+# RÉGIONS : GAZETTEER + AGRÉGATS
+# GET /api/regions/
+# GET /api/regions/<id>/aggregates/ → hectares par culture et par cellule
+# ============================================================
+class RegionViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Region.objects.all()
+    serializer_class = RegionSerializer
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=True, methods=["get"])
+    def aggregates(self, request, pk=None):
+        return Response(region_aggregates(self.get_object()))
+
+
 # ============================================================
 # CONSULTATION VIEWSET
 # ============================================================
-class ConsultationViewSet(viewsets.ModelViewSet):
+class ConsultationViewSet(IdempotentCreateMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     queryset = Consultation.objects.select_related(
         "paysan", "expert"
     ).all().order_by("-created_at")
@@ -256,51 +513,272 @@ class ConsultationViewSet(viewsets.ModelViewSet):
 
         return Consultation.objects.filter(paysan=user)
 
+    # Compteurs de l'expert mis à jour dans la même transaction
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(paysan=self.request.user)
+        consultation = serializer.save(paysan=self.request.user)
+        Expert.bump(consultation.expert_id, **consultation.counter_deltas())
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_expert_id = serializer.instance.expert_id
+        consultation = serializer.save()
+
+        if consultation.expert_id != old_expert_id:
+            Expert.bump(old_expert_id, **consultation.counter_deltas(-1))
+            Expert.bump(consultation.expert_id, **consultation.counter_deltas())
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        Expert.bump(instance.expert_id, **instance.counter_deltas(-1))
+        instance.delete()
+
+    def _transition(self, request, to_status):
+        consultation = self.get_object()
+
+        try:
+            consultation.transition(to_status, actor=request.user)
+        except TransitionConflict:
+            # Statut relu : l'instance chargée peut dater d'avant la course perdue
+            current = Consultation.objects.filter(pk=consultation.pk).values_list("status", flat=True).first()
+            return Response(
+                {"detail": f"Transition impossible depuis le statut « {current} »"},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return Response({"status": to_status})
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated, IsExpert])
     def accept(self, request, pk=None):
-        consultation = self.get_object()
-        consultation.status = "accepted"
-        consultation.save()
-        return Response({"status": "accepted"})
+        return self._transition(request, "accepted")
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated, IsExpert])
     def reject(self, request, pk=None):
-        consultation = self.get_object()
-        consultation.status = "rejected"
-        consultation.save()
-        return Response({"status": "rejected"})
+        return self._transition(request, "rejected")
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def close(self, request, pk=None):
+        return self._transition(request, "completed")
+
+    # ==========================
+    # BOÎTE DE RÉCEPTION (résumés précalculés, une seule requête indexée)
+    # GET /api/consultations/inbox/?cursor=<last_activity_at>,<id>&limit=
+    #   plus récentes d'abord, pagination par clé (index <côté>, -last_activity_at)
+    # ==========================
+    INBOX_PAGE_SIZE = 50
+    INBOX_PAGE_MAX = 200
+
+    @action(detail=False, methods=["get"])
+    def inbox(self, request):
+        user = request.user
+        side, counterpart = (
+            ("expert", "paysan") if user.role == "expert" else ("paysan", "expert")
+        )
+        params = request.query_params
+
+        consultations = (
+            Consultation.objects
+            .filter(**{side: user})
+            .select_related("last_message", counterpart)
+            .order_by("-last_activity_at", "-id")
+        )
+
+        cursor = params.get("cursor", "")
+        if cursor:
+            moment, _, last_id = cursor.rpartition(",")
+            moment = parse_datetime(moment)
+            if moment is None or not last_id.isdigit():
+                raise ValidationError({"cursor": "Curseur invalide"})
+            consultations = consultations.filter(
+                Q(last_activity_at__lt=moment) | Q(last_activity_at=moment, id__lt=int(last_id))
+            )
+
+        limit = params.get("limit", "")
+        limit = min(int(limit), self.INBOX_PAGE_MAX) if limit.isdigit() and int(limit) > 0 else self.INBOX_PAGE_SIZE
+        page = list(consultations[:limit + 1])
+        next_url = None
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", f"{last.last_activity_at.isoformat()},{last.id}"
+            )
+
+        data = []
+        for c in page:
+            other = getattr(c, counterpart)
+            last = c.last_message
+            data.append({
+                "id": c.id,
+                "sujet": c.sujet,
+                "status": c.status,
+                "counterpart": {"id": other.id, "username": other.username} if other else None,
+                "last_message": {
+                    "id": last.id,
+                    "content": last.content,
+                    "sender": last.sender_id,
+                    "created_at": last.created_at,
+                    "read_at": last.read_at,
+                } if last else None,
+                "unread_count": getattr(c, f"{side}_unread"),
+                "last_activity_at": c.last_activity_at,
+            })
+
+        return Response({"next": next_url, "results": data})
+
+    # ==========================
+    # HISTORIQUE COMPLET (lecture transparente des archives)
+    # ==========================
+    @action(detail=True, methods=["get"])
+    def messages(self, request, pk=None):
+        consultation = self.get_object()
+        return Response(consultation.message_history())
+
+    # ==========================
+    # HISTORIQUE COLONNAIRE (ids au lieu d'utilisateurs imbriqués)
+    # GET /api/consultations/<id>/history/?after=<message_id>
+    # ==========================
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        consultation = self.get_object()
+        after = request.query_params.get("after")
+        rows = consultation.message_history(after=int(after) if after and after.isdigit() else None)
+
+        columns = {
+            name: [r[name] for r in rows]
+            for name in MessageArchive.COLUMNS + ("archived",)
+        }
+        return Response({
+            "consultation": consultation.id,
+            "count": len(rows),
+            "columns": columns,
+        })
+
+    @action(detail=True, methods=["post"])
+    def read(self, request, pk=None):
         consultation = self.get_object()
-        consultation.status = "completed"
-        consultation.save()
-        return Response({"status": "completed"})
+        count = consultation.mark_read(request.user)
+        return Response({"read": count})
 
 
 # ============================================================
 # MESSAGE VIEWSET
 # ============================================================
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = Message.objects.select_related(
         "sender", "receiver", "consultation"
     ).all().order_by("created_at")
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [MessageUserThrottle]
 
     def get_queryset(self):
         user = self.request.user
+        # Ordre chronologique explicite, id en départage (listes et ?lean=1)
         return Message.objects.filter(
             Q(sender=user) |
             Q(receiver=user)
-        )
+        ).order_by("created_at", "id")
+
+    def list(self, request, *args, **kwargs):
+        # ?lean=1 : lignes values_list + table `users` dédupliquée
+        if wants_lean(request):
+            queryset = self.filter_queryset(self.get_queryset())
+            return Response(MessageRowSerializer(request).serialize(queryset))
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save()
 
+    # ==========================
+    # ENVOI GROUPÉ (clients hors-ligne)
+    # POST /api/messages/batch/ {"messages": [{"consultation": 1, "content": "..."}]}
+    # ==========================
+    BATCH_MAX = 500
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        return run_idempotent(request, lambda: self._batch(request))
+
+    def _batch(self, request):
+        user = request.user
+        items = request.data.get("messages")
+
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"messages": "Liste de messages obligatoire"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Chaque message est décompté (MessageUserThrottle) : pas de lot
+        # plus grand que le débit autorisé
+        limit = min(self.BATCH_MAX, MessageUserThrottle.capacity())
+        if len(items) > limit:
+            return Response(
+                {"messages": f"{limit} messages maximum par envoi"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = MessageBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {"index": index, "status": 400, "errors": serializer.errors}
+
+        # Participation vérifiée une fois par consultation (une seule requête)
+        consultations = Consultation.objects.filter(
+            Q(paysan=user) | Q(expert=user),
+            pk__in={data["consultation"] for _, data in valid},
+        ).only("id", "paysan_id", "expert_id").in_bulk()
+
+        to_create = []
+        for index, data in valid:
+            consultation = consultations.get(data["consultation"])
+            if consultation is None or consultation.expert_id is None:
+                results[index] = {
+                    "index": index,
+                    "status": 403,
+                    "errors": "Vous ne participez pas à cette consultation",
+                }
+                continue
+
+            receiver_id = (
+                consultation.expert_id
+                if consultation.paysan_id == user.id
+                else consultation.paysan_id
+            )
+            to_create.append((index, Message(
+                consultation=consultation,
+                sender=user,
+                receiver_id=receiver_id,
+                content=data["content"],
+            )))
+
+        with transaction.atomic():
+            Message.objects.bulk_create([m for _, m in to_create])
+
+            by_consultation = {}
+            for _, message in to_create:
+                by_consultation.setdefault(message.consultation, []).append(message)
+            for consultation, messages in by_consultation.items():
+                consultation.record_messages(messages)
+
+        for index, message in to_create:
+            results[index] = {
+                "index": index,
+                "status": 201,
+                "id": message.pk,
+                "created_at": message.created_at,
+            }
+
+        partial = any(r["status"] != 201 for r in results)
+        return Response(
+            {"created": len(to_create), "results": results},
+            status=status.HTTP_207_MULTI_STATUS if partial else status.HTTP_201_CREATED
+        )
+
 
 # ============================================================
 #  ADMIN API (VALIDATION UTILISATEURS)
@@ -316,8 +794,7 @@ class AdminVerifyUserView(APIView):
 
         try:
             user = User.objects.get(id=user_id)
-            user.is_verified = True
-            user.save()
+            user.verify(actor=request.user)
             return Response({"message": "Utilisateur validé"})
         except User.DoesNotExist:
             return Response({"error": "Utilisateur introuvable"}, status=404)
@@ -332,33 +809,206 @@ class AdminDeleteUserView(APIView):
 
         try:
             user = User.objects.get(id=user_id)
-            user.delete()
+            # Suppression logique immédiate ; lignes purgées par `purge_users`
+            user.soft_delete(actor=request.user)
             return Response({"message": "Utilisateur supprimé"})
         except User.DoesNotExist:
             return Response({"error": "Utilisateur introuvable"}, status=404)
 
 
+# ============================================================
+# FILE DE VALIDATION ADMIN
+# GET /api/admin/review-queue/?role=&joined_after=&joined_before=&after=&limit=
+#   pagination par clé (id) : coût constant quelle que soit la page
+# GET /api/admin/review-queue/?stream=1
+#   flux NDJSON (une ligne JSON par compte), mémoire constante
+# GET /api/admin/pending-users/?after=&limit=
+#   ancien format (liste), mêmes pages par clé, suivante dans Link
+# ============================================================
+REVIEW_FIELDS = (
+    "id", "username", "email", "first_name", "last_name",
+    "role", "phone", "date_joined",
+)
+REVIEW_PAGE_SIZE = 100
+REVIEW_PAGE_MAX = 1000
+REVIEW_STREAM_CHUNK = 1000
+
+
+def _parse_moment(param, value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({param: "Date invalide (AAAA-MM-JJ ou ISO 8601)"})
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _review_queryset(params):
+    queryset = User.objects.filter(is_verified=False)
+
+    role = params.get("role")
+    if role:
+        if role not in dict(User.ROLE_CHOICES):
+            raise ValidationError({"role": "Rôle inconnu"})
+        queryset = queryset.filter(role=role)
+
+    if params.get("joined_after"):
+        queryset = queryset.filter(date_joined__gte=_parse_moment("joined_after", params["joined_after"]))
+    if params.get("joined_before"):
+        queryset = queryset.filter(date_joined__lt=_parse_moment("joined_before", params["joined_before"]))
+
+    after = params.get("after", "")
+    if after:
+        if not after.isdigit():
+            raise ValidationError({"after": "Curseur invalide"})
+        queryset = queryset.filter(id__gt=int(after))
+
+    # Plus anciens d'abord : la file se traite dans l'ordre d'inscription
+    return queryset.order_by("id")
+
+
+def _review_stream(queryset):
+    last_id = 0
+    while True:
+        # Une requête courte par tranche : pas de curseur serveur ni de transaction longue
+        rows = list(queryset.filter(id__gt=last_id).values(*REVIEW_FIELDS)[:REVIEW_STREAM_CHUNK])
+        if not rows:
+            return
+        yield "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+        last_id = rows[-1]["id"]
+
+
+def _review_page(request, queryset, fields):
+    """Une page par clé (`after`, `limit`) : (lignes, URL de la suivante ou None)."""
+    limit = request.query_params.get("limit", "")
+    limit = min(int(limit), REVIEW_PAGE_MAX) if limit.isdigit() and int(limit) > 0 else REVIEW_PAGE_SIZE
+
+    rows = list(queryset.values(*fields)[:limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_url = replace_query_param(request.build_absolute_uri(), "after", rows[-1]["id"])
+    return rows, next_url
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_pending_users(request):
     if request.user.role != "admin":
         raise PermissionDenied("Accès réservé à l'admin")
 
-    users = User.objects.filter(is_verified=False)
+    # Ancien format (liste simple) conservé, mais paginé par clé comme
+    # /admin/review-queue/ : page suivante dans l'en-tête Link
+    rows, next_url = _review_page(
+        request, _review_queryset(request.query_params), ("id", "username", "email", "role")
+    )
+    headers = {"Link": f'<{next_url}>; rel="next"'} if next_url else None
+    return Response(rows, headers=headers)
+
 
-    data = [
-        {
-            "id": u.id,
-            "username": u.username,
-            "email": u.email,
-            "role": u.role,
-        }
-        for u in users
-    ]
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_review_queue(request):
+    if request.user.role != "admin":
+        raise PermissionDenied("Accès réservé à l'admin")
+
+    params = request.query_params
+    queryset = _review_queryset(params)
+
+    if params.get("stream") in ("1", "true"):
+        response = StreamingHttpResponse(_review_stream(queryset), content_type="application/x-ndjson")
+        response["Cache-Control"] = "no-store"
+        return response
+
+    rows, next_url = _review_page(request, queryset, REVIEW_FIELDS)
+
+    # Total issu du compteur entretenu ; inconnu (null) avec un filtre de date
+    count = None
+    if not params.get("joined_after") and not params.get("joined_before"):
+        count = User.pending_count(params.get("role") or None)
+
+    return Response({"count": count, "next": next_url, "results": rows})
 
-    return Response(data)
 
 
+# ============================================================
+# JOURNAL D'AUDIT (ADMIN) — plage de temps, curseur (created_at, id)
+# ============================================================
+AUDIT_FIELDS = ("id", "created_at", "action", "actor_id", "target_type", "target_id", "data")
+AUDIT_PAGE_SIZE = 100
+AUDIT_PAGE_MAX = 1000
+
+
+def _audit_queryset(params):
+    queryset = AuditEvent.objects.all()
+
+    if params.get("since"):
+        queryset = queryset.filter(created_at__gte=_parse_moment("since", params["since"]))
+    if params.get("until"):
+        queryset = queryset.filter(created_at__lt=_parse_moment("until", params["until"]))
+
+    # « consultation. » : toutes les actions du préfixe
+    action = params.get("action")
+    if action:
+        queryset = queryset.filter(action__startswith=action) if action.endswith(".") else queryset.filter(action=action)
+
+    actor = params.get("actor", "")
+    if actor:
+        if not actor.isdigit():
+            raise ValidationError({"actor": "Identifiant invalide"})
+        queryset = queryset.filter(actor_id=int(actor))
+    if params.get("target_type"):
+        queryset = queryset.filter(target_type=params["target_type"])
+        if params.get("target_id"):
+            queryset = queryset.filter(target_id=params["target_id"])
+
+    cursor = params.get("cursor", "")
+    if cursor:
+        moment, _, last_id = cursor.rpartition(",")
+        moment = parse_datetime(moment)
+        if moment is None or not last_id.isdigit():
+            raise ValidationError({"cursor": "Curseur invalide"})
+        queryset = queryset.filter(Q(created_at__gt=moment) | Q(created_at=moment, id__gt=int(last_id)))
+
+    return queryset.order_by("created_at", "id")
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_audit(request):
+    if request.user.role != "admin":
+        raise PermissionDenied("Accès réservé à l'admin")
+
+    # Événements encore en mémoire dans ce processus : écrits avant lecture
+    audit.buffer.flush()
+
+    params = request.query_params
+    limit = params.get("limit", "")
+    limit = min(int(limit), AUDIT_PAGE_MAX) if limit.isdigit() and int(limit) > 0 else AUDIT_PAGE_SIZE
+
+    rows = list(_audit_queryset(params).values(*AUDIT_FIELDS)[:limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_url = replace_query_param(
+            request.build_absolute_uri(), "cursor", f"{last['created_at'].isoformat()},{last['id']}"
+        )
+
+    return Response({"next": next_url, "results": rows})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_compression_stats(request):
+    if request.user.role != "admin":
+        raise PermissionDenied("Accès réservé à l'admin")
+
+    return Response(compression_stats.snapshot())
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -369,8 +1019,7 @@ def admin_verify_user(request, user_id):
 
     try:
         user = User.objects.get(id=user_id)
-        user.is_verified = True
-        user.save()
+        user.verify(actor=request.user)
         return Response({"message": "Utilisateur validé"})
     except User.DoesNotExist:
         return Response({"error": "Utilisateur introuvable"}, status=404)
@@ -385,24 +1034,368 @@ def admin_delete_user(request, user_id):
 
     try:
         user = User.objects.get(id=user_id)
-        user.delete()
+        # Suppression logique immédiate ; lignes purgées par `purge_users`
+        user.soft_delete(actor=request.user)
         return Response({"message": "Utilisateur supprimé"})
     except User.DoesNotExist:
         return Response({"error": "Utilisateur introuvable"}, status=404)
     
 
-class ModuleViewSet(viewsets.ModelViewSet):
+class ModuleViewSet(IdempotentCreateMixin, CachedListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     queryset = Module.objects.all().order_by("-created_at")
     serializer_class = ModuleSerializer
     permission_classes = [IsAuthenticated]
+    cache_namespace = "modules"
 
     def get_queryset(self):
         # tout le monde peut voir les modules validés
         return Module.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        parent = super().list
+
+        def build():
+            if wants_lean(request):
+                queryset = self.filter_queryset(self.get_queryset())
+                return ModuleRowSerializer(request).serialize(queryset)
+            return parent(request, *args, **kwargs).data
+
+        return self.cached_list(request, build)
+
+    def get_success_headers(self, data):
+        headers = {"Location": f"{self.request.path}{data['id']}/"}
+        if data.get("checksum"):
+            headers["ETag"] = f'"{data["checksum"]}"'
+        return headers
+
     def perform_create(self, serializer):
         # seul expert peut créer
         if self.request.user.role != "expert":
             raise PermissionDenied("Seuls les experts peuvent publier")
 
-        serializer.save(expert=self.request.user)
\ No newline at end of file
+        with transaction.atomic():
+            module = serializer.save(expert=self.request.user)
+            Expert.bump(self.request.user.id, modules_published=1)
+            # Le module porte déjà auteur et date : audit par lots
+            audit.record("module.published", self.request.user, module, durable=False, titre=module.titre)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        Expert.bump(instance.expert_id, modules_published=-1)
+        audit.record("module.deleted", self.request.user, instance, titre=instance.titre)
+        instance.delete()
+
+# ============================================================
+# TÉLÉVERSEMENT REPRENABLE DES MODULES (protocole type tus)
+# POST   /api/module-uploads/                 → création (taille totale)
+# GET    /api/module-uploads/<id>/            → offset courant (reprise)
+# PATCH  /api/module-uploads/<id>/            → morceau à l'offset courant
+# POST   /api/module-uploads/<id>/finalize/   → assemblage dans Module.fichier
+# DELETE /api/module-uploads/<id>/            → abandon
+# ============================================================
+class ModuleUploadViewSet(IdempotentCreateMixin, viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    BUFFER_SIZE = 64 * 1024
+    SPOOL_SIZE = 1024 * 1024        # au-delà, le morceau reçu passe sur disque
+    CHECKSUM_ALGORITHMS = ("md5", "sha1", "sha256")
+
+    def _get_upload(self, request, pk, lock=False):
+        queryset = ModuleUpload.objects.select_for_update() if lock else ModuleUpload.objects
+        try:
+            return queryset.get(pk=pk, expert=request.user)
+        except (ModuleUpload.DoesNotExist, DjangoValidationError):
+            raise NotFound("Téléversement introuvable")
+
+    def _headers(self, upload):
+        return {
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(upload.size),
+            "Cache-Control": "no-store",
+        }
+
+    def create(self, request):
+        if request.user.role != "expert":
+            raise PermissionDenied("Seuls les experts peuvent publier")
+
+        serializer = ModuleUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(expert=request.user)
+
+        os.makedirs(settings.MODULE_UPLOAD_TEMP_DIR, exist_ok=True)
+        open(upload.temp_path, "wb").close()
+
+        headers = self._headers(upload)
+        headers["Location"] = f"{request.path}{upload.id}/"
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def retrieve(self, request, pk=None):
+        upload = self._get_upload(request, pk)
+        return Response(ModuleUploadSerializer(upload).data, headers=self._headers(upload))
+
+    def _check_chunk(self, upload, offset, length):
+        if upload.status != "uploading":
+            return Response({"detail": "Téléversement déjà finalisé"}, status=status.HTTP_409_CONFLICT)
+        if offset != upload.offset:
+            return Response(
+                {"detail": "Offset inattendu", "offset": upload.offset},
+                status=status.HTTP_409_CONFLICT,
+                headers=self._headers(upload)
+            )
+        if length <= 0 or length > settings.MODULE_UPLOAD_CHUNK_MAX or offset + length > upload.size:
+            return Response({"detail": "Taille de morceau invalide"}, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+    def partial_update(self, request, pk=None):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except (KeyError, ValueError):
+            return Response({"detail": "En-tête Upload-Offset manquant"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Upload-Checksum: <algorithme> <empreinte base64>
+        digest, expected = None, None
+        if request.headers.get("Upload-Checksum"):
+            algorithm, _, expected = request.headers["Upload-Checksum"].partition(" ")
+            if algorithm not in self.CHECKSUM_ALGORITHMS or not expected:
+                return Response({"detail": "Upload-Checksum invalide"}, status=status.HTTP_400_BAD_REQUEST)
+            digest = hashlib.new(algorithm)
+
+        # Contrôles sans verrou : un PATCH voué à l'échec ne lit pas le corps
+        upload = self._get_upload(request, pk)
+        refused = self._check_chunk(upload, offset, length)
+        if refused:
+            return refused
+
+        # Morceau reçu hors transaction (client lent) dans un fichier tampon :
+        # mémoire bornée à SPOOL_SIZE, aucune connexion ni verrou retenus
+        with tempfile.SpooledTemporaryFile(self.SPOOL_SIZE, dir=settings.MODULE_UPLOAD_TEMP_DIR) as spool:
+            remaining = length
+            while remaining:
+                data = request.stream.read(min(self.BUFFER_SIZE, remaining))
+                if not data:
+                    break
+                spool.write(data)
+                if digest:
+                    digest.update(data)
+                remaining -= len(data)
+
+            if remaining:
+                return Response({"detail": "Morceau incomplet"}, status=status.HTTP_400_BAD_REQUEST)
+            if digest and base64.b64encode(digest.digest()).decode() != expected:
+                return Response({"detail": "Somme de contrôle incorrecte"}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Transaction courte : verrou, offset revérifié, copie locale du tampon.
+            # Un PATCH concurrent attend puis repart en 409 sans toucher au fichier
+            with transaction.atomic():
+                upload = self._get_upload(request, pk, lock=True)
+                refused = self._check_chunk(upload, offset, length)
+                if refused:
+                    return refused
+
+                spool.seek(0)
+                with open(upload.temp_path, "r+b") as f:
+                    try:
+                        f.seek(offset)
+                        shutil.copyfileobj(spool, f, self.BUFFER_SIZE)
+                        f.truncate(offset + length)
+                    except BaseException:
+                        f.truncate(offset)
+                        raise
+
+                upload.offset = offset + length
+                upload.save(update_fields=["offset", "updated_at"])
+
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=self._headers(upload))
+
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, pk=None):
+        upload = self._get_upload(request, pk)
+
+        if upload.status == "completed":
+            return Response(ModuleSerializer(upload.module, context={"request": request}).data)
+        if upload.offset != upload.size:
+            return Response(
+                {"detail": "Téléversement incomplet", "offset": upload.offset},
+                status=status.HTTP_409_CONFLICT,
+                headers=self._headers(upload)
+            )
+
+        with transaction.atomic():
+            # Passage conditionnel : un seul finalize assemble le fichier
+            claimed = ModuleUpload.objects.filter(
+                pk=upload.pk, status="uploading", offset=upload.size
+            ).update(status="completed", updated_at=timezone.now())
+            if not claimed:
+                return Response({"detail": "Téléversement déjà finalisé"}, status=status.HTTP_409_CONFLICT)
+
+            module = Module(
+                expert=request.user,
+                titre=upload.titre,
+                description=upload.description,
+                type_culture=upload.type_culture,
+            )
+            with open(upload.temp_path, "rb") as f:
+                # Copie par blocs vers le stockage : pas de chargement complet
+                module.fichier.save(os.path.basename(upload.filename), File(f), save=False)
+            module.save()
+            Expert.bump(request.user.id, modules_published=1)
+            audit.record(
+                "module.published", request.user, module, durable=False, titre=module.titre, upload=str(upload.id),
+            )
+
+            ModuleUpload.objects.filter(pk=upload.pk).update(module=module)
+            transaction.on_commit(upload.discard)
+
+        return Response(
+            ModuleSerializer(module, context={"request": request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def destroy(self, request, pk=None):
+        upload = self._get_upload(request, pk)
+        upload.discard()
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ============================================================
+# PAQUETS HORS LIGNE DES MODULES
+# GET /api/bundles/?culture=           dernières versions complètes
+# GET /api/bundles/sync/?culture=&version=
+#     → à jour, ou delta depuis `version`, ou paquet complet
+# GET /api/bundles/<id>/manifest/
+# GET /api/bundles/<id>/download/      reprise via l'en-tête Range
+# ============================================================
+BYTE_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _read_range(f, length, block=64 * 1024):
+    try:
+        while length > 0:
+            data = f.read(min(block, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+class ModuleBundleViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ModuleBundleSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = ModuleBundle.objects.all()
+        if self.action == "list":
+            queryset = queryset.filter(base_version__isnull=True)
+            culture = self.request.query_params.get("culture")
+            if culture:
+                queryset = queryset.filter(culture=slugify(culture))
+        return queryset.order_by("culture", "-version")
+
+    def _default_culture(self, request):
+        culture = request.query_params.get("culture")
+        if culture is None:
+            culture = Paysan.objects.filter(user=request.user).values_list("type_culture", flat=True).first()
+        return slugify(culture or "") or GENERAL_BUNDLE
+
+    @action(detail=False, methods=["get"])
+    def sync(self, request):
+        culture = self._default_culture(request)
+        fulls = ModuleBundle.objects.filter(base_version__isnull=True).order_by("-version")
+
+        latest = fulls.filter(culture=culture).first()
+        if latest is None:
+            # Culture sans guide spécifique : paquet général
+            latest = fulls.filter(culture=GENERAL_BUNDLE).first()
+        if latest is None:
+            raise NotFound("Aucun paquet disponible")
+
+        version = request.query_params.get("version", "")
+        if version.isdigit() and int(version) == latest.version:
+            return Response({"up_to_date": True, "culture": latest.culture, "version": latest.version})
+
+        bundle = latest
+        if version.isdigit():
+            bundle = ModuleBundle.objects.filter(
+                culture=latest.culture, version=latest.version, base_version=int(version)
+            ).first() or latest
+
+        return Response({
+            "up_to_date": False,
+            "bundle": self.get_serializer(bundle).data,
+        })
+
+    @action(detail=True, methods=["get"])
+    def manifest(self, request, pk=None):
+        bundle = self.get_object()
+        return Response({
+            "culture": bundle.culture,
+            "version": bundle.version,
+            "modules": bundle.manifest,
+        })
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        bundle = self.get_object()
+        size = bundle.size
+        etag = f'"{bundle.checksum}"'
+
+        f = bundle.fichier.open("rb")
+        match = BYTE_RANGE.fullmatch(request.META.get("HTTP_RANGE", "").strip())
+        if_range = request.META.get("HTTP_IF_RANGE")
+
+        # If-Range : reprise seulement si le paquet n'a pas changé
+        if match and any(match.groups()) and if_range in (None, etag):
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            else:
+                start, end = max(size - int(last), 0), size - 1
+
+            if start >= size or start > end:
+                f.close()
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+            f.seek(start)
+            response = StreamingHttpResponse(_read_range(f, end - start + 1), status=206)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        else:
+            response = FileResponse(f)
+            response["Content-Length"] = str(size)
+
+        response["Content-Type"] = "application/zip"
+        response["Content-Disposition"] = (
+            f'attachment; filename="{bundle.culture}-v{bundle.version}'
+            f'{"-from" + str(bundle.base_version) if bundle.is_delta else ""}.zip"'
+        )
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = etag
+        return response
+
+
+# ============================================================
+# NOTIFICATIONS (fil in-app alimenté par dispatch_notifications)
+# ============================================================
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(recipient=self.request.user).order_by("-updated_at")
+        if self.request.query_params.get("unread") == "true":
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset
+
+    @action(detail=False, methods=["post"])
+    def read(self, request):
+        count = Notification.objects.filter(
+            recipient=request.user,
+            read_at__isnull=True
+        ).update(read_at=timezone.now())
+        return Response({"read": count})
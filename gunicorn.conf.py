@@ -0,0 +1,137 @@
+# gunicorn.conf.py
+"""
+Configuration gunicorn (Procfile : gunicorn -c gunicorn.conf.py agro_platform.wsgi).
+
+- Préchargement : Django, DRF, SimpleJWT, `core` et l'URLconf sont
+  importés une fois dans le maître puis partagés en copie sur écriture ;
+  `gc.freeze()` avant le fork évite que le ramasse-miettes des workers
+  ne réécrive (et donc ne duplique) ces pages.
+- Nombre de workers : 2 × CPU + 1, plafonné par la mémoire disponible
+  (GUNICORN_WORKER_MEMORY_MB par worker) ; les threads compensent quand
+  la mémoire limite les processus. Quotas cgroup (conteneur) respectés.
+- Recyclage : chaque worker redémarre après `max_requests` requêtes,
+  avec une gigue pour ne pas tous redémarrer en même temps.
+
+Toutes les valeurs se surchargent par variable d'environnement
+(WEB_CONCURRENCY, GUNICORN_THREADS, …) ; `python manage.py
+startup_report` mesure le démarrage et la mémoire par worker.
+"""
+import gc
+import math
+import multiprocessing
+import os
+
+from decouple import config
+
+
+def cpu_count():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = multiprocessing.cpu_count()
+    # Quota cgroup v2 : « max 100000 » ou « 200000 100000 »
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def memory_bytes():
+    # Limite du conteneur (cgroup v2 puis v1), sinon mémoire de la machine
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def autotune(cpus, memory, worker_memory):
+    """(workers, threads) : processus selon les CPU, bornés par la mémoire."""
+    wanted = 2 * cpus + 1
+    workers = wanted
+    if memory:
+        # Un quart de la mémoire reste au maître, au cache et au système
+        workers = min(wanted, max(1, int(memory * 0.75) // worker_memory))
+    threads = min(8, math.ceil(wanted / workers))
+    return workers, threads
+
+
+_auto_workers, _auto_threads = autotune(
+    cpu_count(),
+    memory_bytes(),
+    config("GUNICORN_WORKER_MEMORY_MB", default=200, cast=int) * 1024 ** 2,
+)
+
+bind = f"0.0.0.0:{config('PORT', default='8000')}"
+workers = config("WEB_CONCURRENCY", default=_auto_workers, cast=int)
+threads = config("GUNICORN_THREADS", default=_auto_threads, cast=int)
+worker_class = "gthread" if threads > 1 else "sync"
+
+preload_app = config("GUNICORN_PRELOAD", default=True, cast=bool)
+
+max_requests = config("GUNICORN_MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = config("GUNICORN_MAX_REQUESTS_JITTER", default=max(1, max_requests // 10), cast=int)
+
+timeout = config("GUNICORN_TIMEOUT", default=30, cast=int)
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    server.log.info(
+        "workers=%s threads=%s preload=%s max_requests=%s±%s",
+        workers, threads, preload_app, max_requests, max_requests_jitter,
+    )
+    if not preload_app:
+        return
+
+    # L'URLconf n'est chargée qu'à la première requête : on la charge dans
+    # le maître pour partager vues, sérialiseurs et DRF entre les workers
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+
+    # Contrôles de déploiement du cache (core/checks.py) : pas de démarrage
+    # avec des limites de débit propres à chaque worker
+    from django.core.checks import Tags, run_checks
+    errors = [e for e in run_checks(include_deployment_checks=True, tags=[Tags.caches]) if e.is_serious()]
+    for error in errors:
+        server.log.error("%s", error)
+    if errors:
+        raise SystemExit(1)
+
+    # Aucune connexion ouverte dans le maître ne doit passer aux workers
+    from django.db import connections
+    connections.close_all()
+
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Application chargée : taux d'occupation rapporté aux threads réels (/saturation)
+    from core import metrics
+    metrics.worker_stats().capacity = worker.cfg.threads
+
+
+def worker_exit(server, worker):
+    # Événements d'audit encore en mémoire (core.audit)
+    from core import audit
+    audit.buffer.flush()